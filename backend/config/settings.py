@@ -7,7 +7,32 @@ from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     environment: str = Field(default="development")
-    run_sync: bool = Field(default=True, alias="RUN_SYNC")
+    run_sync: bool = Field(default=False, alias="RUN_SYNC")
+    run_workers: int = Field(default=2, alias="RUN_WORKERS")
+    run_queue_max: int = Field(default=64, alias="RUN_QUEUE_MAX")
+    stage_process_workers: int = Field(default=0, alias="STAGE_PROCESS_WORKERS")
+    scan_workers: int = Field(default=0, alias="SCAN_WORKERS")
+    scan_parallel_min_files: int = Field(default=200, alias="SCAN_PARALLEL_MIN_FILES")
+
+    # warm checkov processes; 0 runs the CLI for every scan
+    checkov_workers: int = Field(default=2, alias="CHECKOV_WORKERS")
+    checkov_worker_max_scans: int = Field(default=50, alias="CHECKOV_WORKER_MAX_SCANS")
+    checkov_worker_max_rss_mb: int = Field(default=1024, alias="CHECKOV_WORKER_MAX_RSS_MB")
+    checkov_timeout_s: float = Field(default=600.0, alias="CHECKOV_TIMEOUT_S")
+
+    scan_cache_enabled: bool = Field(default=True, alias="SCAN_CACHE_ENABLED")
+    scan_cache_path: str = Field(default="", alias="SCAN_CACHE_PATH")
+    scan_cache_memory_mb: int = Field(default=16, alias="SCAN_CACHE_MEMORY_MB")
+    scan_cache_disk_mb: int = Field(default=256, alias="SCAN_CACHE_DISK_MB")
+
+    # /status documents; STATUS_CACHE_PATH shares them between worker processes
+    status_cache_entries: int = Field(default=1000, alias="STATUS_CACHE_ENTRIES")
+    status_cache_memory_mb: int = Field(default=64, alias="STATUS_CACHE_MEMORY_MB")
+    status_cache_ttl_s: int = Field(default=24 * 3600, alias="STATUS_CACHE_TTL_S")
+    status_cache_path: str = Field(default="", alias="STATUS_CACHE_PATH")
+    status_cache_disk_mb: int = Field(default=256, alias="STATUS_CACHE_DISK_MB")
+    # a "running" status older than this is treated as abandoned
+    status_cache_max_run_s: int = Field(default=6 * 3600, alias="STATUS_CACHE_MAX_RUN_S")
 
     sample_tf_path: str = Field(default="backend/sample/tf", alias="SAMPLE_TF_PATH")
 
@@ -17,13 +42,35 @@ class Settings(BaseSettings):
     dd_api_key: str = Field(default="", alias="DD_API_KEY")
     dd_app_key: str = Field(default="", alias="DD_APP_KEY")
     dd_site: str = Field(default="us5.datadoghq.com", alias="DD_SITE")
+    # DogStatsD agent; takes precedence over the HTTP API when set
+    dd_agent_host: str = Field(default="", alias="DD_AGENT_HOST")
+    dd_dogstatsd_port: int = Field(default=8125, alias="DD_DOGSTATSD_PORT")
+    metrics_flush_interval_s: float = Field(default=10.0, alias="METRICS_FLUSH_INTERVAL_S")
+
+    # in-process storage used when ClickHouse is not configured
+    memory_storage_retention_days: float = Field(default=30, alias="MEMORY_STORAGE_RETENTION_DAYS")
+    memory_storage_max_runs: int = Field(default=10000, alias="MEMORY_STORAGE_MAX_RUNS")
 
     clickhouse_url: Optional[AnyUrl] = Field(default=None, alias="CLICKHOUSE_URL")
     clickhouse_user: str = Field(default="default", alias="CLICKHOUSE_USER")
     clickhouse_password: str = Field(default="", alias="CLICKHOUSE_PASSWORD")
+    # write-behind inserts: one batch per table per interval (0 = insert synchronously)
+    clickhouse_flush_interval_ms: int = Field(default=1000, alias="CLICKHOUSE_FLUSH_INTERVAL_MS")
+    clickhouse_batch_rows: int = Field(default=5000, alias="CLICKHOUSE_BATCH_ROWS")
+    clickhouse_async_insert: bool = Field(default=False, alias="CLICKHOUSE_ASYNC_INSERT")
+    clickhouse_timeout_s: float = Field(default=10.0, alias="CLICKHOUSE_TIMEOUT_S")
+    clickhouse_max_connections: int = Field(default=8, alias="CLICKHOUSE_MAX_CONNECTIONS")
+    # server-side limit per query; reads that would run longer fail fast instead of piling up
+    clickhouse_max_execution_time_s: int = Field(default=10, alias="CLICKHOUSE_MAX_EXECUTION_TIME_S")
+    clickhouse_compress: bool = Field(default=True, alias="CLICKHOUSE_COMPRESS")
 
     github_token: str = Field(default="", alias="GITHUB_TOKEN")
     github_webhook_secret: str = Field(default="", alias="GITHUB_WEBHOOK_SECRET")
+    github_api_url: str = Field(default="https://api.github.com", alias="GITHUB_API_URL")
+    github_max_connections: int = Field(default=10, alias="GITHUB_MAX_CONNECTIONS")
+    # client-side budget on top of GitHub's headers (5000/h is ~1.4/s)
+    github_rate_per_s: float = Field(default=1.0, alias="GITHUB_RATE_PER_S")
+    github_burst: int = Field(default=10, alias="GITHUB_BURST")
 
     api_host: str = Field(default="0.0.0.0")
     api_port: int = Field(default=8000)
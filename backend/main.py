@@ -1,20 +1,52 @@
 from __future__ import annotations
 
+import threading
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 import logging, logging.config, os
 
 from .config.settings import get_settings
+from .services.checkov_workers import get_checkov_pool, shutdown_checkov_pool
 from .routes import runs as runs_routes
 from .routes import webhook as webhook_routes
+from .services.github_client import shutdown_github_client
+from .services.jobs import get_job_runner, shutdown_job_runner
+from .services.metrics import shutdown_metrics
+from .services.parallel import shutdown_scan_pool
+from .services.scan_cache import get_scan_cache
+from .services.status_cache import get_status_cache
+from .services.stages import shutdown_process_pool
+from .services.storage import shutdown_storage
+from .services.telemetry import OPENMETRICS_CONTENT_TYPE, REGISTRY
 
 settings = get_settings()
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    pool = get_checkov_pool()
+    if pool is not None:
+        # importing checkov takes seconds; pay it before the first run, off the startup path
+        threading.Thread(target=pool.warm, name="checkov-warm", daemon=True).start()
+    yield
+    shutdown_job_runner()
+    shutdown_checkov_pool()
+    shutdown_process_pool()
+    shutdown_scan_pool()
+    shutdown_storage()
+    shutdown_github_client()
+    shutdown_metrics()
+
+
 app = FastAPI(
     title="AutoInfra CoPilot API",
     version="0.1.0",
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -23,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 @app.get("/")
@@ -31,7 +64,42 @@ def root():
 
 @app.get("/health")
 def health():
-    return {"ok": True, "env": settings.environment, "sync": settings.run_sync}
+    cache = get_scan_cache()
+    pool = get_checkov_pool()
+    return {
+        "ok": True,
+        "env": settings.environment,
+        "sync": settings.run_sync,
+        "scan_cache": cache.stats() if cache else None,
+        "status_cache": get_status_cache().stats(),
+        "checkov_workers": pool.stats() if pool else None,
+    }
+
+
+def _scan_cache_lookups():
+    cache = get_scan_cache()
+    if cache is None:
+        return {}
+    c = cache.stats()
+    return {("memory_hit",): c["memory_hits"], ("disk_hit",): c["disk_hits"], ("miss",): c["misses"]}
+
+
+def _status_cache_lookups():
+    c = get_status_cache().stats()
+    return {("memory_hit",): c["hits"], ("disk_hit",): c["disk_hits"], ("miss",): c["misses"]}
+
+
+REGISTRY.callback(
+    "autoinfra_job_queue_depth", "Runs queued or running.", "gauge", lambda: {(): get_job_runner().pending()}
+)
+REGISTRY.callback("autoinfra_scan_cache_lookups", "Scan cache lookups.", "counter", _scan_cache_lookups, ("result",))
+REGISTRY.callback("autoinfra_status_cache_lookups", "Status cache lookups.", "counter", _status_cache_lookups, ("result",))
+
+
+@app.get("/metrics")
+def metrics():
+    """OpenMetrics exposition of stage latency, queue depth, cache and subprocess counters."""
+    return PlainTextResponse(REGISTRY.render(), media_type=OPENMETRICS_CONTENT_TYPE)
 
 cfg_path = os.path.join(os.path.dirname(__file__), "config", "logging.conf")
 if os.path.exists(cfg_path):
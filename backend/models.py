@@ -41,6 +41,8 @@ class StatusResponse(BaseModel):
     
     safe_to_merge: Optional[bool] = None
     self_check: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    timings: Dict[str, int] = {}
     created_at: datetime = Field(default_factory=datetime.utcnow)
 
 
@@ -52,3 +54,31 @@ class HistoryItem(BaseModel):
     cost: float
     duration_ms: int
     created_at: datetime
+
+
+class RuleStat(BaseModel):
+    rule_id: str
+    severity: str
+    tool: str
+    findings: int
+    runs: int
+
+
+class RepoStat(BaseModel):
+    repo: str
+    runs: int
+    findings: int
+    p50_ms: float
+    p95_ms: float
+
+
+class StatsResponse(BaseModel):
+    days: int
+    repo: Optional[str] = None
+    runs: int
+    findings: int
+    p50_ms: float
+    p95_ms: float
+    by_severity: Dict[str, int] = {}
+    top_rules: List[RuleStat] = []
+    repos: List[RepoStat] = []
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import logging
 import time
+import uuid
+from dataclasses import asdict
 from datetime import datetime
-from typing import List, Optional
+from functools import partial
+from typing import Dict, List, Optional
 
 from .config.settings import get_settings
 from .models import Finding, RunRequest, RunSummary, StatusResponse
@@ -10,9 +14,18 @@ from .services.checkov_runner import run_checkov
 from .services.policy_engine import run_policy_checks
 from .services.cost_estimator import estimate_monthly_cost
 from .services.code_context import attach_code_context
-from .services.metrics import get_metrics
-from .services.composer import compose_comment
+from .services.composer import compose_comment, drop_patches
 from .services.patch_apply import extract_all_diffs, self_check_with_patches
+from .services.jobs import Job
+from .services.stages import Stage, run_stages
+from .services.telemetry import collect_timings, record_timing, span
+
+logger = logging.getLogger(__name__)
+
+
+def new_run_id() -> str:
+    # timestamp keeps ids readable and roughly ordered; the suffix keeps runs started in the same microsecond apart
+    return f"{datetime.utcnow().isoformat()}-{uuid.uuid4().hex[:12]}"
 
 
 def _summarize(findings: List[Finding], duration_ms: int, cost_usd_month: float) -> RunSummary:
@@ -36,71 +49,90 @@ def _prepend_badge(md: str, safe: Optional[bool]) -> str:
     return f"{badge}\n\n{md}"
 
 
-def execute_run(req: RunRequest) -> StatusResponse:
-    settings = get_settings()
-    start = time.perf_counter()
+def _checkpoint(job: Optional[Job]) -> None:
+    if job is not None:
+        job.raise_if_cancelled()
 
-    tf_path = req.tf_path or settings.sample_tf_path
 
-    
-    checkov_findings = run_checkov(tf_path)
-    policy_findings = run_policy_checks(tf_path)
-    findings: List[Finding] = checkov_findings + policy_findings
+def execute_run(req: RunRequest, run_id: Optional[str] = None, job: Optional[Job] = None) -> StatusResponse:
+    # every span below (here, in patch_apply, ...) lands in the run's timings
+    timings: Dict[str, int] = {}
+    with collect_timings(timings):
+        return _execute(req, run_id, job, timings)
 
-    
-    findings = attach_code_context(findings, base_dir=tf_path, context_radius=3)
 
-    
-    cost = estimate_monthly_cost(tf_path)
+def _execute(req: RunRequest, run_id: Optional[str], job: Optional[Job], timings: Dict[str, int]) -> StatusResponse:
+    settings = get_settings()
+    start = time.perf_counter()
+
+    tf_path = req.tf_path or settings.sample_tf_path
 
-    
-    comment_md = compose_comment(
-        findings=findings,
-        cost_estimate=cost,
-        repo=req.repo,
-        pr_number=req.pr_number,
-        commit_sha=req.commit_sha,
+    def _context(checkov: List[Finding], policy: List[Finding]) -> List[Finding]:
+        return attach_code_context(checkov + policy, base_dir=tf_path, context_radius=3)
+
+    def _compose(context: List[Finding], cost: float) -> str:
+        return compose_comment(
+            findings=context,
+            cost_estimate=cost,
+            repo=req.repo,
+            pr_number=req.pr_number,
+            commit_sha=req.commit_sha,
+        )
+
+    # checkov, policy and cost are independent; only context/compose wait on them
+    results, stage_ms = run_stages(
+        [
+            Stage("checkov", partial(run_checkov, tf_path)),
+            Stage("policy", partial(run_policy_checks, tf_path), kind="process"),
+            Stage("cost", partial(estimate_monthly_cost, tf_path), kind="process"),
+            Stage("context", _context, deps=("checkov", "policy")),
+            Stage("compose", _compose, deps=("context", "cost"), kind="inline"),
+        ],
+        job=job,
     )
-
+    for name, ms in stage_ms.items():
+        record_timing(name, ms / 1000.0)
+    findings: List[Finding] = results["context"]
+    cost: float = results["cost"]
+    comment_md: str = results["compose"]
 
     diff_blocks = extract_all_diffs(comment_md or "")
     safe_to_merge: Optional[bool] = None
     self_check_payload = None
-    result_tag = "success"
 
+    _checkpoint(job)
     if diff_blocks:
-        try:
-            sc = self_check_with_patches(tf_path, diff_blocks)
-            safe_to_merge = sc.safe_to_merge
-            self_check_payload = {
-                "issues_before": sc.issues_before,
-                "issues_after": sc.issues_after,
-                "policy_before": sc.policy_before,
-                "policy_after": sc.policy_after,
-            }
-            result_tag = "safe" if safe_to_merge else "unsafe"
-        except Exception:
-            
-            safe_to_merge = None
-            result_tag = "success"
-
+        with span("self_check"):
+            try:
+                # the unpatched tree was just scanned; only patched files are redone
+                sc = self_check_with_patches(tf_path, diff_blocks, baseline=results["checkov"] + results["policy"])
+                safe_to_merge = sc.safe_to_merge
+                self_check_payload = {
+                    "issues_before": sc.issues_before,
+                    "issues_after": sc.issues_after,
+                    "policy_before": sc.policy_before,
+                    "policy_after": sc.policy_after,
+                    "patches": [asdict(p) for p in sc.patches],
+                }
+                # only suggest patches that reduce findings on their own
+                comment_md = drop_patches(comment_md, [p.index for p in sc.patches if not p.helps])
+            except Exception:
+                # the comment still goes out, just without a verdict
+                logger.exception("self-check failed for run %s", run_id)
+                safe_to_merge = None
+
+    _checkpoint(job)
     final_md = _prepend_badge(comment_md, safe_to_merge)
     duration_ms = int((time.perf_counter() - start) * 1000)
 
-    status_doc = StatusResponse(
-        run_id=f"{datetime.utcnow().isoformat()}",
+    # metrics are reported once per run by the caller (routes/runs.py)
+    return StatusResponse(
+        run_id=run_id or new_run_id(),
         status="completed",
         summary=_summarize(findings, duration_ms, cost),
         findings=findings,
         llm_comment_markdown=final_md,
         safe_to_merge=safe_to_merge,
         self_check=self_check_payload,
+        timings=timings,
     )
-
-
-    try:
-        get_metrics().send_run_metrics(status_doc.summary, repo=req.repo, result=result_tag)
-    except Exception:
-        pass
-
-    return status_doc
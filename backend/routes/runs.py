@@ -1,29 +1,29 @@
 
 from __future__ import annotations
 
-from typing import Dict
-from fastapi import APIRouter, HTTPException
-
-from ..models import RunRequest, StatusResponse
-from ..orchestrator import execute_run
-from ..services.storage import get_storage
+import threading
+from datetime import datetime
+from typing import Any, Callable, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query, Response
+from fastapi.responses import StreamingResponse
+
+from ..config.settings import get_settings
+from ..models import RunRequest, RunSummary, StatusResponse
+from ..orchestrator import execute_run, new_run_id
+from ..services.jobs import Job, JobQueueFull, RunCancelled, get_job_runner
+from ..services.export import MEDIA_TYPES, WRITERS, ExportUnavailable
+from ..services.storage import EXPORT_FIELDS, decode_cursor, encode_cursor, get_storage
 from ..services.metrics import get_metrics
+from ..services.status_cache import get_status_cache
+from ..services.telemetry import RUN_SECONDS, RUNS, collect_timings, span
 
 router = APIRouter()
 
 
-status_store: Dict[str, StatusResponse] = {}
-
+_store_lock = threading.Lock()
 
-@router.post("/run", response_model=StatusResponse)
-def kickoff_run(req: RunRequest) -> StatusResponse:
-    
-    status_doc = execute_run(req)
 
-    
-    status_store[status_doc.run_id] = status_doc
-
-    
+def _persist(req: RunRequest, status_doc: StatusResponse) -> None:
     try:
         st = get_storage()
         st.insert_run(
@@ -34,7 +34,7 @@ def kickoff_run(req: RunRequest) -> StatusResponse:
             status=status_doc.status,
             summary=status_doc.summary,
         )
-        st.insert_findings(status_doc.run_id, status_doc.findings)
+        st.insert_findings(status_doc.run_id, status_doc.findings, repo=req.repo)
 
         if status_doc.self_check is not None:
             sc = status_doc.self_check
@@ -47,32 +47,196 @@ def kickoff_run(req: RunRequest) -> StatusResponse:
                 safe_to_merge=status_doc.safe_to_merge,
             )
     except Exception:
-        
+
         pass
 
-    
-    try:
+
+def _persist_timed(req: RunRequest, status_doc: StatusResponse) -> None:
+    with collect_timings(status_doc.timings), span("storage"):
+        _persist(req, status_doc)
+    # republish so /status shows the storage time too
+    get_status_cache().put(status_doc)
+
+
+def _report(req: RunRequest, status_doc: StatusResponse) -> None:
+    """The one place a finished run reaches metrics; only buffers in memory."""
+    if status_doc.status == "failed":
+        result_tag = "failed"
+    else:
         result_tag = (
             "safe" if status_doc.safe_to_merge is True
             else "unsafe" if status_doc.safe_to_merge is False
             else "success"
         )
+    RUNS.inc(result=result_tag)
+    if status_doc.status == "completed":
+        RUN_SECONDS.observe(status_doc.summary.duration_ms / 1000.0, result=result_tag)
+    try:
         get_metrics().send_run_metrics(status_doc.summary, repo=req.repo, result=result_tag)
     except Exception:
         pass
 
+
+def _failed(run_id: str, error: str) -> StatusResponse:
+    doc = StatusResponse(run_id=run_id, status="failed", summary=RunSummary(), error=error)
+    prev = get_status_cache().get(run_id)
+    if prev is not None:
+        doc.created_at = prev.created_at
+    return doc
+
+
+def _cancelled_elsewhere(run_id: str) -> Optional[str]:
+    # another worker's request_cancel settles the run as failed in the shared tier
+    doc = get_status_cache().get(run_id)
+    if doc is None or doc.status != "failed":
+        return None
+    return doc.error or "cancelled"
+
+
+def run_job(req: RunRequest, job: Job) -> StatusResponse:
+    """Worker body shared by /run and the webhook: execute, publish, persist."""
+    job.probe = lambda: _cancelled_elsewhere(job.run_id)
+    try:
+        status_doc = execute_run(req, run_id=job.run_id, job=job)
+    except RunCancelled:
+        status_doc = _failed(job.run_id, job.cancel_reason)
+    except Exception as e:
+        status_doc = _failed(job.run_id, f"{type(e).__name__}: {e}")
+
+    with _store_lock:
+        # a cancel that lands after the last checkpoint still wins, as does
+        # one another worker already settled
+        if job.cancelled:
+            status_doc = _failed(job.run_id, job.cancel_reason)
+        status_doc = get_status_cache().settle(status_doc)
+
+    if status_doc.status == "completed":
+        _persist_timed(req, status_doc)
+    _report(req, status_doc)
     return status_doc
 
 
+def enqueue_run(
+    req: RunRequest, work: Optional[Callable[[Job], Any]] = None, run_id: Optional[str] = None
+) -> StatusResponse:
+    """Publish a 'running' status and queue the run; raises JobQueueFull when saturated."""
+    run_id = run_id or new_run_id()
+    running = StatusResponse(run_id=run_id, status="running", summary=RunSummary())
+    get_status_cache().put(running)
+    try:
+        get_job_runner().submit(run_id, work or (lambda job: run_job(req, job)))
+    except JobQueueFull:
+        get_status_cache().pop(run_id)
+        raise
+    return running
+
+
+def request_cancel(run_id: str, reason: str = "cancelled") -> Optional[StatusResponse]:
+    """Cancel a running run and record it as failed; None if it is not running."""
+    with _store_lock:
+        doc = get_status_cache().get(run_id)
+        if doc is None or doc.status != "running":
+            return None
+        get_job_runner().cancel(run_id, reason)
+        # the run may have finished on another worker since the read above
+        doc = get_status_cache().settle(_failed(run_id, reason))
+    return doc if doc.status == "failed" else None
+
+
+@router.post("/run", response_model=StatusResponse)
+def kickoff_run(req: RunRequest, response: Response) -> StatusResponse:
+    if get_settings().run_sync:
+        status_doc = execute_run(req)
+        get_status_cache().put(status_doc)
+        _persist_timed(req, status_doc)
+        _report(req, status_doc)
+        return status_doc
+
+    try:
+        running = enqueue_run(req)
+    except JobQueueFull:
+        raise HTTPException(status_code=503, detail="run queue is full, retry later")
+
+    response.status_code = 202
+    return running
+
+
+@router.post("/cancel", response_model=StatusResponse)
+def cancel_run(run_id: str) -> StatusResponse:
+    doc = request_cancel(run_id)
+    if doc is not None:
+        return doc
+    doc = get_status_cache().get(run_id)
+    if not doc:
+        raise HTTPException(status_code=404, detail="run_id not found")
+    raise HTTPException(status_code=409, detail=f"run already {doc.status}")
+
+
 @router.get("/status", response_model=StatusResponse)
 def get_status(run_id: str) -> StatusResponse:
-    doc = status_store.get(run_id)
-    if not doc:
+    doc = get_status_cache().get(run_id)
+    if doc:
+        return doc
+    # finished on another worker or before a restart
+    try:
+        return StatusResponse(**get_storage().get_status(run_id))
+    except KeyError:
         raise HTTPException(status_code=404, detail="run_id not found")
-    return doc
+    except Exception:
+        raise HTTPException(status_code=503, detail="storage unavailable")
 
 
 @router.get("/history")
-def get_history(limit: int = 20):
+def get_history(
+    response: Response,
+    limit: int = Query(default=20, ge=1, le=500),
+    cursor: Optional[str] = None,
+    repo: Optional[str] = None,
+    pr_number: Optional[int] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Newest runs first. A full page carries `X-Next-Cursor`; pass it back as `cursor` for the next one."""
+    try:
+        before = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid cursor")
     st = get_storage()
-    return [h.model_dump() for h in st.history(limit=limit)]
+    items = st.history(limit=limit, before=before, repo=repo, pr_number=pr_number, since=since, until=until)
+    if len(items) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(items[-1])
+    return [h.model_dump() for h in items]
+
+
+@router.get("/stats")
+def get_stats(
+    days: int = Query(default=7, ge=1, le=366),
+    repo: Optional[str] = None,
+    top: int = Query(default=10, ge=1, le=100),
+):
+    """Top failing rules, findings per repo and run-duration percentiles, from pre-aggregated rollups."""
+    try:
+        return get_storage().stats(days=days, repo=repo, top=top).model_dump()
+    except Exception:
+        raise HTTPException(status_code=503, detail="storage unavailable")
+
+
+@router.get("/export")
+def export_runs(
+    kind: Literal["runs", "findings"] = "runs",
+    format: Literal["ndjson", "csv", "parquet"] = "ndjson",
+    repo: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+):
+    """Stream every matching run or finding, oldest first, in constant memory."""
+    records = get_storage().export(kind, repo=repo, since=since, until=until)
+    try:
+        body = WRITERS[format](records, EXPORT_FIELDS[kind])
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=501, detail=str(e))
+    return StreamingResponse(
+        body,
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'},
+    )
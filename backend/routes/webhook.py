@@ -4,11 +4,15 @@ import json
 from typing import Any, Dict, Optional
 
 from fastapi import APIRouter, Header, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
 
-from ..models import RunRequest
-from ..orchestrator import execute_run
-from ..services.github_client import GitHubClient
+from ..models import RunRequest, RunSummary, StatusResponse
+from ..services.github_client import get_github_client
+from ..orchestrator import new_run_id
+from ..services.jobs import Job, JobQueueFull
+from ..services.status_cache import get_status_cache
 from ..services.webhook_verify import verify_github_signature
+from .runs import enqueue_run, request_cancel, run_job
 
 router = APIRouter(prefix="/webhook", tags=["webhook"])
 
@@ -36,6 +40,66 @@ def _extract_pr_payload(evt: Dict[str, Any]) -> Optional[RunRequest]:
     )
 
 
+def _run_and_comment(req: RunRequest, job: Job) -> None:
+    cache = get_status_cache()
+    try:
+        status_doc = run_job(req, job)
+        if status_doc.status != "completed" or not status_doc.llm_comment_markdown:
+            return
+        # a newer head may have arrived on any worker while this one ran
+        head = cache.pr_head(req.repo, req.pr_number)
+        if head is None or head[1] != job.run_id:
+            return
+        gh = get_github_client()
+        gh.run_sync(gh.upsert_pr_comment(req.repo, req.pr_number, status_doc.llm_comment_markdown))
+    finally:
+        cache.release_pr_head(req.repo, req.pr_number, job.run_id)
+
+
+def _start_run(req: RunRequest) -> Dict[str, Any]:
+    # the head per PR lives in the status cache's shared tier, so deliveries coalesce across workers;
+    # the run's status is published first so no worker mistakes a claimed head for an abandoned one
+    cache = get_status_cache()
+    run_id = new_run_id()
+    cache.put(StatusResponse(run_id=run_id, status="running", summary=RunSummary()))
+    prev = cache.claim_pr_head(req.repo, req.pr_number, req.commit_sha, run_id)
+    if prev is not None and prev[0] == req.commit_sha:
+        prev_doc = cache.get(prev[1])
+        if prev_doc is None or prev_doc.status != "running":
+            # that run finished or its worker died; take the head over
+            cache.release_pr_head(req.repo, req.pr_number, prev[1])
+            prev = cache.claim_pr_head(req.repo, req.pr_number, req.commit_sha, run_id)
+        if prev is not None and prev[0] == req.commit_sha:
+            cache.pop(run_id)
+            return {
+                "ok": True,
+                "run_id": prev[1],
+                "repo": req.repo,
+                "pr_number": req.pr_number,
+                "status": "running",
+                "deduplicated": True,
+            }
+
+    try:
+        running = enqueue_run(req, lambda job: _run_and_comment(req, job), run_id=run_id)
+    except JobQueueFull:
+        cache.release_pr_head(req.repo, req.pr_number, run_id, previous=prev)
+        raise HTTPException(status_code=503, detail="run queue is full, retry later")
+
+    superseded = None
+    if prev is not None and request_cancel(prev[1], reason="superseded") is not None:
+        superseded = prev[1]
+
+    return {
+        "ok": True,
+        "run_id": running.run_id,
+        "repo": req.repo,
+        "pr_number": req.pr_number,
+        "status": running.status,
+        "superseded": superseded,
+    }
+
+
 @router.post("")
 async def github_webhook(
     request: Request,
@@ -55,19 +119,5 @@ async def github_webhook(
     if req is None:
         return {"ok": True, "ignored": "unsupported_action_or_payload"}
 
-    status_doc = execute_run(req)
-
-    
-    gh = GitHubClient()
-    if status_doc.llm_comment_markdown:
-        await gh.post_pr_comment(req.repo, req.pr_number, status_doc.llm_comment_markdown)
-
-    return {
-        "ok": True,
-        "run_id": status_doc.run_id,
-        "repo": req.repo,
-        "pr_number": req.pr_number,
-        "summary": status_doc.summary.model_dump(),
-        "safe_to_merge": status_doc.safe_to_merge,
-        "self_check": status_doc.self_check,
-    }
+    # the raw body is needed for the signature, but everything from here on blocks on SQLite
+    return await run_in_threadpool(_start_run, req)
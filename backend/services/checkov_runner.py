@@ -1,12 +1,43 @@
 from __future__ import annotations
 
 import json
+import logging
 import os
+import re
 import subprocess
+import tempfile
+from functools import lru_cache
 from pathlib import Path
-from typing import List
+from typing import IO, Dict, Iterable, Iterator, List, Optional
 
+from ..config.settings import get_settings
 from ..models import Finding
+from .checkov_workers import WorkerTimeout, get_checkov_pool
+from .incremental import incremental_scan, unit_of
+from .telemetry import SUBPROCESSES
+
+
+logger = logging.getLogger(__name__)
+
+CHECKOV_ARGS = ["-o", "json", "--framework", "terraform"]
+# keep `-f` argument lists well under ARG_MAX
+MAX_FILES_PER_CALL = 200
+# the report is read this much at a time; only one failed check is held whole
+READ_CHUNK = 64 * 1024
+# a single failed check bigger than this (a huge code_block) is skipped
+MAX_CHECK_BYTES = 1024 * 1024
+# findings kept per scan; beyond this the rest are counted and dropped
+MAX_FINDINGS = 100_000
+
+
+@lru_cache(maxsize=1)
+def checkov_version() -> str:
+    SUBPROCESSES.inc(tool="checkov")
+    try:
+        proc = subprocess.run(["checkov", "--version"], capture_output=True, text=True, check=False, timeout=60)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return "missing"
+    return (proc.stdout or "").strip() or "unknown"
 
 
 def _rel_file(base_dir: str, file_path: str) -> str:
@@ -17,56 +48,227 @@ def _rel_file(base_dir: str, file_path: str) -> str:
 
 
 def run_checkov(base_dir: str) -> List[Finding]:
-    
-    cmd = ["checkov", "-d", base_dir, "-o", "json"]
+    fingerprint = f"{checkov_version()}|{' '.join(CHECKOV_ARGS)}"
+
+    def scan_units(units: Dict[str, List[Path]], complete: bool) -> Dict[str, Optional[List[Finding]]]:
+        out: Dict[str, Optional[List[Finding]]] = {}
+        if complete:
+            findings = _scan(base_dir)
+            if findings is None:
+                return {u: None for u in units}
+        else:
+            root = Path(base_dir)
+            files = sorted(p.relative_to(root).as_posix() for fs in units.values() for p in fs)
+            findings = []
+            for chunk in _chunks(files):
+                found = _scan(base_dir, chunk)
+                if found is None:
+                    out.update((unit_of(f), None) for f in chunk)
+                else:
+                    findings.extend(found)
+        for f in findings:
+            bucket = out.setdefault(unit_of(f.file), [])
+            if bucket is not None:
+                bucket.append(f)
+        return out
+
+    return incremental_scan("checkov", fingerprint, base_dir, scan_units)
+
+
+def _chunks(files: List[str]) -> Iterator[List[str]]:
+    for i in range(0, len(files), MAX_FILES_PER_CALL):
+        yield files[i : i + MAX_FILES_PER_CALL]
+
+
+def scan_checkov_files(base_dir: str, files: List[str]) -> Optional[List[Finding]]:
+    """Uncached scan of specific files, given relative to base_dir; None if checkov failed."""
+    findings: List[Finding] = []
+    for chunk in _chunks(sorted(files)):
+        found = _scan(base_dir, chunk)
+        if found is None:
+            return None
+        findings.extend(found)
+    return findings
+
+
+def _scan(base_dir: str, files: Optional[List[str]] = None) -> Optional[List[Finding]]:
+    """Failed checks from one checkov run; None when checkov is missing, crashed or timed out."""
+    # paths are relative to cwd=base_dir, so `-f` and `-d` scans report the same files
+    if files:
+        argv = [*[arg for f in files for arg in ("-f", f)], *CHECKOV_ARGS]
+    else:
+        argv = ["-d", ".", *CHECKOV_ARGS]
+    cwd = base_dir if os.path.isdir(base_dir) else os.getcwd()
+
+    # the report goes to a temp file rather than a pipe so a warm worker and
+    # the CLI hand it over the same way, and it is read back in chunks
+    with tempfile.NamedTemporaryFile("w+", encoding="utf-8", prefix="autoinfra-checkov-", suffix=".json") as out:
+        pool = get_checkov_pool()
+        try:
+            returncode = pool.run(argv, cwd, out.name) if pool is not None else None
+        except WorkerTimeout as e:
+            # the CLI would take as long again; report the scan as failed instead
+            logger.warning("%s", e)
+            return None
+        if returncode is None:
+            out.seek(0)
+            out.truncate()
+            returncode = _scan_cli(["checkov", *argv], cwd, out)
+        # 0: all passed, 1: some failed; anything else is a crash or usage error
+        if returncode not in (0, 1):
+            return None
+        out.seek(0)
+        findings: List[Finding] = []
+        dropped = 0
+        for item in iter_failed_checks(iter(lambda: out.read(READ_CHUNK), "")):
+            if len(findings) < MAX_FINDINGS:
+                findings.append(_finding(base_dir, item))
+            else:
+                dropped += 1
+    if dropped:
+        logger.warning("checkov reported %d more failed checks than the %d kept", dropped, MAX_FINDINGS)
+    return findings
+
+
+def _finding(base_dir: str, item: dict) -> Finding:
+    rule_id = item.get("check_id") or item.get("id") or "CKV_UNKNOWN"
+    severity = (item.get("severity") or "MEDIUM").upper()
+    # repo_file_path is relative to cwd (base_dir); with `-f`, file_path drops the file's directories
+    file_path = item.get("repo_file_path") or item.get("file_path") or item.get("file")
+    line = 0
+    flr = item.get("file_line_range") or []
+    if isinstance(flr, list) and flr:
+        try:
+            line = int(flr[0])
+        except Exception:
+            line = 0
+    message = item.get("check_name") or item.get("guideline") or "Policy violation"
+    return Finding(
+        tool="checkov",
+        rule_id=str(rule_id),
+        severity=severity,
+        file=_rel_file(base_dir, file_path or "unknown"),
+        line=line,
+        message=str(message),
+    )
+
+
+def _scan_cli(cmd: List[str], cwd: str, out: IO[str]) -> Optional[int]:
+    """A cold `checkov` process, for when no warm worker can take the scan."""
+    SUBPROCESSES.inc(tool="checkov")
     try:
         proc = subprocess.run(
-            cmd,
-            capture_output=True,
-            text=True,
-            check=False,
-            cwd=base_dir if os.path.isdir(base_dir) else None,
+            cmd, stdout=out, stderr=subprocess.DEVNULL, check=False, cwd=cwd, timeout=get_settings().checkov_timeout_s
         )
-    except FileNotFoundError:
-        
-        return []
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    return proc.returncode
 
-    if proc.returncode not in (0, 2):  
-        
-        return []
 
-    try:
-        payload = json.loads(proc.stdout or "{}")
-    except json.JSONDecodeError:
-        return []
+# one JSON token: a string, a structural character, or a bare scalar
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[{}\[\]:,]|[^\s{}\[\]:,"]+')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+_SPACE = re.compile(r"\s*")
+_DECODER = json.JSONDecoder()
 
-    results = payload.get("results") or {}
-    failed = results.get("failed_checks") or []
 
-    findings: List[Finding] = []
-    for item in failed:
-        rule_id = item.get("check_id") or item.get("id") or "CKV_UNKNOWN"
-        severity = (item.get("severity") or "MEDIUM").upper()
-        file_path = item.get("file_path") or item.get("repo_file_path") or item.get("file")
-        
-        line = 0
-        flr = item.get("file_line_range") or []
-        if isinstance(flr, list) and flr:
-            try:
-                line = int(flr[0])
-            except Exception:
-                line = 0
-        message = item.get("check_name") or item.get("guideline") or "Policy violation"
-
-        findings.append(
-            Finding(
-                tool="checkov",
-                rule_id=str(rule_id),
-                severity=severity,  
-                file=_rel_file(base_dir, file_path or "unknown"),
-                line=line,
-                message=str(message),
-            )
-        )
+class _Frame:
+    __slots__ = ("kind", "under", "key", "expect_key")
 
-    return findings
+    def __init__(self, kind: str, under: Optional[str]) -> None:
+        self.kind = kind
+        self.under = under  # key of the parent object this container is the value of
+        self.key: Optional[str] = None  # objects: the key whose value comes next
+        self.expect_key = kind == "{"
+
+
+def _report_depth(stack: List[_Frame]) -> int:
+    # root{ results{ ... } } or, with several frameworks, root[ report{ results{ ... } } ]
+    return 1 if stack[0].kind == "{" else 2
+
+
+def _descend(stack: List[_Frame], c: str, under: Optional[str]) -> bool:
+    """Whether a container opening here is part of the report skeleton rather than a value to decode whole."""
+    if not stack:
+        return True
+    depth = _report_depth(stack)
+    if len(stack) < depth:
+        return c == "{"  # a report in the list
+    if len(stack) == depth:
+        return c == "{" and under == "results"
+    return len(stack) == depth + 1 and c == "[" and stack[-1].under == "results"
+
+
+def iter_failed_checks(chunks: Iterable[str], max_item_bytes: int = MAX_CHECK_BYTES) -> Iterator[dict]:
+    """
+    Each object of every `results.failed_checks` array in a checkov JSON
+    report, decoded one at a time as the text streams in. Handles both the
+    single-framework dict and the multi-framework list. Only the report
+    skeleton is tokenized here; each array element and other value is
+    decoded whole by the C decoder and dropped unless it is a failed check,
+    so memory is bounded by the largest element, not the report. An
+    element over `max_item_bytes` is skipped token by token instead.
+    """
+    buf = ""
+    pos = 0
+    stack: List[_Frame] = []
+    skip: Optional[int] = None  # container depth while skipping an oversized value
+    for chunk in chunks:
+        buf += chunk
+        while True:
+            pos = _SPACE.match(buf, pos).end()
+            if pos >= len(buf):
+                break
+            if skip is not None:
+                m = _TOKEN.match(buf, pos)
+                if m is None:
+                    break
+                tok, pos = m.group(), m.end()
+                skip += 1 if tok in ("{", "[") else -1 if tok in ("}", "]") else 0
+                if skip <= 0:
+                    skip = None
+                continue
+            c = buf[pos]
+            top = stack[-1] if stack else None
+            if c in "}]":
+                if stack:
+                    stack.pop()
+                pos += 1
+                continue
+            if c == "," or c == ":":
+                if c == "," and top is not None and top.kind == "{":
+                    top.expect_key = True
+                pos += 1
+                continue
+            if top is not None and top.expect_key:
+                m = _STRING.match(buf, pos)
+                if m is None:
+                    break  # the key continues in the next chunk
+                top.key, top.expect_key, pos = json.loads(m.group()), False, m.end()
+                continue
+            under = top.key if top is not None and top.kind == "{" else None
+            if c in "{[" and _descend(stack, c, under):
+                stack.append(_Frame(c, under))
+                pos += 1
+                continue
+            failed = (
+                top is not None and top.kind == "[" and top.under == "failed_checks" and len(stack) == _report_depth(stack) + 2
+            )
+            try:
+                value, end = _DECODER.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                # incomplete; wait for more unless it has outgrown the limit
+                if len(buf) - pos > max_item_bytes:
+                    if failed:
+                        logger.warning("skipping a checkov failed check larger than %d bytes", max_item_bytes)
+                    skip = 0
+                    continue
+                break
+            size, pos = end - pos, end
+            if not failed or not isinstance(value, dict):
+                continue
+            if size > max_item_bytes:
+                logger.warning("skipping a checkov failed check larger than %d bytes", max_item_bytes)
+                continue
+            yield value
+        buf, pos = buf[pos:], 0
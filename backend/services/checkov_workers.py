@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import atexit
+import multiprocessing
+import os
+import queue
+import resource
+import threading
+from contextlib import redirect_stdout
+from multiprocessing.connection import Connection
+from typing import Dict, List, Optional
+
+from ..config.settings import get_settings
+from .telemetry import SUBPROCESSES
+
+# a fresh interpreter per worker: forking the API process would copy its threads' locks
+_CTX = multiprocessing.get_context("spawn")
+# first message from a worker: whether checkov imported
+READY_TIMEOUT_S = 120.0
+
+
+class WorkerUnavailable(RuntimeError):
+    """A worker could not take or finish a scan; the caller should use the CLI."""
+
+
+class WorkerTimeout(RuntimeError):
+    """A scan outran the timeout; rerunning it on the CLI would only take as long again."""
+
+
+def _peak_rss_mb() -> float:
+    # ru_maxrss is in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def _worker_main(conn: Connection) -> None:
+    """Import checkov once, then run one `checkov` argv per message until told to stop."""
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    # checkov logs to stderr and prints progress; only the captured report matters
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    try:
+        from checkov.main import Checkov  # type: ignore
+    except Exception as e:
+        conn.send(("unavailable", repr(e)))
+        return
+    conn.send(("ready", ""))
+
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return
+        if msg is None:
+            return
+        argv, cwd, out_path = msg
+        try:
+            os.chdir(cwd)
+            with open(out_path, "w", encoding="utf-8") as out, redirect_stdout(out):
+                code = Checkov(argv=list(argv)).run()
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 2
+        except Exception:
+            code = -1
+        conn.send((int(code or 0), _peak_rss_mb()))
+
+
+class CheckovWorker:
+    def __init__(self) -> None:
+        self.conn, child = _CTX.Pipe()
+        # not a daemon: checkov forks its own children to parallelize a scan
+        self.process = _CTX.Process(target=_worker_main, args=(child,), name="checkov-worker")
+        self.process.start()
+        child.close()
+        self.scans = 0
+        self.rss_mb = 0.0
+        SUBPROCESSES.inc(tool="checkov-worker")
+
+    def wait_ready(self, timeout: float = READY_TIMEOUT_S) -> bool:
+        """True once checkov is imported; False when the worker cannot import it."""
+        try:
+            if not self.conn.poll(timeout):
+                raise WorkerUnavailable("checkov worker did not start")
+            state, _ = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise WorkerUnavailable(f"checkov worker exited on startup: {e!r}") from e
+        return state == "ready"
+
+    def scan(self, argv: List[str], cwd: str, out_path: str, timeout: float) -> int:
+        try:
+            self.conn.send((argv, cwd, out_path))
+            if not self.conn.poll(timeout):
+                raise WorkerTimeout(f"checkov scan timed out after {timeout:.0f}s")
+            code, self.rss_mb = self.conn.recv()
+        except (EOFError, OSError) as e:
+            raise WorkerUnavailable(f"checkov worker died: {e!r}") from e
+        self.scans += 1
+        return code
+
+    def stop(self, kill: bool = False) -> None:
+        """Ask the worker to exit, or with `kill` (a stuck scan) not wait for it to."""
+        if not kill:
+            try:
+                self.conn.send(None)
+            except (OSError, ValueError):
+                pass
+            self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join(timeout=5)
+        self.conn.close()
+
+
+class CheckovWorkerPool:
+    """
+    Long-lived processes that import checkov once and run scans handed to
+    them over a pipe, each writing its report to a file, instead of a cold
+    `checkov` CLI per scan. At most `size` scans run at once; a worker is
+    replaced after `max_scans` scans or once its peak RSS passes
+    `max_rss_mb`, and killed if a scan exceeds `timeout_s`. When no worker
+    can take a scan, `run` returns None and callers use the CLI; a scan
+    that timed out raises WorkerTimeout instead.
+    """
+
+    def __init__(self, size: int = 2, max_scans: int = 50, max_rss_mb: int = 1024, timeout_s: float = 600.0) -> None:
+        self.size = max(1, int(size))
+        self.max_scans = max(1, int(max_scans))
+        self.max_rss_mb = float(max_rss_mb)
+        self.timeout_s = float(timeout_s)
+        self.available = True
+        self.counters: Dict[str, int] = {"scans": 0, "started": 0, "recycled": 0, "failed": 0}
+
+        self._idle: "queue.LifoQueue[CheckovWorker]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _checkout(self) -> Optional[CheckovWorker]:
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        worker = CheckovWorker()
+        with self._lock:
+            self.counters["started"] += 1
+        try:
+            ready = worker.wait_ready()
+        except WorkerUnavailable:
+            worker.stop()
+            raise
+        if not ready:
+            worker.stop()
+            self.available = False
+            return None
+        return worker
+
+    def _checkin(self, worker: CheckovWorker) -> None:
+        if self._closed:
+            worker.stop()
+        elif worker.scans >= self.max_scans or worker.rss_mb > self.max_rss_mb:
+            with self._lock:
+                self.counters["recycled"] += 1
+            worker.stop()
+        else:
+            self._idle.put(worker)
+
+    def run(self, argv: List[str], cwd: str, out_path: str) -> Optional[int]:
+        """
+        `checkov <argv>` run from `cwd` on a warm worker, its report written
+        to `out_path`. The return code, or None to fall back to the CLI.
+        Raises WorkerTimeout, after killing the worker, if the scan ran over.
+        """
+        if not self.available or self._closed:
+            return None
+        with self._slots:
+            worker: Optional[CheckovWorker] = None
+            try:
+                worker = self._checkout()
+                if worker is None:
+                    return None
+                code = worker.scan(argv, cwd, out_path, self.timeout_s)
+            except (WorkerUnavailable, WorkerTimeout) as e:
+                with self._lock:
+                    self.counters["failed"] += 1
+                if worker is not None:
+                    worker.stop(kill=isinstance(e, WorkerTimeout))
+                if isinstance(e, WorkerTimeout):
+                    raise
+                return None
+            with self._lock:
+                self.counters["scans"] += 1
+            self._checkin(worker)
+            return code
+
+    def warm(self) -> None:
+        """Start every worker now rather than on the first scans."""
+        started = []
+        for _ in range(self.size):
+            with self._slots:
+                worker = self._checkout()
+            if worker is None:
+                break
+            started.append(worker)
+        for worker in started:
+            self._checkin(worker)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {"available": self.available, "size": self.size, "idle": self._idle.qsize(), **self.counters}
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().stop()
+            except queue.Empty:
+                return
+
+
+_POOL: Optional[CheckovWorkerPool] = None
+_POOL_LOCK = threading.Lock()
+
+
+def get_checkov_pool() -> Optional[CheckovWorkerPool]:
+    """Shared warm checkov workers; None when CHECKOV_WORKERS is 0 or inside a pool worker."""
+    global _POOL
+    if multiprocessing.parent_process() is not None:
+        return None
+    with _POOL_LOCK:
+        if _POOL is None:
+            s = get_settings()
+            if int(s.checkov_workers) <= 0:
+                return None
+            _POOL = CheckovWorkerPool(
+                size=s.checkov_workers,
+                max_scans=s.checkov_worker_max_scans,
+                max_rss_mb=s.checkov_worker_max_rss_mb,
+                timeout_s=s.checkov_timeout_s,
+            )
+        return _POOL
+
+
+def shutdown_checkov_pool() -> None:
+    global _POOL
+    with _POOL_LOCK:
+        pool, _POOL = _POOL, None
+    if pool is not None:
+        pool.close()
+
+
+# non-daemon workers would otherwise keep the interpreter waiting on exit
+atexit.register(shutdown_checkov_pool)
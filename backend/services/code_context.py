@@ -4,14 +4,13 @@ from pathlib import Path
 from typing import Dict, List
 
 from ..models import Finding
+from .hcl_index import parse_file
 
 
 def _read_file_lines(root: Path, rel_path: str) -> List[str]:
-    try:
-        text = (root / rel_path).read_text(encoding="utf-8", errors="ignore")
-        return text.splitlines()
-    except Exception:
-        return []
+    # checkov reports paths relative to the scan root with a leading "/"
+    pf = parse_file(root / rel_path.lstrip("/"))
+    return pf.lines if pf is not None else []
 
 
 def attach_code_context(findings: List[Finding], base_dir: str, context_radius: int = 3) -> List[Finding]:
@@ -1,6 +1,12 @@
 from __future__ import annotations
+
+import itertools
+import re
 from typing import Any, Iterable, List, Tuple
 
+# one suggested patch: optional "**title**" line, then its diff fence
+SUGGESTED_PATCH_RE = re.compile(r"(?:\*\*[^\n]*\*\*\n)?```diff\s+.+?```\n*", re.DOTALL)
+
 
 def _norm_findings(findings: Iterable[Any]) -> List[dict]:
     
@@ -96,3 +102,15 @@ def compose_comment(
         f"{suggested_section}\n"
     )
     return md
+
+
+def drop_patches(markdown: str, indices: Iterable[int]) -> str:
+    """Remove suggested patches (by order of appearance) that the self-check found unhelpful."""
+    doomed = set(indices)
+    if not doomed:
+        return markdown
+    counter = itertools.count()
+    md = SUGGESTED_PATCH_RE.sub(lambda m: "" if next(counter) in doomed else m.group(0), markdown)
+    if "```diff" not in md:
+        md = md.replace("### Suggested patches\n", "")
+    return md
@@ -1,13 +1,11 @@
 from __future__ import annotations
 
-import re
 from collections import Counter
 from pathlib import Path
-from typing import Dict
-
-
-RESOURCE_RE = re.compile(r'resource\s+"(?P<type>[a-zA-Z0-9_]+)"\s+"[^"]*"\s*{', re.MULTILINE)
+from typing import Dict, List
 
+from .hcl_index import parse_file
+from .parallel import map_chunked
 
 
 COST_TABLE: Dict[str, float] = {
@@ -19,16 +17,21 @@ COST_TABLE: Dict[str, float] = {
 }
 
 
-def _scan_tf_for_resources(base_dir: str) -> Counter:
+def _count_resources(files: List[Path]) -> Counter:
     c = Counter()
-    for p in Path(base_dir).rglob("*.tf"):
-        try:
-            text = p.read_text(encoding="utf-8", errors="ignore")
-        except Exception:
+    for p in files:
+        pf = parse_file(p)
+        if pf is None:
             continue
-        for m in RESOURCE_RE.finditer(text):
-            rtype = m.group("type")
-            c[rtype] += 1
+        for r in pf.resources():
+            c[r.resource_type] += 1
+    return c
+
+
+def _scan_tf_for_resources(base_dir: str) -> Counter:
+    c = Counter()
+    for part in map_chunked(_count_resources, sorted(Path(base_dir).rglob("*.tf"))):
+        c.update(part)
     return c
 
 
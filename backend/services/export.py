@@ -0,0 +1,112 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Sequence
+
+# records buffered per CSV/Parquet chunk handed to the response
+EXPORT_BATCH_ROWS = 1000
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+# Arrow column types for storage.EXPORT_FIELDS; anything not listed is a string.
+# Fixed up front so a batch where a column is all null can't pin it to the null type.
+PARQUET_TYPES = {
+    "pr_number": "int64",
+    "duration_ms": "int64",
+    "issues": "int64",
+    "fails": "int64",
+    "line": "int64",
+    "cost_usd_month": "float64",
+    "created_at": "timestamp",
+}
+
+
+class ExportUnavailable(RuntimeError):
+    """The requested format needs an optional dependency that is not installed."""
+
+
+def _plain(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def iter_ndjson(records: Iterable[Dict[str, Any]], fields: Sequence[str]) -> Iterator[bytes]:
+    for rec in records:
+        yield (json.dumps({f: _plain(rec.get(f)) for f in fields}, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def iter_csv(records: Iterable[Dict[str, Any]], fields: Sequence[str]) -> Iterator[bytes]:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(fields)
+    n = 0
+    for rec in records:
+        writer.writerow([_plain(rec.get(f)) for f in fields])
+        n += 1
+        if n % EXPORT_BATCH_ROWS == 0:
+            yield buf.getvalue().encode("utf-8")
+            buf.seek(0)
+            buf.truncate()
+    yield buf.getvalue().encode("utf-8")
+
+
+class _Sink(io.RawIOBase):
+    """Write-only file that hands its bytes back on drain(), so Parquet can be streamed."""
+
+    def __init__(self) -> None:
+        self._chunks: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, b: Any) -> int:
+        self._chunks.append(bytes(b))
+        return len(b)
+
+    def drain(self) -> bytes:
+        out, self._chunks = b"".join(self._chunks), []
+        return out
+
+
+def iter_parquet(records: Iterable[Dict[str, Any]], fields: Sequence[str]) -> Iterator[bytes]:
+    """One row group per EXPORT_BATCH_ROWS records; needs pyarrow."""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError as e:
+        raise ExportUnavailable("parquet export needs pyarrow installed") from e
+
+    types = {"int64": pa.int64(), "float64": pa.float64(), "timestamp": pa.timestamp("us")}
+    schema = pa.schema([(f, types.get(PARQUET_TYPES.get(f, ""), pa.string())) for f in fields])
+
+    def _table(batch: List[Dict[str, Any]]) -> "pa.Table":
+        return pa.Table.from_pydict({f: [rec.get(f) for rec in batch] for f in fields}, schema=schema)
+
+    def _gen() -> Iterator[bytes]:
+        sink = _Sink()
+        writer = None
+        batch: List[Dict[str, Any]] = []
+        for rec in records:
+            batch.append(rec)
+            if len(batch) < EXPORT_BATCH_ROWS:
+                continue
+            writer = writer or pq.ParquetWriter(sink, schema)
+            writer.write_table(_table(batch))
+            batch = []
+            yield sink.drain()
+        if batch or writer is None:
+            writer = writer or pq.ParquetWriter(sink, schema)
+            writer.write_table(_table(batch))
+        writer.close()
+        yield sink.drain()
+
+    return _gen()
+
+
+WRITERS = {"ndjson": iter_ndjson, "csv": iter_csv, "parquet": iter_parquet}
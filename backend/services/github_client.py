@@ -1,21 +1,97 @@
 from __future__ import annotations
 
-import json
-from typing import Optional
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Dict, Optional, Tuple, TypeVar
 
 import httpx
 
 from ..config.settings import get_settings
 
+T = TypeVar("T")
+
+# first line of the one comment we keep per PR
+COMMENT_MARKER = "<!-- autoinfra-copilot -->"
+# longest we sleep for a rate-limit reset before giving up on a call
+MAX_RATE_LIMIT_WAIT_S = 60.0
+RATE_LIMIT_RETRIES = 2
+ETAG_CACHE_ENTRIES = 512
+COMMENT_ID_ENTRIES = 4096
+
+
+class GitHubRateLimited(RuntimeError):
+    """GitHub asked us to back off for longer than MAX_RATE_LIMIT_WAIT_S."""
+
+
+class TokenBucket:
+    """
+    Client-side request budget shared by every call. Refills at `rate` per
+    second up to `capacity`; GitHub's own headers can pause it outright
+    (X-RateLimit-Remaining: 0 until the reset, or Retry-After).
+    """
+
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def wait_time(self) -> float:
+        return max(0.0, self.paused_until - time.monotonic())
+
+    async def acquire(self) -> None:
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
 
 class GitHubClient:
-    
+    """
+    GitHub REST calls over one pooled keep-alive AsyncClient. Coroutines run
+    on the client's own event loop thread (see `run_sync`), so worker
+    threads share connections instead of handshaking per call.
+    """
 
-    def __init__(self, token: Optional[str] = None) -> None:
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        rate_per_s: Optional[float] = None,
+        burst: Optional[int] = None,
+    ) -> None:
         s = get_settings()
         self.token = (token or s.github_token).strip()
-        self.base = "https://api.github.com"
+        self.base = (base_url or s.github_api_url).rstrip("/")
         self.enabled = bool(self.token)
+        self.max_connections = int(max_connections or s.github_max_connections)
+        self.bucket = TokenBucket(rate_per_s or s.github_rate_per_s, burst or s.github_burst)
+        self.counters: Dict[str, int] = {"requests": 0, "not_modified": 0, "rate_limited": 0}
+
+        self._http: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        # url -> (etag, json body) for conditional GETs; 304s don't count against the quota
+        self._etags: "OrderedDict[str, Tuple[str, Any]]" = OrderedDict()
+        # (repo, pr) -> id of our sticky comment
+        self._comment_ids: "OrderedDict[Tuple[str, int], int]" = OrderedDict()
 
     def _headers(self) -> dict:
         return {
@@ -24,24 +100,143 @@ class GitHubClient:
             "User-Agent": "autoinfra-copilot",
         }
 
+    def run_sync(self, coro: Awaitable[T], timeout: float = 120.0) -> T:
+        """Run a coroutine of this client on its loop thread and wait for it."""
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever, name="github-client", daemon=True)
+                self._thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self._loop).result(timeout)
+
+    def close(self) -> None:
+        if self._loop is None:
+            return
+        if self._http is not None:
+            asyncio.run_coroutine_threadsafe(self._http.aclose(), self._loop).result(10)
+            self._http = None
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        assert self._thread is not None
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+
+    def _client(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(
+                base_url=self.base,
+                headers=self._headers(),
+                timeout=10,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._http
+
+    def _note_limits(self, resp: httpx.Response) -> bool:
+        """Pause the bucket from GitHub's rate-limit headers; True if the call was throttled."""
+        retry_after = resp.headers.get("Retry-After")
+        remaining = resp.headers.get("X-RateLimit-Remaining")
+        if retry_after is not None:
+            self.bucket.pause(float(retry_after))
+        elif remaining == "0":
+            reset = float(resp.headers.get("X-RateLimit-Reset") or 0)
+            self.bucket.pause(max(0.0, reset - time.time()) if reset else MAX_RATE_LIMIT_WAIT_S)
+        throttled = resp.status_code == 429 or (resp.status_code == 403 and (retry_after is not None or remaining == "0"))
+        if throttled:
+            self.counters["rate_limited"] += 1
+        return throttled
+
+    async def _request(self, method: str, path: str, json: Any = None) -> httpx.Response:
+        cached = self._etags.get(path) if method == "GET" else None
+        headers = {"If-None-Match": cached[0]} if cached else None
+        for _ in range(RATE_LIMIT_RETRIES + 1):
+            if self.bucket.wait_time() > MAX_RATE_LIMIT_WAIT_S:
+                raise GitHubRateLimited(f"rate limited for {self.bucket.wait_time():.0f}s")
+            await self.bucket.acquire()
+            self.counters["requests"] += 1
+            resp = await self._client().request(method, path, json=json, headers=headers)
+            if not self._note_limits(resp):
+                break
+        return resp
+
+    async def _get_json(self, path: str) -> Any:
+        resp = await self._request("GET", path)
+        if resp.status_code == 304:
+            self.counters["not_modified"] += 1
+            self._etags.move_to_end(path)
+            return self._etags[path][1]
+        resp.raise_for_status()
+        body = resp.json()
+        etag = resp.headers.get("ETag")
+        if etag:
+            self._etags[path] = (etag, body)
+            self._etags.move_to_end(path)
+            while len(self._etags) > ETAG_CACHE_ENTRIES:
+                self._etags.popitem(last=False)
+        return body
+
+    def _remember_comment(self, key: Tuple[str, int], comment_id: int) -> None:
+        self._comment_ids[key] = comment_id
+        self._comment_ids.move_to_end(key)
+        while len(self._comment_ids) > COMMENT_ID_ENTRIES:
+            self._comment_ids.popitem(last=False)
+
+    async def _find_comment(self, repo_full_name: str, pr_number: int) -> Optional[int]:
+        page = 1
+        while True:
+            comments = await self._get_json(
+                f"/repos/{repo_full_name}/issues/{int(pr_number)}/comments?per_page=100&page={page}"
+            )
+            for c in comments:
+                if (c.get("body") or "").startswith(COMMENT_MARKER):
+                    return int(c["id"])
+            if len(comments) < 100:
+                return None
+            page += 1
+
+    async def upsert_pr_comment(self, repo_full_name: str, pr_number: int, markdown_body: str) -> bool:
+        """Keep one marker-tagged comment per PR: found once, then edited in place."""
+        if not self.enabled:
+            return False
+        key = (repo_full_name, int(pr_number))
+        body = {"body": f"{COMMENT_MARKER}\n{markdown_body}"}
+        try:
+            comment_id = self._comment_ids.get(key)
+            if comment_id is None:
+                comment_id = await self._find_comment(repo_full_name, pr_number)
+            if comment_id is not None:
+                resp = await self._request("PATCH", f"/repos/{repo_full_name}/issues/comments/{comment_id}", json=body)
+                if resp.status_code == 200:
+                    self._remember_comment(key, comment_id)
+                    return True
+                if resp.status_code != 404:
+                    return False
+                # deleted by someone; post a fresh one
+                self._comment_ids.pop(key, None)
+            resp = await self._request("POST", f"/repos/{repo_full_name}/issues/{int(pr_number)}/comments", json=body)
+            if resp.status_code != 201:
+                return False
+            self._remember_comment(key, int(resp.json()["id"]))
+            return True
+        except Exception:
+            return False
+
     async def post_pr_comment(
         self,
-        repo_full_name: str,  
+        repo_full_name: str,
         pr_number: int,
         markdown_body: str,
     ) -> bool:
-        
+
         if not self.enabled:
             return False
 
-        url = f"{self.base}/repos/{repo_full_name}/issues/{int(pr_number)}/comments"
-
-        async with httpx.AsyncClient(timeout=10) as client:
-            try:
-                resp = await client.post(url, headers=self._headers(), json={"body": markdown_body})
-                return resp.status_code in (200, 201)
-            except Exception:
-                return False
+        try:
+            resp = await self._request(
+                "POST", f"/repos/{repo_full_name}/issues/{int(pr_number)}/comments", json={"body": markdown_body}
+            )
+            return resp.status_code in (200, 201)
+        except Exception:
+            return False
 
     async def create_pr_review(
         self,
@@ -50,16 +245,33 @@ class GitHubClient:
         body: str,
         event: str = "COMMENT",
     ) -> bool:
-        
+
         if not self.enabled:
             return False
 
-        url = f"{self.base}/repos/{repo_full_name}/pulls/{int(pr_number)}/reviews"
         payload = {"body": body, "event": event}
+        try:
+            resp = await self._request("POST", f"/repos/{repo_full_name}/pulls/{int(pr_number)}/reviews", json=payload)
+            return resp.status_code in (200, 201)
+        except Exception:
+            return False
 
-        async with httpx.AsyncClient(timeout=10) as client:
-            try:
-                resp = await client.post(url, headers=self._headers(), json=payload)
-                return resp.status_code in (200, 201)
-            except Exception:
-                return False
+
+_CLIENT_SINGLETON: Optional[GitHubClient] = None
+_CLIENT_LOCK = threading.Lock()
+
+
+def get_github_client() -> GitHubClient:
+    global _CLIENT_SINGLETON
+    with _CLIENT_LOCK:
+        if _CLIENT_SINGLETON is None:
+            _CLIENT_SINGLETON = GitHubClient()
+        return _CLIENT_SINGLETON
+
+
+def shutdown_github_client() -> None:
+    global _CLIENT_SINGLETON
+    with _CLIENT_LOCK:
+        client, _CLIENT_SINGLETON = _CLIENT_SINGLETON, None
+    if client is not None:
+        client.close()
@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import re
+import threading
+from bisect import bisect_right
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_IDENT_START = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_")
+_IDENT_CHARS = _IDENT_START | frozenset("0123456789-")
+_OPENERS = {"{": "}", "[": "]", "(": ")"}
+_CLOSERS = frozenset("}])")
+
+# runs of characters with no structural meaning, consumed in one step
+_SPACE_RE = re.compile(r"[ \t\r\n]+")
+_INLINE_SPACE_RE = re.compile(r"[ \t\r]+")
+_PLAIN_EXPR_RE = re.compile(r'[^\n#/"{}\[\]()<]+')
+_PLAIN_NESTED_RE = re.compile(r'[^"#/{}\[\]()<]+')
+_PLAIN_STRING_RE = re.compile(r'[^"\\$%\n]+')
+
+
+@dataclass
+class Attribute:
+    name: str
+    value: str  # raw expression text, comments stripped
+    line: int
+    end_line: int
+    start: int  # offset of the attribute name
+    end: int  # offset just past the value
+
+    @property
+    def literal(self) -> str:
+        """Value with surrounding quotes removed when it is a plain string."""
+        v = self.value
+        if len(v) >= 2 and v[0] == '"' and v[-1] == '"' and '"' not in v[1:-1]:
+            return v[1:-1]
+        return v
+
+    def is_true(self) -> bool:
+        return self.value == "true"
+
+
+@dataclass
+class Block:
+    type: str  # "resource", "module", "ingress", "versioning", ...
+    labels: Tuple[str, ...]
+    line: int
+    end_line: int
+    start: int
+    end: int
+    attributes: Dict[str, Attribute] = field(default_factory=dict)
+    blocks: List["Block"] = field(default_factory=list)
+
+    @property
+    def resource_type(self) -> str:
+        return self.labels[0] if self.labels else ""
+
+    @property
+    def name(self) -> str:
+        return self.labels[1] if len(self.labels) > 1 else (self.labels[0] if self.labels else "")
+
+    @property
+    def address(self) -> str:
+        return ".".join(self.labels)
+
+    def walk(self) -> Iterator["Block"]:
+        yield self
+        for b in self.blocks:
+            yield from b.walk()
+
+    def child(self, block_type: str) -> Optional["Block"]:
+        return next((b for b in self.blocks if b.type == block_type), None)
+
+
+@dataclass
+class ParsedFile:
+    path: str
+    digest: str
+    text: str
+    line_offsets: List[int]
+    blocks: List[Block]
+    _lines: Optional[List[str]] = field(default=None, repr=False)
+
+    @property
+    def lines(self) -> List[str]:
+        if self._lines is None:
+            self._lines = self.text.splitlines()
+        return self._lines
+
+    def line_of(self, offset: int) -> int:
+        """1-based line number of a character offset (binary search)."""
+        return bisect_right(self.line_offsets, offset)
+
+    def resources(self, resource_type: Optional[str] = None) -> List[Block]:
+        return [
+            b
+            for b in self.blocks
+            if b.type == "resource" and (resource_type is None or b.resource_type == resource_type)
+        ]
+
+    def walk(self) -> Iterator[Block]:
+        for b in self.blocks:
+            yield from b.walk()
+
+
+def line_offsets(text: str) -> List[int]:
+    offsets = [0]
+    find = text.find
+    i = find("\n")
+    while i != -1:
+        offsets.append(i + 1)
+        i = find("\n", i + 1)
+    return offsets
+
+
+class _Parser:
+    """
+    Single forward pass over HCL text producing blocks and attributes.
+    It is deliberately forgiving: anything it cannot make sense of is
+    skipped to the end of the line rather than raising.
+    """
+
+    def __init__(self, text: str) -> None:
+        self.text = text
+        self.n = len(text)
+        self.offsets = line_offsets(text)
+
+    def line(self, offset: int) -> int:
+        return bisect_right(self.offsets, offset)
+
+    def _eol(self, i: int) -> int:
+        j = self.text.find("\n", i)
+        return self.n if j == -1 else j
+
+    def skip_space(self, i: int, newlines: bool = True) -> int:
+        t, n = self.text, self.n
+        space = _SPACE_RE if newlines else _INLINE_SPACE_RE
+        while i < n:
+            c = t[i]
+            m = space.match(t, i)
+            if m:
+                i = m.end()
+            elif c == "#" or (c == "/" and t.startswith("//", i)):
+                i = self._eol(i)
+            elif c == "/" and t.startswith("/*", i):
+                j = t.find("*/", i + 2)
+                i = self.n if j == -1 else j + 2
+            else:
+                break
+        return i
+
+    def skip_string(self, i: int) -> int:
+        """i is at an opening quote; returns the offset past the closing one."""
+        t, n = self.text, self.n
+        j = i + 1
+        while j < n:
+            m = _PLAIN_STRING_RE.match(t, j)
+            if m:
+                j = m.end()
+                continue
+            c = t[j]
+            if c == "\\":
+                j += 2
+            elif c == '"':
+                return j + 1
+            elif c in "$%" and t.startswith("{", j + 1):
+                j = self.skip_nested(j + 2, "}")
+            elif c == "\n":
+                return j
+            else:
+                j += 1
+        return n
+
+    def skip_nested(self, i: int, closer: str) -> int:
+        """Skip to just past the `closer` matching an already-consumed opener."""
+        t, n = self.text, self.n
+        stack = [closer]
+        while i < n and stack:
+            m = _PLAIN_NESTED_RE.match(t, i)
+            if m:
+                i = m.end()
+                continue
+            c = t[i]
+            if c == '"':
+                i = self.skip_string(i)
+                continue
+            if c == "#" or (c == "/" and t.startswith("//", i)):
+                i = self._eol(i)
+                continue
+            if c == "/" and t.startswith("/*", i):
+                j = t.find("*/", i + 2)
+                i = n if j == -1 else j + 2
+                continue
+            if c == "<" and t.startswith("<<", i):
+                j = self.skip_heredoc(i)
+                if j != i:
+                    i = j
+                    continue
+            if c in _OPENERS:
+                stack.append(_OPENERS[c])
+            elif c in _CLOSERS:
+                if c == stack[-1]:
+                    stack.pop()
+            i += 1
+        return i
+
+    def skip_heredoc(self, i: int) -> int:
+        """i is at `<<`; returns the offset past the terminator line, or i if not a heredoc."""
+        t = self.text
+        j = i + 2
+        if j < self.n and t[j] == "-":
+            j += 1
+        k = j
+        while k < self.n and t[k] in _IDENT_CHARS:
+            k += 1
+        marker = t[j:k]
+        if not marker:
+            return i
+        pos = self._eol(k)
+        while pos < self.n:
+            nxt = self._eol(pos + 1)
+            if t[pos + 1 : nxt].strip() == marker:
+                return nxt
+            pos = nxt
+        return self.n
+
+    def scan_expr(self, i: int) -> Tuple[int, int]:
+        """Returns (end of expression text, offset to resume parsing)."""
+        t, n = self.text, self.n
+        end = i
+        while i < n:
+            m = _PLAIN_EXPR_RE.match(t, i)
+            if m:
+                if t[i : m.end()].strip():
+                    end = i + len(t[i : m.end()].rstrip(" \t\r"))
+                i = m.end()
+                continue
+            c = t[i]
+            if c == "\n":
+                break
+            if c == "#" or (c == "/" and t.startswith("//", i)):
+                return end, self._eol(i)
+            if c == "/" and t.startswith("/*", i):
+                j = t.find("*/", i + 2)
+                i = n if j == -1 else j + 2
+                continue
+            if c in _CLOSERS:
+                break
+            if c == '"':
+                i = self.skip_string(i)
+            elif c in _OPENERS:
+                i = self.skip_nested(i + 1, _OPENERS[c])
+            elif c == "<" and t.startswith("<<", i) and self.skip_heredoc(i) != i:
+                i = self.skip_heredoc(i)
+            else:
+                i += 1
+            if c not in " \t\r":
+                end = i
+        return end, i
+
+    def read_ident(self, i: int) -> int:
+        t, n = self.text, self.n
+        while i < n and t[i] in _IDENT_CHARS:
+            i += 1
+        return i
+
+    def parse_body(self, i: int, nested: bool) -> Tuple[Dict[str, Attribute], List[Block], int]:
+        t, n = self.text, self.n
+        attrs: Dict[str, Attribute] = {}
+        blocks: List[Block] = []
+        while True:
+            i = self.skip_space(i)
+            if i >= n:
+                return attrs, blocks, n
+            if t[i] == "}":
+                if nested:
+                    return attrs, blocks, i
+                i += 1
+                continue
+            if t[i] not in _IDENT_START:
+                i = self._eol(i) if t[i] != "{" else self.skip_nested(i + 1, "}")
+                continue
+
+            name_start = i
+            i = self.read_ident(i)
+            name = t[name_start:i]
+            k = self.skip_space(i, newlines=False)
+
+            if k < n and t[k] == "=" and not t.startswith("==", k):
+                v_start = self.skip_space(k + 1, newlines=False)
+                v_end, i = self.scan_expr(v_start)
+                attrs[name] = Attribute(
+                    name=name,
+                    value=t[v_start:v_end].strip(),
+                    line=self.line(name_start),
+                    end_line=self.line(max(v_start, v_end - 1)),
+                    start=name_start,
+                    end=v_end,
+                )
+                continue
+
+            labels: List[str] = []
+            while k < n:
+                if t[k] == '"':
+                    j = self.skip_string(k)
+                    labels.append(t[k + 1 : j - 1])
+                    k = self.skip_space(j, newlines=False)
+                elif t[k] in _IDENT_START:
+                    j = self.read_ident(k)
+                    labels.append(t[k:j])
+                    k = self.skip_space(j, newlines=False)
+                else:
+                    break
+            if k >= n or t[k] != "{":
+                i = self._eol(k)
+                continue
+
+            b_attrs, b_blocks, close = self.parse_body(k + 1, nested=True)
+            end = min(close + 1, n)
+            blocks.append(
+                Block(
+                    type=name,
+                    labels=tuple(labels),
+                    line=self.line(name_start),
+                    end_line=self.line(max(name_start, end - 1)),
+                    start=name_start,
+                    end=end,
+                    attributes=b_attrs,
+                    blocks=b_blocks,
+                )
+            )
+            i = end
+
+
+def parse_text(text: str, path: str = "") -> ParsedFile:
+    p = _Parser(text)
+    _, blocks, _ = p.parse_body(0, nested=False)
+    return ParsedFile(
+        path=path,
+        digest=hashlib.sha256(text.encode("utf-8", errors="ignore")).hexdigest(),
+        text=text,
+        line_offsets=p.offsets,
+        blocks=blocks,
+    )
+
+
+class _Index:
+    """
+    Process-wide memo: (path, mtime, size) -> content digest, and
+    content digest -> ParsedFile, bounded by the total text held.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, max_paths: int = 100_000) -> None:
+        self.max_bytes = max_bytes
+        self.max_paths = max_paths
+        self._lock = threading.Lock()
+        self._stat: "OrderedDict[str, Tuple[int, int, str]]" = OrderedDict()
+        self._parsed: "OrderedDict[str, ParsedFile]" = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _known_digest(self, key: str, st: os.stat_result) -> Optional[str]:
+        seen = self._stat.get(key)
+        if seen is not None and seen[0] == st.st_mtime_ns and seen[1] == st.st_size:
+            return seen[2]
+        return None
+
+    def _record(self, key: str, st: os.stat_result, digest: str) -> None:
+        self._stat[key] = (st.st_mtime_ns, st.st_size, digest)
+        self._stat.move_to_end(key)
+        while len(self._stat) > self.max_paths:
+            self._stat.popitem(last=False)
+
+    def digest(self, path: Path) -> Optional[str]:
+        key = str(path)
+        try:
+            st = os.stat(key)
+        except OSError:
+            return None
+        with self._lock:
+            known = self._known_digest(key, st)
+        if known is not None:
+            return known
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            self._record(key, st, digest)
+        return digest
+
+    def get(self, path: Path) -> Optional[ParsedFile]:
+        key = str(path)
+        try:
+            st = os.stat(key)
+        except OSError:
+            return None
+        with self._lock:
+            known = self._known_digest(key, st)
+            hit = self._parsed.get(known) if known is not None else None
+            if hit is not None:
+                self._parsed.move_to_end(known)
+                self.hits += 1
+                return hit if hit.path == key else _with_path(hit, key)
+
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        digest = hashlib.sha256(data).hexdigest()
+
+        with self._lock:
+            self._record(key, st, digest)
+            hit = self._parsed.get(digest)
+            if hit is not None:
+                self.hits += 1
+                return hit if hit.path == key else _with_path(hit, key)
+            self.misses += 1
+
+        parsed = parse_text(data.decode("utf-8", errors="ignore"), path=key)
+        parsed.digest = digest
+        with self._lock:
+            if digest not in self._parsed:
+                self._parsed[digest] = parsed
+                self._bytes += len(parsed.text)
+                while self._bytes > self.max_bytes and len(self._parsed) > 1:
+                    _, old = self._parsed.popitem(last=False)
+                    self._bytes -= len(old.text)
+        return parsed
+
+    def forget(self, path: Path) -> None:
+        with self._lock:
+            self._stat.pop(str(path), None)
+
+
+def _with_path(parsed: ParsedFile, path: str) -> ParsedFile:
+    return ParsedFile(
+        path=path,
+        digest=parsed.digest,
+        text=parsed.text,
+        line_offsets=parsed.line_offsets,
+        blocks=parsed.blocks,
+        _lines=parsed._lines,
+    )
+
+
+_INDEX = _Index()
+
+
+def parse_file(path: Path) -> Optional[ParsedFile]:
+    """Parsed view of a Terraform file, shared by every service; None if unreadable."""
+    return _INDEX.get(Path(path))
+
+
+def file_digest(path: Path) -> Optional[str]:
+    """Content sha256 of a file, re-read only when its mtime or size changed."""
+    return _INDEX.digest(Path(path))
+
+
+def forget(path: Path) -> None:
+    """Drop the stat memo for a path just rewritten, in case mtime and size did not move."""
+    _INDEX.forget(Path(path))
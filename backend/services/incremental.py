@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import hashlib
+import posixpath
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from ..models import Finding
+from .hcl_index import file_digest, parse_file
+from .scan_cache import get_scan_cache, iter_tf_files
+
+# module "x" { source = "./modules/x" } -- only local sources create in-tree edges
+LOCAL_SOURCE_PREFIXES = ("./", "../")
+
+# scan_units(requested units -> their files, whole tree requested?) -> findings per unit,
+# None for a unit whose scan failed (reported as no findings, never cached)
+UnitScanner = Callable[[Dict[str, List[Path]], bool], Dict[str, Optional[List[Finding]]]]
+
+
+def unit_of(rel_file: str) -> str:
+    """Module directory ("." for the root) that a root-relative file belongs to."""
+    return posixpath.dirname(rel_file.replace("\\", "/").lstrip("/")) or "."
+
+
+def module_units(base_dir: str) -> Dict[str, List[Path]]:
+    """Group Terraform files by directory; each directory is one scan unit."""
+    root = Path(base_dir)
+    units: Dict[str, List[Path]] = {}
+    for p in iter_tf_files(base_dir):
+        units.setdefault(unit_of(p.relative_to(root).as_posix()), []).append(p)
+    return units
+
+
+def _module_refs(root: Path, unit: str, files: Iterable[Path], known: Set[str]) -> Set[str]:
+    refs: Set[str] = set()
+    for p in files:
+        pf = parse_file(p) if p.suffix == ".tf" else None
+        if pf is None:
+            continue
+        for b in pf.blocks:
+            src = b.attributes.get("source") if b.type == "module" else None
+            if src is None or not src.literal.startswith(LOCAL_SOURCE_PREFIXES):
+                continue
+            target = posixpath.normpath(posixpath.join(unit, src.literal))
+            if target in known and target != unit:
+                refs.add(target)
+    return refs
+
+
+def _unit_digest(root: Path, files: Iterable[Path]) -> str:
+    h = hashlib.sha256()
+    for p in sorted(files):
+        digest = file_digest(p)
+        if digest is None:
+            continue
+        h.update(p.relative_to(root).as_posix().encode("utf-8"))
+        h.update(b"\0")
+        h.update(bytes.fromhex(digest))
+    return h.hexdigest()
+
+
+def unit_keys(base_dir: str, units: Dict[str, List[Path]]) -> Dict[str, str]:
+    """
+    Content key per unit: its own files plus the keys of local modules it
+    sources, so editing a module invalidates every caller. Always hashed from
+    the bytes on disk; hcl_index only re-reads files whose mtime or size moved.
+    """
+    root = Path(base_dir)
+    known = set(units)
+    keys: Dict[str, str] = {}
+    refs = {u: _module_refs(root, u, fs, known) for u, fs in units.items()}
+
+    def key_of(u: str, trail: Set[str]) -> str:
+        if u in keys:
+            return keys[u]
+        h = hashlib.sha256(_unit_digest(root, units[u]).encode("utf-8"))
+        for t in sorted(refs.get(u, ())):
+            if t in trail:
+                continue  # module cycle; the member's own digest is enough
+            h.update(b"\0")
+            h.update(key_of(t, trail | {u}).encode("utf-8"))
+        keys[u] = h.hexdigest()
+        return keys[u]
+
+    for u in units:
+        key_of(u, set())
+    return keys
+
+
+def incremental_scan(
+    scanner: str,
+    fingerprint: str,
+    base_dir: str,
+    scan_units: UnitScanner,
+) -> List[Finding]:
+    """
+    Scan `base_dir` one module directory at a time, serving every unit whose
+    content key is already cached (typically from the PR's base commit) and
+    handing only the rest to `scan_units` in a single call, so scan cost
+    follows what changed without needing the PR's diff. Results are
+    ordered by unit path.
+    """
+    units = module_units(base_dir)
+    cache = get_scan_cache()
+    if not units:
+        return []
+    if cache is None:
+        found = scan_units(units, True)
+        return [f for u in sorted(units) for f in found.get(u) or []]
+
+    keys = unit_keys(base_dir, units)
+    cache_keys = {u: cache.make_key(scanner, fingerprint, keys[u]) for u in units}
+
+    per_unit: Dict[str, List[Finding]] = {}
+    missing: List[str] = []
+    for u in sorted(units):
+        hit = cache.get(cache_keys[u])
+        if hit is None:
+            missing.append(u)
+        else:
+            per_unit[u] = hit
+
+    if missing:
+        found = scan_units({u: units[u] for u in missing}, len(missing) == len(units))
+        for u in missing:
+            got = found.get(u, [])
+            per_unit[u] = got or []
+            # a failed scan is retried next time rather than remembered as clean
+            if got is not None:
+                cache.put(cache_keys[u], got)
+
+    return [f for u in sorted(units) for f in per_unit[u]]
@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+from ..config.settings import get_settings
+
+
+class RunCancelled(Exception):
+    """Raised inside a run when its cancel flag has been set."""
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when the runner already holds `max_pending` jobs."""
+
+
+@dataclass
+class Job:
+    run_id: str
+    cancel_event: threading.Event = field(default_factory=threading.Event)
+    cancel_reason: str = "cancelled"
+    future: Optional[Future] = None
+    # polled at checkpoints for a cancel recorded outside this process; returns its reason
+    probe: Optional[Callable[[], Optional[str]]] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if not self.cancel_event.is_set() and self.probe is not None:
+            reason = self.probe()
+            if reason is not None:
+                self.cancel_reason = reason
+                self.cancel_event.set()
+        if self.cancel_event.is_set():
+            raise RunCancelled(self.run_id)
+
+
+class JobRunner:
+    """
+    Bounded in-process executor for pipeline runs.
+    At most `max_workers` runs execute at once; at most `max_pending`
+    (queued + running) are accepted before `submit` refuses new work.
+    """
+
+    def __init__(self, max_workers: int = 2, max_pending: int = 64) -> None:
+        self.max_workers = max(1, int(max_workers))
+        self.max_pending = max(self.max_workers, int(max_pending))
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="autoinfra-run")
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Job] = {}
+
+    def submit(self, run_id: str, fn: Callable[[Job], None]) -> Job:
+        with self._lock:
+            if len(self._jobs) >= self.max_pending:
+                raise JobQueueFull(f"{len(self._jobs)} runs already pending")
+            job = Job(run_id=run_id)
+            self._jobs[run_id] = job
+            job.future = self._pool.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job: Job, fn: Callable[[Job], None]) -> None:
+        try:
+            fn(job)
+        finally:
+            self._forget(job)
+
+    def _forget(self, job: Job) -> None:
+        with self._lock:
+            if self._jobs.get(job.run_id) is job:
+                del self._jobs[job.run_id]
+
+    def get(self, run_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(run_id)
+
+    def cancel(self, run_id: str, reason: str = "cancelled") -> bool:
+        """
+        Flag a run for cancellation. Queued runs never start; in-flight
+        runs stop at their next stage boundary. Returns False when the
+        run is unknown or already finished.
+        """
+        job = self.get(run_id)
+        if job is None:
+            return False
+        job.cancel_reason = reason
+        job.cancel_event.set()
+        if job.future is not None and job.future.cancel():
+            self._forget(job)
+        return True
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._jobs)
+
+    def shutdown(self, wait: bool = False) -> None:
+        with self._lock:
+            jobs = list(self._jobs.values())
+        for job in jobs:
+            job.cancel_event.set()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+
+_RUNNER_SINGLETON: Optional[JobRunner] = None
+_RUNNER_LOCK = threading.Lock()
+
+
+def get_job_runner() -> JobRunner:
+    global _RUNNER_SINGLETON
+    with _RUNNER_LOCK:
+        if _RUNNER_SINGLETON is None:
+            s = get_settings()
+            _RUNNER_SINGLETON = JobRunner(max_workers=s.run_workers, max_pending=s.run_queue_max)
+        return _RUNNER_SINGLETON
+
+
+def shutdown_job_runner(wait: bool = False) -> None:
+    global _RUNNER_SINGLETON
+    with _RUNNER_LOCK:
+        runner, _RUNNER_SINGLETON = _RUNNER_SINGLETON, None
+    if runner is not None:
+        runner.shutdown(wait=wait)
@@ -1,7 +1,9 @@
 from __future__ import annotations
 
+import socket
+import threading
 import time
-from typing import Dict, List, Optional
+from typing import Dict, List, Optional, Sequence, Tuple
 
 try:
     from datadog import initialize, api  # type: ignore
@@ -12,25 +14,123 @@ except Exception:
 from ..config.settings import get_settings
 from ..models import RunSummary
 
+# (name, kind, value, tags) with kind "count", "gauge" or "distribution", ready
+# for a sink; a distribution sends each recorded value, aggregated by Datadog
+Point = Tuple[str, str, float, Tuple[str, ...]]
+
+_STATSD_TYPES = {"count": "c", "gauge": "g", "distribution": "d"}
+
+
+class DogStatsdSink:
+    """Fire-and-forget UDP to a local agent, several lines per datagram."""
+
+    MAX_DATAGRAM = 1432  # stays under a typical MTU
+
+    def __init__(self, host: str, port: int = 8125) -> None:
+        self.addr = (host, int(port))
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+
+    def send(self, points: List[Point]) -> None:
+        buf = b""
+        for name, kind, value, tags in points:
+            line = f"{name}:{value:g}|{_STATSD_TYPES[kind]}"
+            if tags:
+                line += "|#" + ",".join(tags)
+            data = line.encode("utf-8")
+            if buf and len(buf) + 1 + len(data) > self.MAX_DATAGRAM:
+                self.sock.sendto(buf, self.addr)
+                buf = b""
+            buf = buf + b"\n" + data if buf else data
+        if buf:
+            self.sock.sendto(buf, self.addr)
+
+    def close(self) -> None:
+        self.sock.close()
+
+
+class DatadogApiSink:
+    """One Metric.send (and Distribution.send) call per flush instead of one per run."""
+
+    def __init__(self, api_key: str, site: str) -> None:
+        site = (site or "datadoghq.com").strip()
+        self.api_host = site if site.startswith("http") else f"https://api.{site}"
+        initialize(api_key=api_key, api_host=self.api_host)
+
+    def send(self, points: List[Point]) -> None:
+        ts = int(time.time())
+        series = [
+            {"metric": name, "points": [(ts, float(value))], "type": kind, "tags": list(tags)}
+            for name, kind, value, tags in points
+            if kind != "distribution"
+        ]
+        dists: Dict[Tuple[str, Tuple[str, ...]], List[float]] = {}
+        for name, kind, value, tags in points:
+            if kind == "distribution":
+                dists.setdefault((name, tags), []).append(float(value))
+        if series:
+            api.Metric.send(series)
+        if dists:
+            api.Distribution.send(
+                distributions=[
+                    {"metric": name, "points": [(ts, values)], "tags": list(tags)} for (name, tags), values in dists.items()
+                ]
+            )
+
+    def close(self) -> None:
+        pass
+
 
 class Metrics:
-    
+    """
+    Counters, gauges and distributions buffered in memory and flushed by a
+    daemon thread every `flush_interval` seconds, as one batch, to DogStatsD
+    or the Datadog API. Distributions keep their metric names and let
+    Datadog compute avg/p95 across hosts. Recording is a dict update under a lock; the
+    request path never does I/O. Without a sink, recording is a no-op.
+    """
+
+    def __init__(self, sink=None, flush_interval: float = 10.0) -> None:
+        self.sink = sink
+        self.enabled = sink is not None
+        self.flush_interval = float(flush_interval)
+        self.counters: Dict[str, int] = {"flushes": 0, "points": 0, "errors": 0}
 
-    def __init__(self) -> None:
-        self.enabled = False
-        self.site_api_host: Optional[str] = None
+        self._lock = threading.Lock()
+        self._counts: Dict[Tuple[str, Tuple[str, ...]], float] = {}
+        self._gauges: Dict[Tuple[str, Tuple[str, ...]], float] = {}
+        self._dists: Dict[Tuple[str, Tuple[str, ...]], List[float]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
 
-        settings = get_settings()
-        if not settings.dd_api_key or initialize is None or api is None:
-            self.enabled = False
+    def _started(self) -> None:
+        # caller holds the lock
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="metrics-flush", daemon=True)
+            self._thread.start()
+
+    def count(self, name: str, value: float = 1, tags: Sequence[str] = ()) -> None:
+        if not self.enabled:
             return
+        key = (name, tuple(tags))
+        with self._lock:
+            self._started()
+            self._counts[key] = self._counts.get(key, 0) + value
 
-        site = (settings.dd_site or "datadoghq.com").strip()
-        api_host = site if site.startswith("http") else f"https://api.{site}"
+    def gauge(self, name: str, value: float, tags: Sequence[str] = ()) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._started()
+            self._gauges[(name, tuple(tags))] = float(value)
 
-        initialize(api_key=settings.dd_api_key, api_host=api_host)
-        self.enabled = True
-        self.site_api_host = api_host
+    def distribution(self, name: str, value: float, tags: Sequence[str] = ()) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(tags))
+        with self._lock:
+            self._started()
+            self._dists.setdefault(key, []).append(float(value))
 
     def send_run_metrics(
         self,
@@ -39,28 +139,76 @@ class Metrics:
         result: str = "success",
         extra_tags: Optional[List[str]] = None,
     ) -> None:
-        if not self.enabled:
+        tags = [f"repo:{repo}", f"result:{result}"]
+        if extra_tags:
+            tags.extend(extra_tags)
+        self.count("autoinfra.runs", 1, tags)
+        if result == "failed":
+            return
+        self.distribution("autoinfra.run.duration_ms", summary.duration_ms, tags)
+        self.distribution("autoinfra.checkov.issues", summary.checkov_issues, tags)
+        self.distribution("autoinfra.policy.fails", summary.policy_fails, tags)
+        self.distribution("autoinfra.cost.estimate_usd", summary.cost_usd_month, tags)
+
+    def _drain(self) -> List[Point]:
+        with self._lock:
+            counts, self._counts = self._counts, {}
+            gauges, self._gauges = self._gauges, {}
+            dists, self._dists = self._dists, {}
+        points: List[Point] = [(n, "count", v, t) for (n, t), v in counts.items()]
+        points += [(n, "gauge", v, t) for (n, t), v in gauges.items()]
+        points += [(n, "distribution", v, t) for (n, t), values in dists.items() for v in values]
+        return points
+
+    def flush(self) -> None:
+        points = self._drain()
+        if not points or self.sink is None:
             return
         try:
-            ts = int(time.time())
-            tags = [f"repo:{repo}", f"result:{result}"]
-            if extra_tags:
-                tags.extend(extra_tags)
-
-            payload: List[Dict] = [
-                {"metric": "autoinfra.run.duration_ms", "points": [(ts, float(summary.duration_ms))], "type": "gauge", "tags": tags},
-                {"metric": "autoinfra.checkov.issues", "points": [(ts, float(summary.checkov_issues))], "type": "gauge", "tags": tags},
-                {"metric": "autoinfra.policy.fails", "points": [(ts, float(summary.policy_fails))], "type": "gauge", "tags": tags},
-                {"metric": "autoinfra.cost.estimate_usd", "points": [(ts, float(summary.cost_usd_month))], "type": "gauge", "tags": tags},
-            ]
-            api.Metric.send(payload)
+            self.sink.send(points)
+            self.counters["points"] += len(points)
         except Exception:
-            
-            return
+            # metrics are best-effort; a failed interval is dropped, not retried
+            self.counters["errors"] += 1
+        self.counters["flushes"] += 1
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self.flush()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+        self.flush()
+        if self.sink is not None:
+            self.sink.close()
+
 
+def _sink_from_settings():
+    settings = get_settings()
+    if settings.dd_agent_host:
+        return DogStatsdSink(settings.dd_agent_host, settings.dd_dogstatsd_port)
+    if settings.dd_api_key and initialize is not None and api is not None:
+        return DatadogApiSink(settings.dd_api_key, settings.dd_site)
+    return None
 
-_metrics = Metrics()
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
 
 
 def get_metrics() -> Metrics:
-    return _metrics
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            _metrics = Metrics(_sink_from_settings(), flush_interval=get_settings().metrics_flush_interval_s)
+        return _metrics
+
+
+def shutdown_metrics() -> None:
+    global _metrics
+    with _metrics_lock:
+        m, _metrics = _metrics, None
+    if m is not None:
+        m.close()
@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+from ..config.settings import get_settings
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+# chunks per worker; more than one so a slow chunk does not idle the rest
+CHUNKS_PER_WORKER = 4
+
+_SCAN_POOL: Optional[ProcessPoolExecutor] = None
+_SCAN_POOL_LOCK = threading.Lock()
+
+
+def get_scan_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared pool for file-level scanning; None when SCAN_WORKERS is 0 or inside a worker."""
+    global _SCAN_POOL
+    if multiprocessing.parent_process() is not None:
+        # already in a pool worker (e.g. a "process" stage); don't nest pools
+        return None
+    with _SCAN_POOL_LOCK:
+        if _SCAN_POOL is None:
+            workers = int(get_settings().scan_workers)
+            if workers <= 0:
+                return None
+            # spawn, not fork: the API process runs threads whose held locks a forked child would inherit
+            _SCAN_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _SCAN_POOL
+
+
+def shutdown_scan_pool() -> None:
+    global _SCAN_POOL
+    with _SCAN_POOL_LOCK:
+        pool, _SCAN_POOL = _SCAN_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def split_balanced(items: Sequence[T], weights: Sequence[int], n_chunks: int) -> List[List[T]]:
+    """Contiguous chunks of roughly equal total weight, preserving item order."""
+    if not items:
+        return []
+    target = max(1, sum(weights) // max(1, n_chunks))
+    chunks: List[List[T]] = [[]]
+    acc = 0
+    for item, w in zip(items, weights):
+        if acc >= target and chunks[-1]:
+            chunks.append([])
+            acc = 0
+        chunks[-1].append(item)
+        acc += w
+    return chunks
+
+
+def map_chunked(
+    fn: Callable[[List[T]], R],
+    items: Sequence[T],
+    weights: Optional[Sequence[int]] = None,
+) -> List[R]:
+    """
+    `fn` over chunks of `items`, one result per chunk in chunk order.
+    Runs in the scan pool when the total weight (file count) reaches
+    SCAN_PARALLEL_MIN_FILES, otherwise as a single serial call so small
+    trees don't pay for process startup and pickling.
+    `fn` must be a module-level function and items picklable.
+    """
+    if not items:
+        return []
+    weights = list(weights) if weights is not None else [1] * len(items)
+    pool = get_scan_pool() if sum(weights) >= get_settings().scan_parallel_min_files else None
+    if pool is None:
+        return [fn(list(items))]
+    chunks = split_balanced(items, weights, get_settings().scan_workers * CHUNKS_PER_WORKER)
+    return list(pool.map(fn, chunks))
@@ -1,16 +1,23 @@
 from __future__ import annotations
 
-import io
+import os
 import re
-import shutil
 import tempfile
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from dataclasses import dataclass, field
 from pathlib import Path
-from typing import List, Tuple, Optional
+from typing import Dict, List, Tuple, Optional
 
 from ..models import Finding
-from .checkov_runner import run_checkov
-from .policy_engine import run_policy_checks
+from .checkov_runner import run_checkov, scan_checkov_files
+from .hcl_index import parse_file
+from .incremental import unit_of
+from .policy_engine import run_policy_checks, scan_policy_units
+from .scan_cache import iter_tf_files
+from .telemetry import span
+from .unified_diff import apply_hunks, parse_unified_diff
+from .workspace import OverlayWorkspace
 
 
 
@@ -30,6 +37,18 @@ def extract_all_diffs(markdown: str) -> List[str]:
     return ["```diff\n" + m.strip("\n") + "\n```" for m in DIFF_FENCE_RE.findall(markdown or "")]
 
 
+@dataclass
+class PatchCheck:
+    """Outcome of one suggested patch applied on its own."""
+
+    index: int
+    applied: bool
+    issues_after: int
+    policy_after: int
+    helps: bool
+    message: str = ""
+
+
 @dataclass
 class SelfCheckResult:
     issues_before: int
@@ -37,151 +56,211 @@ class SelfCheckResult:
     policy_before: int
     policy_after: int
     safe_to_merge: bool
+    # per-patch attribution; the fields above describe the helpful patches together
+    patches: List[PatchCheck] = field(default_factory=list)
 
 
-def _write_text(path: Path, text: str) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(text, encoding="utf-8")
-
-
-def _apply_unified_diff(root: Path, patch_text: str) -> Tuple[bool, str]:
-    
+def _resolve_target(path: Optional[str], files: List[str]) -> Optional[str]:
+    # diff paths are usually repo-relative while the workspace is the terraform dir
+    if path is None:
+        return None
+    if path in files:
+        return path
+    longer = [f for f in files if path.endswith("/" + f)]
+    if longer:
+        return max(longer, key=len)
+    shorter = [f for f in files if f.endswith("/" + path)]
+    return shorter[0] if len(shorter) == 1 else None
+
+
+def _apply_unified_diff(ws: OverlayWorkspace, patch_text: str) -> Tuple[bool, str, List[str]]:
+    """
+    Apply every file section of a fenced diff, all or nothing.
+    Returns (applied, message, root-relative paths of the files written).
+    """
     try:
         start = patch_text.find("```diff")
         if start == -1:
-            return False, "No diff fence found"
+            return False, "No diff fence found", []
         end = patch_text.find("```", start + 7)
         if end == -1:
-            return False, "Unclosed diff fence"
+            return False, "Unclosed diff fence", []
         diff_body = patch_text[start + len("```diff"): end].strip("\n")
 
-        minus_lines: List[str] = []
-        plus_lines: List[str] = []
-        for raw in io.StringIO(diff_body):
-            line = raw.rstrip("\n")
-            if line.startswith("+++ ") or line.startswith("--- "):
-                continue
-            if line.startswith("+"):
-                plus_lines.append(line[1:])
-            elif line.startswith("-"):
-                minus_lines.append(line[1:])
-
-        candidates = list(root.rglob("*.tf"))
-        for tf in candidates:
-            text_lines = tf.read_text(encoding="utf-8", errors="ignore").splitlines()
-
-            
-            norm = lambda s: "".join(s.split())
-
-            
-            if minus_lines and not all(any(norm(m) in norm(ln) for ln in text_lines) for m in minus_lines):
-                continue
-
-            new_text: List[str] = []
-            consumed_minus = set()
-            i = 0
-            while i < len(text_lines):
-                ln = text_lines[i]
-                replaced = False
-                for m in minus_lines:
-                    if m and (norm(m) in norm(ln)) and (m not in consumed_minus):
-                        idx = minus_lines.index(m)
-                        repl = plus_lines[idx] if idx < len(plus_lines) else None
-                        if repl is not None:
-                            new_text.append(repl)
-                        consumed_minus.add(m)
-                        replaced = True
-                        break
-                if not replaced:
-                    new_text.append(ln)
-                i += 1
-
-            
-            if len(plus_lines) > len(minus_lines):
-                extras = plus_lines[len(minus_lines):]
-                new_text.extend(extras)
-
-            _write_text(tf, "\n".join(new_text) + "\n")
-            return True, f"Patched {tf.name}"
-
-        return False, "No target file matched for patch"
+        file_patches = parse_unified_diff(diff_body)
+        if not file_patches:
+            return False, "No hunks found in diff", []
+
+        files = ws.tf_files()
+        patched: Dict[str, List[str]] = {}
+        for fp in file_patches:
+            if fp.deleted:
+                return False, f"Deleting {fp.path} is not supported", []
+            target = _resolve_target(fp.path, files)
+            if fp.new_file and target is None and fp.path:
+                target = fp.path
+            # headerless or unknown targets: first file every hunk applies to
+            for rel in [target] if target else files:
+                if rel in patched:
+                    lines = patched[rel]
+                elif fp.new_file and rel not in files:
+                    lines = []
+                else:
+                    pf = parse_file(ws.path(rel))
+                    if pf is None:
+                        continue
+                    lines = pf.lines
+                new_lines = apply_hunks(lines, fp.hunks)
+                if new_lines is not None:
+                    patched[rel] = new_lines
+                    break
+            else:
+                return False, f"Hunks did not apply to {fp.path or 'any file'}", []
+
+        for rel, new_lines in patched.items():
+            ws.write_text(rel, "\n".join(new_lines) + "\n")
+        return True, "Patched " + ", ".join(sorted(patched)), sorted(patched)
     except Exception as e:
-        return False, f"Patch error: {e}"
-
-
-def self_check_with_patch(sample_tf_dir: str, patch_markdown: str) -> SelfCheckResult:
-    
-    src = Path(sample_tf_dir).resolve()
-    with tempfile.TemporaryDirectory() as tmpdir:
-        dst = Path(tmpdir) / "tf"
-        shutil.copytree(src, dst)
-
-        before_findings: List[Finding] = run_checkov(str(dst)) + run_policy_checks(str(dst))
-        issues_before = sum(1 for f in before_findings if f.tool == "checkov")
-        policy_before = sum(1 for f in before_findings if f.tool == "policy")
-
-        ok, _ = _apply_unified_diff(dst, patch_markdown)
-        if not ok:
-            return SelfCheckResult(
-                issues_before=issues_before,
-                issues_after=issues_before,
-                policy_before=policy_before,
-                policy_after=policy_before,
-                safe_to_merge=False,
-            )
-
-        after_findings: List[Finding] = run_checkov(str(dst)) + run_policy_checks(str(dst))
-        issues_after = sum(1 for f in after_findings if f.tool == "checkov")
-        policy_after = sum(1 for f in after_findings if f.tool == "policy")
-
-        reduced = (issues_after + policy_after) <= (issues_before + policy_before)
-        safe = reduced and policy_after == 0
-
-        return SelfCheckResult(
-            issues_before=issues_before,
-            issues_after=issues_after,
-            policy_before=policy_before,
-            policy_after=policy_after,
-            safe_to_merge=safe,
-        )
-
-
-def self_check_with_patches(sample_tf_dir: str, patch_markdowns: List[str]) -> SelfCheckResult:
-    
-    src = Path(sample_tf_dir).resolve()
-    with tempfile.TemporaryDirectory() as tmpdir:
-        dst = Path(tmpdir) / "tf"
-        shutil.copytree(src, dst)
-
-        before_findings: List[Finding] = run_checkov(str(dst)) + run_policy_checks(str(dst))
-        issues_before = sum(1 for f in before_findings if f.tool == "checkov")
-        policy_before = sum(1 for f in before_findings if f.tool == "policy")
-
-        any_applied = False
-        for patch_md in patch_markdowns:
-            ok, _ = _apply_unified_diff(dst, patch_md)
-            any_applied = any_applied or ok
-
-        if not any_applied:
-            return SelfCheckResult(
-                issues_before=issues_before,
-                issues_after=issues_before,
-                policy_before=policy_before,
-                policy_after=policy_before,
-                safe_to_merge=False,
-            )
-
-        after_findings: List[Finding] = run_checkov(str(dst)) + run_policy_checks(str(dst))
-        issues_after = sum(1 for f in after_findings if f.tool == "checkov")
-        policy_after = sum(1 for f in after_findings if f.tool == "policy")
-
-        reduced = (issues_after + policy_after) <= (issues_before + policy_before)
-        safe = reduced and policy_after == 0
-
-        return SelfCheckResult(
-            issues_before=issues_before,
-            issues_after=issues_after,
-            policy_before=policy_before,
-            policy_after=policy_after,
-            safe_to_merge=safe,
+        return False, f"Patch error: {e}", []
+
+
+def _after_state(ws: OverlayWorkspace, baseline: List[Finding], checkov_new: List[Finding]) -> List[Finding]:
+    """
+    Findings after patching: the baseline with everything in the touched
+    module directories dropped, plus `checkov_new` (a scan of just those
+    directories) and a fresh policy scan of them. Both scanners look across
+    a module (cross-resource checks, bucket controls), so whole touched
+    modules are redone rather than single files.
+    """
+    units = ws.expose_written_units()
+    kept = [f for f in baseline if unit_of(f.file) not in units]
+    return kept + checkov_new + scan_policy_units(str(ws.root), units)
+
+
+def _checkov_scans(workspaces: List[OverlayWorkspace]) -> List[List[Finding]]:
+    """
+    Checkov findings for the module directories each workspace wrote to, one
+    scan per workspace rooted at that workspace so no patch sees another's files.
+    The scans run side by side; with warm workers each costs a scan, not a
+    checkov startup.
+    """
+
+    def scan(ws: OverlayWorkspace) -> List[Finding]:
+        if not ws.written:
+            return []
+        ws.expose_written_units()
+        files = [p.relative_to(ws.root).as_posix() for p in iter_tf_files(str(ws.root))]
+        found = scan_checkov_files(str(ws.root), files)
+        if found is None:
+            # counting a failed scan as "no findings" would make every patch look helpful
+            raise RuntimeError("checkov failed during self-check")
+        return found
+
+    n_workers = max(1, min(os.cpu_count() or 1, len(workspaces)))
+    with ThreadPoolExecutor(max_workers=n_workers) as pool:
+        return list(pool.map(scan, workspaces))
+
+
+def _count(findings: List[Finding]) -> Tuple[int, int]:
+    return (
+        sum(1 for f in findings if f.tool == "checkov"),
+        sum(1 for f in findings if f.tool == "policy"),
+    )
+
+
+def _improves(before: Tuple[int, int], after: Tuple[int, int]) -> bool:
+    """Fewer findings in total and no new policy failures; an unchanged total is not an improvement."""
+    return sum(after) < sum(before) and after[1] <= before[1]
+
+
+def self_check_with_patch(
+    sample_tf_dir: str, patch_markdown: str, baseline: Optional[List[Finding]] = None
+) -> SelfCheckResult:
+    return self_check_with_patches(sample_tf_dir, [patch_markdown], baseline)
+
+
+def _evaluate(
+    src: str, before_findings: List[Finding], sets: List[List[str]]
+) -> List[Tuple[bool, int, int, str]]:
+    """(all applied, checkov issues, policy fails, messages) per patch set, each in its own overlay workspace."""
+    outcomes: List[Tuple[bool, int, int, str]] = []
+    with tempfile.TemporaryDirectory(prefix="autoinfra-selfcheck-") as scratch, ExitStack() as stack:
+        workspaces = [stack.enter_context(OverlayWorkspace(src, parent=scratch)) for _ in sets]
+        applied_sets: List[bool] = []
+        messages = []
+        with span("self_check.apply"):
+            for ws, patches in zip(workspaces, sets):
+                results = [_apply_unified_diff(ws, patch_md) for patch_md in patches]
+                # a set counts as applied only if every patch in it did
+                applied_sets.append(all(ok for ok, _, _ in results))
+                messages.append("; ".join(message for _, message, _ in results))
+
+        with span("self_check.scan"):
+            scans = _checkov_scans(workspaces)
+        for ws, checkov_new, applied, message in zip(workspaces, scans, applied_sets, messages):
+            if not ws.written:
+                issues, policy = _count(before_findings)
+            else:
+                issues, policy = _count(_after_state(ws, before_findings, checkov_new))
+            outcomes.append((applied, issues, policy, message))
+    return outcomes
+
+
+def self_check_with_patches(
+    sample_tf_dir: str, patch_markdowns: List[str], baseline: Optional[List[Finding]] = None
+) -> SelfCheckResult:
+    """
+    Evaluate each patch on its own, then the patches that help together:
+    only those are suggested, so the totals and the verdict describe them.
+    Every patch set gets its own overlay workspace and checkov scan.
+    `baseline` is the findings the run already has for the unpatched tree;
+    when given, the tree is not scanned again and only patched files are.
+    """
+    src = str(Path(sample_tf_dir).resolve())
+    if baseline is not None:
+        before_findings: List[Finding] = list(baseline)
+    else:
+        with span("self_check.baseline"):
+            before_findings = run_checkov(src) + run_policy_checks(src)
+    issues_before, policy_before = _count(before_findings)
+    before = (issues_before, policy_before)
+
+    # all patches together are checked alongside the single ones, since
+    # usually every patch helps; with one patch the two are the same set
+    several = len(patch_markdowns) > 1
+    sets = ([patch_markdowns] if several else []) + [[p] for p in patch_markdowns]
+    outcomes = _evaluate(src, before_findings, sets)
+    per_patch = outcomes[1:] if several else outcomes
+    checks = [
+        PatchCheck(
+            index=i,
+            applied=applied,
+            issues_after=issues,
+            policy_after=policy,
+            helps=applied and _improves(before, (issues, policy)),
+            message=message,
         )
+        for i, (applied, issues, policy, message) in enumerate(per_patch)
+    ]
+
+    kept = [c.index for c in checks if c.helps]
+    if len(kept) == len(patch_markdowns):
+        combined = outcomes[0]
+    elif len(kept) == 1:
+        combined = per_patch[kept[0]]
+    elif kept:
+        combined = _evaluate(src, before_findings, [[patch_markdowns[i] for i in kept]])[0]
+    else:
+        # nothing is suggested; the tree stays as it is
+        combined = (False, issues_before, policy_before, "")
+
+    applied, issues_after, policy_after, _ = combined
+    reduced = _improves(before, (issues_after, policy_after))
+    return SelfCheckResult(
+        issues_before=issues_before,
+        issues_after=issues_after,
+        policy_before=policy_before,
+        policy_after=policy_after,
+        safe_to_merge=applied and reduced and policy_after == 0,
+        patches=checks,
+    )
@@ -2,110 +2,174 @@ from __future__ import annotations
 
 import re
 from pathlib import Path
-from typing import List
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 from ..models import Finding
+from .hcl_index import Attribute, Block, ParsedFile, parse_file
+from .incremental import incremental_scan, module_units
+from .parallel import map_chunked
 
+# part of the scan cache key; bump whenever rules or their output change
+RULES_VERSION = "4"
 
 
-CIDR_OPEN_RE = re.compile(r'0\.0\.0\.0/0')
-PORT_RE = re.compile(r'(\bfrom_port\b|\bto_port\b)\s*=\s*(\d+)')
-S3_ACL_PUBLIC_RE = re.compile(r'acl\s*=\s*"(public-read|public-read-write)"')
-S3_BLOCK_PUBLIC_ACLS_RE = re.compile(r'block_public_acls\s*=\s*true')
-S3_VERSIONING_ENABLED_RE = re.compile(r'versioning\s*{[^}]*enabled\s*=\s*true', re.DOTALL)
-RDS_PUBLIC_RE = re.compile(r'publicly_accessible\s*=\s*true')
+CIDR_OPEN = "0.0.0.0/0"
+PUBLIC_ACLS = {"public-read", "public-read-write"}
+BUCKET_REF_RE = re.compile(r'\baws_s3_bucket\.([A-Za-z0-9_-]+)')
 
 
 SENSITIVE_PORTS = {"22", "3389", "80", "443"}
 
 
-def _scan_file(path: Path) -> List[Finding]:
-    try:
-        text = path.read_text(encoding="utf-8", errors="ignore")
-    except Exception:
-        return []
-
+def _finding(rule_id: str, severity: str, path: str, line: int, message: str) -> Finding:
+    return Finding(
+        tool="policy",
+        rule_id=rule_id,
+        severity=severity,  # type: ignore[arg-type]
+        file=path,
+        line=line,
+        message=message,
+    )
+
+
+def _referenced_buckets(block: Block) -> Set[str]:
+    ref = block.attributes.get("bucket")
+    return set(BUCKET_REF_RE.findall(ref.value)) if ref else set()
+
+
+def _bucket_controls(files: Iterable[ParsedFile]) -> Tuple[Set[str], Set[str]]:
+    """Buckets hardened by standalone resources elsewhere in the module: (public-ACL blocked, versioned)."""
+    blocked: Set[str] = set()
+    versioned: Set[str] = set()
+    for pf in files:
+        for r in pf.resources("aws_s3_bucket_public_access_block"):
+            flag = r.attributes.get("block_public_acls")
+            if flag and flag.is_true():
+                blocked |= _referenced_buckets(r)
+        for r in pf.resources("aws_s3_bucket_versioning"):
+            cfg = r.child("versioning_configuration")
+            status = cfg.attributes.get("status") if cfg else None
+            if status and status.literal == "Enabled":
+                versioned |= _referenced_buckets(r)
+    return blocked, versioned
+
+
+def _open_sensitive_port(block: Block, attr: Attribute) -> bool:
+    if CIDR_OPEN not in attr.value:
+        return False
+    ports = {block.attributes[k].literal for k in ("from_port", "to_port") if k in block.attributes}
+    return bool(ports & SENSITIVE_PORTS)
+
+
+# attribute name -> (rule id, severity, message, predicate); every block's
+# attributes are visited once and dispatched here, so adding a rule does
+# not add a pass over the file
+ATTRIBUTE_RULES: Dict[str, Tuple[str, str, str, Callable[[Block, Attribute], bool]]] = {
+    "cidr_blocks": (
+        "POLICY_001",
+        "CRITICAL",
+        "Security Group allows 0.0.0.0/0 on a sensitive port (22/3389/80/443).",
+        _open_sensitive_port,
+    ),
+    "acl": (
+        "POLICY_002",
+        "HIGH",
+        'S3 bucket has public ACL (acl="public-read" or similar).',
+        lambda _b, a: a.literal in PUBLIC_ACLS,
+    ),
+    "publicly_accessible": (
+        "POLICY_003",
+        "HIGH",
+        "RDS instance has `publicly_accessible = true`.",
+        lambda _b, a: a.is_true(),
+    ),
+}
+
+
+def _check_bucket(res: Block, path: str, blocked: Set[str], versioned: Set[str]) -> List[Finding]:
     findings: List[Finding] = []
-
-    
-    if CIDR_OPEN_RE.search(text):
-    
-        ports = set(m.group(2) for m in PORT_RE.finditer(text))
-        if ports & SENSITIVE_PORTS:
-    
-            line = text[: text.find("0.0.0.0/0")].count("\n") + 1
-            findings.append(
-                Finding(
-                    tool="policy",
-                    rule_id="POLICY_001",
-                    severity="CRITICAL",
-                    file=str(path.name),
-                    line=line,
-                    message="Security Group allows 0.0.0.0/0 on a sensitive port (22/3389/80/443).",
-                )
-            )
-
-    
-    if S3_ACL_PUBLIC_RE.search(text):
-        line = text[: S3_ACL_PUBLIC_RE.search(text).start()].count("\n") + 1
+    flag = res.attributes.get("block_public_acls")
+    if not (flag and flag.is_true()) and res.name not in blocked:
         findings.append(
-            Finding(
-                tool="policy",
-                rule_id="POLICY_002",
-                severity="HIGH",
-                file=str(path.name),
-                line=line,
-                message='S3 bucket has public ACL (acl="public-read" or similar).',
-            )
+            _finding("POLICY_002", "HIGH", path, res.line, "S3 bucket missing `block_public_acls = true`.")
         )
-    
-    if "resource \"aws_s3_bucket\"" in text:
-        if not S3_BLOCK_PUBLIC_ACLS_RE.search(text):
-            line = text.find("resource \"aws_s3_bucket\"")
-            line_no = text[: line].count("\n") + 1 if line >= 0 else 1
-            findings.append(
-                Finding(
-                    tool="policy",
-                    rule_id="POLICY_002",
-                    severity="HIGH",
-                    file=str(path.name),
-                    line=line_no,
-                    message="S3 bucket missing `block_public_acls = true`.",
-                )
-            )
-        if not S3_VERSIONING_ENABLED_RE.search(text):
-            line = text.find("resource \"aws_s3_bucket\"")
-            line_no = text[: line].count("\n") + 1 if line >= 0 else 1
-            findings.append(
-                Finding(
-                    tool="policy",
-                    rule_id="POLICY_002",
-                    severity="HIGH",
-                    file=str(path.name),
-                    line=line_no,
-                    message="S3 bucket missing `versioning { enabled = true }`.",
-                )
-            )
-
-    
-    if RDS_PUBLIC_RE.search(text):
-        line = text[: RDS_PUBLIC_RE.search(text).start()].count("\n") + 1
+    ver = res.child("versioning")
+    enabled = ver.attributes.get("enabled") if ver else None
+    if not (enabled and enabled.is_true()) and res.name not in versioned:
         findings.append(
-            Finding(
-                tool="policy",
-                rule_id="POLICY_003",
-                severity="HIGH",
-                file=str(path.name),
-                line=line,
-                message="RDS instance has `publicly_accessible = true`.",
-            )
+            _finding("POLICY_002", "HIGH", path, res.line, "S3 bucket missing `versioning { enabled = true }`.")
         )
+    return findings
+
 
+def _check_resource(res: Block, path: str, blocked: Set[str], versioned: Set[str]) -> List[Finding]:
+    findings: List[Finding] = []
+    for b in res.walk():
+        for name, attr in b.attributes.items():
+            rule = ATTRIBUTE_RULES.get(name)
+            if rule is not None and rule[3](b, attr):
+                findings.append(_finding(rule[0], rule[1], path, attr.line, rule[2]))
+
+    if res.resource_type == "aws_s3_bucket":
+        findings.extend(_check_bucket(res, path, blocked, versioned))
+    # attributes are visited in source order; keep the report in line order too
+    findings.sort(key=lambda f: f.line)
     return findings
 
 
-def run_policy_checks(base_dir: str) -> List[Finding]:
+def _scan_file(
+    path: Path,
+    blocked: Optional[Set[str]] = None,
+    versioned: Optional[Set[str]] = None,
+    rel_path: Optional[str] = None,
+) -> List[Finding]:
+    """
+    Every rule match in one file, in line order. Line numbers come from the
+    shared parse (a line-offset table searched by bisection), so the cost is
+    linear in file size however many rules or matches there are.
+    """
+    pf = parse_file(path)
+    if pf is None:
+        return []
+    if blocked is None or versioned is None:
+        blocked, versioned = _bucket_controls([pf])
+
+    label = rel_path or path.name
     findings: List[Finding] = []
-    for p in Path(base_dir).rglob("*.tf"):
-        findings.extend(_scan_file(p))
+    for res in pf.resources():
+        findings.extend(_check_resource(res, label, blocked, versioned))
     return findings
+
+
+def run_policy_checks(base_dir: str) -> List[Finding]:
+    return incremental_scan("policy", RULES_VERSION, base_dir, _scan_units)
+
+
+def _rel(unit: str, path: Path) -> str:
+    # root-relative label; files at the root keep their bare name
+    return path.name if unit == "." else f"{unit}/{path.name}"
+
+
+def scan_policy_units(base_dir: str, units: Iterable[str]) -> List[Finding]:
+    """Uncached policy scan of just the given module directories, ordered by unit."""
+    all_units = module_units(base_dir)
+    wanted = {u: all_units[u] for u in set(units) if u in all_units}
+    found = _scan_units(wanted, False) if wanted else {}
+    return [f for u in sorted(found) for f in found[u]]
+
+
+def _scan_unit_batch(batch: List[Tuple[str, List[Path]]]) -> List[Tuple[str, List[Finding]]]:
+    out: List[Tuple[str, List[Finding]]] = []
+    for u, tf_files in batch:
+        blocked, versioned = _bucket_controls(pf for pf in map(parse_file, tf_files) if pf is not None)
+        out.append((u, [f for p in tf_files for f in _scan_file(p, blocked, versioned, _rel(u, p))]))
+    return out
+
+
+def _scan_units(units: Dict[str, List[Path]], complete: bool) -> Dict[str, List[Finding]]:
+    # a unit is never split across chunks: bucket controls are module-wide
+    batch = [(u, [p for p in units[u] if p.suffix == ".tf"]) for u in sorted(units)]
+    out: Dict[str, List[Finding]] = {}
+    for part in map_chunked(_scan_unit_batch, batch, [len(files) for _, files in batch]):
+        out.update(part)
+    return out
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from ..config.settings import get_settings
+from ..models import Finding
+
+# files whose content determines scan results
+TF_SUFFIXES = (".tf", ".tf.json", ".tfvars")
+
+
+def iter_tf_files(base_dir: str) -> List[Path]:
+    root = Path(base_dir)
+    if root.is_file():
+        return [root]
+    return sorted(p for p in root.rglob("*") if p.is_file() and p.name.endswith(TF_SUFFIXES))
+
+
+def _dump(findings: List[Finding]) -> str:
+    return json.dumps([f.model_dump() for f in findings], ensure_ascii=False, separators=(",", ":"))
+
+
+def _load(blob: str) -> List[Finding]:
+    return [Finding(**d) for d in json.loads(blob)]
+
+
+class ScanCache:
+    """
+    Two-tier cache of scanner results keyed by content digest.
+    Tier 1 is a per-process LRU bounded by `memory_max_bytes`; tier 2 is an
+    optional SQLite file shared by every worker on the host, bounded by
+    `disk_max_bytes` and evicted least-recently-used first.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        memory_max_bytes: int = 16 * 1024 * 1024,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+    ) -> None:
+        self.path = path
+        self.memory_max_bytes = int(memory_max_bytes)
+        self.disk_max_bytes = int(disk_max_bytes)
+
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, Tuple[List[Finding], int]]" = OrderedDict()
+        self._mem_bytes = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self.counters: Dict[str, int] = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "evictions": 0,
+        }
+
+        if path:
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS scan_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS scan_cache_last_used ON scan_cache(last_used)")
+                # running byte total kept by triggers, so a put never sums the table
+                self._conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS scan_cache_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+                    INSERT OR IGNORE INTO scan_cache_size VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM scan_cache));
+                    CREATE TRIGGER IF NOT EXISTS scan_cache_size_ins AFTER INSERT ON scan_cache
+                    BEGIN UPDATE scan_cache_size SET total = total + NEW.size WHERE id = 0; END;
+                    CREATE TRIGGER IF NOT EXISTS scan_cache_size_del AFTER DELETE ON scan_cache
+                    BEGIN UPDATE scan_cache_size SET total = total - OLD.size WHERE id = 0; END;
+                    CREATE TRIGGER IF NOT EXISTS scan_cache_size_upd AFTER UPDATE OF size ON scan_cache
+                    BEGIN UPDATE scan_cache_size SET total = total + NEW.size - OLD.size WHERE id = 0; END;
+                    """
+                )
+            except Exception:
+                # disk tier is best-effort; memory tier still works
+                self._conn = None
+
+    @staticmethod
+    def make_key(scanner: str, fingerprint: str, digest: str) -> str:
+        return hashlib.sha256(f"{scanner}\0{fingerprint}\0{digest}".encode("utf-8")).hexdigest()
+
+    def _mem_put(self, key: str, findings: List[Finding], size: int) -> None:
+        if size > self.memory_max_bytes:
+            return
+        old = self._mem.pop(key, None)
+        if old is not None:
+            self._mem_bytes -= old[1]
+        self._mem[key] = (findings, size)
+        self._mem_bytes += size
+        while self._mem_bytes > self.memory_max_bytes and self._mem:
+            _, (_, sz) = self._mem.popitem(last=False)
+            self._mem_bytes -= sz
+            self.counters["evictions"] += 1
+
+    def get(self, key: str) -> Optional[List[Finding]]:
+        with self._lock:
+            hit = self._mem.get(key)
+            if hit is not None:
+                self._mem.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return list(hit[0])
+
+            if self._conn is not None:
+                try:
+                    row = self._conn.execute("SELECT value FROM scan_cache WHERE key = ?", (key,)).fetchone()
+                    if row is not None:
+                        self._conn.execute("UPDATE scan_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+                        findings = _load(row[0])
+                        self._mem_put(key, findings, len(row[0]))
+                        self.counters["disk_hits"] += 1
+                        return list(findings)
+                except Exception:
+                    pass
+
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, key: str, findings: List[Finding]) -> None:
+        blob = _dump(findings)
+        with self._lock:
+            self._mem_put(key, list(findings), len(blob))
+            if self._conn is None:
+                return
+            try:
+                # an upsert rather than INSERT OR REPLACE: REPLACE's implicit delete fires no trigger
+                self._conn.execute(
+                    "INSERT INTO scan_cache (key, value, size, last_used) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET value = excluded.value, size = excluded.size, "
+                    "last_used = excluded.last_used",
+                    (key, blob, len(blob), time.time()),
+                )
+                self._evict_disk()
+            except Exception:
+                pass
+
+    def _evict_disk(self) -> None:
+        assert self._conn is not None
+        total = self._conn.execute("SELECT total FROM scan_cache_size WHERE id = 0").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        doomed = []
+        for key, size in self._conn.execute("SELECT key, size FROM scan_cache ORDER BY last_used"):
+            if total <= self.disk_max_bytes:
+                break
+            doomed.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM scan_cache WHERE key = ?", doomed)
+        self.counters["evictions"] += len(doomed)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            out = dict(self.counters)
+            out["memory_entries"] = len(self._mem)
+            out["memory_bytes"] = self._mem_bytes
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._mem.clear()
+            self._mem_bytes = 0
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM scan_cache")
+                except Exception:
+                    pass
+
+
+_CACHE_SINGLETON: Optional[ScanCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_scan_cache() -> Optional[ScanCache]:
+    """Process-wide cache, or None when SCAN_CACHE_ENABLED is false."""
+    global _CACHE_SINGLETON
+    s = get_settings()
+    if not s.scan_cache_enabled:
+        return None
+    with _CACHE_LOCK:
+        if _CACHE_SINGLETON is None:
+            path = s.scan_cache_path or os.path.join(tempfile.gettempdir(), "autoinfra-scan-cache.sqlite3")
+            _CACHE_SINGLETON = ScanCache(
+                path=path,
+                memory_max_bytes=s.scan_cache_memory_mb * 1024 * 1024,
+                disk_max_bytes=s.scan_cache_disk_mb * 1024 * 1024,
+            )
+        return _CACHE_SINGLETON
+
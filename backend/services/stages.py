@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import multiprocessing
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Literal, Optional, Tuple
+
+from ..config.settings import get_settings
+from .jobs import Job
+
+StageKind = Literal["thread", "process", "inline"]
+
+
+@dataclass(frozen=True)
+class Stage:
+    """
+    One node of a run's stage graph.
+    `fn` is called with the results of `deps` as keyword arguments.
+    "thread" suits subprocess / I/O work, "process" CPU-bound work
+    (fn and its inputs must be picklable), "inline" runs on the caller.
+    """
+
+    name: str
+    fn: Callable[..., Any]
+    deps: Tuple[str, ...] = ()
+    kind: StageKind = "thread"
+
+
+def _timed(fn: Callable[..., Any], kwargs: Dict[str, Any]) -> Tuple[Any, int]:
+    start = time.perf_counter()
+    result = fn(**kwargs)
+    return result, int((time.perf_counter() - start) * 1000)
+
+
+_PROCESS_POOL: Optional[ProcessPoolExecutor] = None
+_PROCESS_POOL_LOCK = threading.Lock()
+
+
+def get_process_pool() -> Optional[ProcessPoolExecutor]:
+    """Shared pool for "process" stages; None when STAGE_PROCESS_WORKERS is 0."""
+    global _PROCESS_POOL
+    with _PROCESS_POOL_LOCK:
+        if _PROCESS_POOL is None:
+            workers = int(get_settings().stage_process_workers)
+            if workers <= 0:
+                return None
+            # spawn, not fork: the API process runs threads whose held locks a forked child would inherit
+            _PROCESS_POOL = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return _PROCESS_POOL
+
+
+def shutdown_process_pool() -> None:
+    global _PROCESS_POOL
+    with _PROCESS_POOL_LOCK:
+        pool, _PROCESS_POOL = _PROCESS_POOL, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _validate(stages: List[Stage]) -> None:
+    names = [s.name for s in stages]
+    if len(set(names)) != len(names):
+        raise ValueError("duplicate stage names")
+    seen = set()
+    for s in stages:
+        missing = [d for d in s.deps if d not in seen]
+        if missing:
+            raise ValueError(f"stage {s.name!r} depends on unknown or later stage(s) {missing}")
+        seen.add(s.name)
+
+
+def run_stages(
+    stages: List[Stage],
+    job: Optional[Job] = None,
+    max_threads: int = 4,
+) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """
+    Run `stages` as soon as their dependencies are done and return
+    (results by stage name, wall time in ms by stage name).
+    Stages must be listed in dependency order; the timing dict follows
+    that order regardless of completion order. The first stage error
+    (or a cancellation of `job`) is raised after in-flight work is dropped.
+    """
+    _validate(stages)
+
+    results: Dict[str, Any] = {}
+    elapsed: Dict[str, int] = {}
+    pending = list(stages)
+    running: Dict[Future, Stage] = {}
+    procs = get_process_pool() if any(s.kind == "process" for s in stages) else None
+
+    threads = ThreadPoolExecutor(max_workers=max(1, max_threads), thread_name_prefix="autoinfra-stage")
+    try:
+        while pending or running:
+            if job is not None:
+                job.raise_if_cancelled()
+
+            ready = [s for s in pending if all(d in results for d in s.deps)]
+            for s in ready:
+                pending.remove(s)
+                kwargs = {d: results[d] for d in s.deps}
+                if s.kind == "inline":
+                    results[s.name], elapsed[s.name] = _timed(s.fn, kwargs)
+                    continue
+                pool: Executor = procs if (s.kind == "process" and procs is not None) else threads
+                running[pool.submit(_timed, s.fn, kwargs)] = s
+
+            if not running:
+                continue
+
+            # poll so a cancelled job does not wait for a slow stage to finish
+            done, _ = wait(list(running), timeout=0.25 if job is not None else None, return_when=FIRST_COMPLETED)
+            for fut in done:
+                s = running.pop(fut)
+                results[s.name], elapsed[s.name] = fut.result()
+    finally:
+        for fut in running:
+            fut.cancel()
+        threads.shutdown(wait=False, cancel_futures=True)
+
+    return results, {s.name: elapsed[s.name] for s in stages}
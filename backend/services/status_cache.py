@@ -0,0 +1,366 @@
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from ..config.settings import get_settings
+from ..models import StatusResponse
+
+
+class StatusCache:
+    """
+    Run statuses for /status, bounded by entry count, bytes and age.
+    Finished runs live in an LRU; running ones are pinned so an active run
+    never reads as unknown, but only for `max_run_seconds`: a pin outliving
+    that belongs to a run whose worker died before publishing its result.
+    With `path`, every write also goes to a SQLite file shared by all
+    worker processes on the host, and local misses read through to it.
+    The same tier holds the newest head commit seen per PR, so webhook
+    deliveries coalesce across workers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 24 * 3600,
+        path: Optional[str] = None,
+        disk_max_bytes: int = 256 * 1024 * 1024,
+        max_run_seconds: float = 6 * 3600,
+    ) -> None:
+        self.max_entries = int(max_entries)
+        self.max_bytes = int(max_bytes)
+        self.ttl_seconds = float(ttl_seconds)
+        self.path = path
+        self.disk_max_bytes = int(disk_max_bytes)
+        self.max_run_seconds = float(max_run_seconds)
+
+        self._lock = threading.Lock()
+        # run_id -> (running doc, pinned at)
+        self._active: Dict[str, Tuple[StatusResponse, float]] = {}
+        # run_id -> (doc, size, stored at)
+        self._lru: "OrderedDict[str, Tuple[StatusResponse, int, float]]" = OrderedDict()
+        self._bytes = 0
+        # (repo, pr_number) -> (head sha, run_id); used when there is no shared tier
+        self._heads: Dict[Tuple[str, int], Tuple[str, str]] = {}
+        self._conn: Optional[sqlite3.Connection] = None
+        self.counters: Dict[str, int] = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+        if path:
+            try:
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+                self._conn = sqlite3.connect(path, timeout=5.0, check_same_thread=False, isolation_level=None)
+                self._conn.execute("PRAGMA journal_mode=WAL")
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS run_status ("
+                    "run_id TEXT PRIMARY KEY, doc TEXT NOT NULL, size INTEGER NOT NULL, stored_at REAL NOT NULL)"
+                )
+                self._conn.execute("CREATE INDEX IF NOT EXISTS run_status_stored_at ON run_status(stored_at)")
+                # running byte total kept by triggers, so a put never sums the table
+                self._conn.executescript(
+                    """
+                    CREATE TABLE IF NOT EXISTS run_status_size (id INTEGER PRIMARY KEY CHECK (id = 0), total INTEGER NOT NULL);
+                    INSERT OR IGNORE INTO run_status_size VALUES (0, (SELECT COALESCE(SUM(size), 0) FROM run_status));
+                    CREATE TRIGGER IF NOT EXISTS run_status_size_ins AFTER INSERT ON run_status
+                    BEGIN UPDATE run_status_size SET total = total + NEW.size WHERE id = 0; END;
+                    CREATE TRIGGER IF NOT EXISTS run_status_size_del AFTER DELETE ON run_status
+                    BEGIN UPDATE run_status_size SET total = total - OLD.size WHERE id = 0; END;
+                    CREATE TRIGGER IF NOT EXISTS run_status_size_upd AFTER UPDATE OF size ON run_status
+                    BEGIN UPDATE run_status_size SET total = total + NEW.size - OLD.size WHERE id = 0; END;
+                    """
+                )
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS pr_heads ("
+                    "repo TEXT NOT NULL, pr_number INTEGER NOT NULL, sha TEXT NOT NULL, run_id TEXT NOT NULL, "
+                    "PRIMARY KEY (repo, pr_number))"
+                )
+            except Exception:
+                # shared tier is best-effort; this process still serves its own runs
+                self._conn = None
+
+    def _lru_put(self, doc: StatusResponse, size: int, stored_at: float) -> None:
+        old = self._lru.pop(doc.run_id, None)
+        if old is not None:
+            self._bytes -= old[1]
+        if size > self.max_bytes:
+            return
+        self._lru[doc.run_id] = (doc, size, stored_at)
+        self._bytes += size
+        while self._lru and (len(self._lru) > self.max_entries or self._bytes > self.max_bytes):
+            _, (_, sz, _) = self._lru.popitem(last=False)
+            self._bytes -= sz
+            self.counters["evictions"] += 1
+
+    def _lru_get(self, run_id: str) -> Optional[StatusResponse]:
+        hit = self._lru.get(run_id)
+        if hit is None:
+            return None
+        doc, size, stored_at = hit
+        if time.time() - stored_at > self.ttl_seconds:
+            del self._lru[run_id]
+            self._bytes -= size
+            self.counters["expired"] += 1
+            return None
+        self._lru.move_to_end(run_id)
+        return doc
+
+    def _active_get(self, run_id: str) -> Optional[StatusResponse]:
+        pinned = self._active.get(run_id)
+        if pinned is None:
+            return None
+        if time.time() - pinned[1] > self.max_run_seconds:
+            del self._active[run_id]
+            self.counters["expired"] += 1
+            return None
+        return pinned[0]
+
+    def _sweep_active(self, now: float) -> None:
+        stale = [run_id for run_id, (_, pinned_at) in self._active.items() if now - pinned_at > self.max_run_seconds]
+        for run_id in stale:
+            del self._active[run_id]
+        self.counters["expired"] += len(stale)
+
+    def get(self, run_id: str) -> Optional[StatusResponse]:
+        with self._lock:
+            doc = self._active_get(run_id) or self._lru_get(run_id)
+            # another worker may have finished or cancelled it since
+            if doc is not None and (doc.status != "running" or self._conn is None):
+                self.counters["hits"] += 1
+                return doc
+
+            shared = self._disk_get(run_id)
+            if shared is not None:
+                self.counters["disk_hits"] += 1
+                if shared.status != "running":
+                    self._active.pop(run_id, None)
+                    self._lru_put(shared, len(shared.model_dump_json()), time.time())
+                return shared
+            if doc is not None:
+                self.counters["hits"] += 1
+                return doc
+            self.counters["misses"] += 1
+            return None
+
+    def put(self, doc: StatusResponse) -> None:
+        blob = doc.model_dump_json()
+        now = time.time()
+        with self._lock:
+            if doc.status == "running":
+                old = self._lru.pop(doc.run_id, None)
+                if old is not None:
+                    self._bytes -= old[1]
+                self._sweep_active(now)
+                self._active[doc.run_id] = (doc, now)
+            else:
+                self._active.pop(doc.run_id, None)
+                self._lru_put(doc, len(blob), now)
+            self._disk_put(doc.run_id, blob, now)
+
+    def settle(self, doc: StatusResponse) -> StatusResponse:
+        """
+        Publish a finished run's status unless it already finished, here or
+        on another worker sharing `path`, and return the status that stands:
+        the first final status wins, so a cancel is never overwritten by a
+        late "completed" and a cancel after completion is a no-op.
+        """
+        blob = doc.model_dump_json()
+        now = time.time()
+        with self._lock:
+            if self._conn is None:
+                current = self._active_get(doc.run_id) or self._lru_get(doc.run_id)
+                if current is not None and current.status != "running":
+                    return current
+                self._active.pop(doc.run_id, None)
+                self._lru_put(doc, len(blob), now)
+                return doc
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute("SELECT doc FROM run_status WHERE run_id = ?", (doc.run_id,)).fetchone()
+                    current = StatusResponse.model_validate_json(row[0]) if row is not None else None
+                    if current is None or current.status == "running":
+                        self._disk_put(doc.run_id, blob, now)
+                        current = doc
+                finally:
+                    self._conn.execute("COMMIT")
+            except Exception:
+                current = doc
+            self._active.pop(doc.run_id, None)
+            self._lru_put(current, len(current.model_dump_json()), now)
+            return current
+
+    def pop(self, run_id: str) -> Optional[StatusResponse]:
+        with self._lock:
+            pinned = self._active.pop(run_id, None)
+            doc = pinned[0] if pinned is not None else None
+            old = self._lru.pop(run_id, None)
+            if old is not None:
+                self._bytes -= old[1]
+                doc = doc or old[0]
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM run_status WHERE run_id = ?", (run_id,))
+                except Exception:
+                    pass
+            return doc
+
+    def claim_pr_head(self, repo: str, pr_number: int, sha: str, run_id: str) -> Optional[Tuple[str, str]]:
+        """
+        Record `run_id` as the run for the PR's newest head and return the
+        previous (sha, run_id). When the previous head is the same sha
+        nothing is written, so the caller can coalesce the delivery.
+        Atomic across workers sharing `path`.
+        """
+        key = (repo, int(pr_number))
+        with self._lock:
+            if self._conn is None:
+                prev = self._heads.get(key)
+                if prev is None or prev[0] != sha:
+                    self._heads[key] = (sha, run_id)
+                return prev
+            try:
+                self._conn.execute("BEGIN IMMEDIATE")
+                try:
+                    row = self._conn.execute(
+                        "SELECT sha, run_id FROM pr_heads WHERE repo = ? AND pr_number = ?", key
+                    ).fetchone()
+                    if row is None or row[0] != sha:
+                        self._conn.execute(
+                            "INSERT OR REPLACE INTO pr_heads (repo, pr_number, sha, run_id) VALUES (?, ?, ?, ?)",
+                            (*key, sha, run_id),
+                        )
+                finally:
+                    self._conn.execute("COMMIT")
+            except Exception:
+                return None
+            return (row[0], row[1]) if row is not None else None
+
+    def pr_head(self, repo: str, pr_number: int) -> Optional[Tuple[str, str]]:
+        key = (repo, int(pr_number))
+        with self._lock:
+            if self._conn is None:
+                return self._heads.get(key)
+            try:
+                row = self._conn.execute(
+                    "SELECT sha, run_id FROM pr_heads WHERE repo = ? AND pr_number = ?", key
+                ).fetchone()
+            except Exception:
+                return None
+            return (row[0], row[1]) if row is not None else None
+
+    def release_pr_head(
+        self, repo: str, pr_number: int, run_id: str, previous: Optional[Tuple[str, str]] = None
+    ) -> None:
+        """Forget the PR's head if `run_id` still holds it, or put `previous` back."""
+        key = (repo, int(pr_number))
+        with self._lock:
+            if self._conn is None:
+                if self._heads.get(key, ("", ""))[1] == run_id:
+                    if previous is None:
+                        del self._heads[key]
+                    else:
+                        self._heads[key] = previous
+                return
+            try:
+                if previous is None:
+                    self._conn.execute(
+                        "DELETE FROM pr_heads WHERE repo = ? AND pr_number = ? AND run_id = ?", (*key, run_id)
+                    )
+                else:
+                    self._conn.execute(
+                        "UPDATE pr_heads SET sha = ?, run_id = ? WHERE repo = ? AND pr_number = ? AND run_id = ?",
+                        (*previous, *key, run_id),
+                    )
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            out: Dict[str, float] = dict(self.counters)
+            lookups = self.counters["hits"] + self.counters["disk_hits"] + self.counters["misses"]
+            out["hit_rate"] = round((self.counters["hits"] + self.counters["disk_hits"]) / lookups, 4) if lookups else 0.0
+            out["active"] = len(self._active)
+            out["entries"] = len(self._lru)
+            out["resident_bytes"] = self._bytes
+            out["shared"] = self._conn is not None
+        return out
+
+    def clear(self) -> None:
+        with self._lock:
+            self._active.clear()
+            self._lru.clear()
+            self._heads.clear()
+            self._bytes = 0
+            if self._conn is not None:
+                try:
+                    self._conn.execute("DELETE FROM run_status")
+                    self._conn.execute("DELETE FROM pr_heads")
+                except Exception:
+                    pass
+
+    def _disk_get(self, run_id: str) -> Optional[StatusResponse]:
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute(
+                "SELECT doc, stored_at FROM run_status WHERE run_id = ?", (run_id,)
+            ).fetchone()
+        except Exception:
+            return None
+        if row is None or time.time() - row[1] > self.ttl_seconds:
+            return None
+        return StatusResponse.model_validate_json(row[0])
+
+    def _disk_put(self, run_id: str, blob: str, now: float) -> None:
+        if self._conn is None:
+            return
+        try:
+            # an upsert rather than INSERT OR REPLACE: REPLACE's implicit delete fires no trigger
+            self._conn.execute(
+                "INSERT INTO run_status (run_id, doc, size, stored_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(run_id) DO UPDATE SET doc = excluded.doc, size = excluded.size, "
+                "stored_at = excluded.stored_at",
+                (run_id, blob, len(blob), now),
+            )
+            self._trim_disk(now)
+        except Exception:
+            pass
+
+    def _trim_disk(self, now: float) -> None:
+        assert self._conn is not None
+        self._conn.execute("DELETE FROM run_status WHERE stored_at < ?", (now - self.ttl_seconds,))
+        total = self._conn.execute("SELECT total FROM run_status_size WHERE id = 0").fetchone()[0]
+        if total <= self.disk_max_bytes:
+            return
+        doomed = []
+        for run_id, size in self._conn.execute("SELECT run_id, size FROM run_status ORDER BY stored_at"):
+            if total <= self.disk_max_bytes:
+                break
+            doomed.append((run_id,))
+            total -= size
+        self._conn.executemany("DELETE FROM run_status WHERE run_id = ?", doomed)
+        self.counters["evictions"] += len(doomed)
+
+
+_CACHE_SINGLETON: Optional[StatusCache] = None
+_CACHE_LOCK = threading.Lock()
+
+
+def get_status_cache() -> StatusCache:
+    global _CACHE_SINGLETON
+    with _CACHE_LOCK:
+        if _CACHE_SINGLETON is None:
+            s = get_settings()
+            _CACHE_SINGLETON = StatusCache(
+                max_entries=s.status_cache_entries,
+                max_bytes=s.status_cache_memory_mb * 1024 * 1024,
+                ttl_seconds=s.status_cache_ttl_s,
+                path=s.status_cache_path or None,
+                disk_max_bytes=s.status_cache_disk_mb * 1024 * 1024,
+                max_run_seconds=s.status_cache_max_run_s,
+            )
+        return _CACHE_SINGLETON
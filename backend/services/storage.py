@@ -1,18 +1,60 @@
 
 from __future__ import annotations
 
+import base64
+import bisect
+import calendar
+import gzip
+import math
 import os
 import json
-from typing import List, Optional, Dict, Any, Protocol
-from datetime import datetime
+import threading
+import time
+from typing import Callable, Iterator, List, Optional, Dict, Any, Protocol, Tuple
+from datetime import date, datetime, timedelta, timezone
 
 import httpx
 
 from ..config.settings import get_settings
-from ..models import RunSummary, Finding, HistoryItem
+from ..models import RunSummary, Finding, HistoryItem, RepoStat, RuleStat, StatsResponse
+from .telemetry import STORAGE_SECONDS
 
 DB_NAME = "autoinfra"
 
+# history position: (created_at, run_id) of the last item already returned
+Cursor = Tuple[datetime, str]
+
+# columns of Storage.export records, per kind
+EXPORT_FIELDS: Dict[str, Tuple[str, ...]] = {
+    "runs": (
+        "run_id", "repo", "pr_number", "commit_sha", "status",
+        "duration_ms", "cost_usd_month", "issues", "fails", "created_at",
+    ),
+    "findings": ("run_id", "repo", "tool", "rule_id", "severity", "file", "line", "message", "created_at"),
+}
+
+
+def encode_cursor(item: HistoryItem) -> str:
+    raw = json.dumps([item.created_at.isoformat(), item.run_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Cursor:
+    """Inverse of encode_cursor; ValueError on anything malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        created, run_id = json.loads(raw)
+        return as_utc(datetime.fromisoformat(created)), str(run_id)
+    except Exception as e:
+        raise ValueError("invalid cursor") from e
+
+
+def as_utc(dt: datetime) -> datetime:
+    """Naive UTC, the form created_at is stored in."""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt
+
 
 class Storage(Protocol):
     def insert_run(
@@ -25,7 +67,7 @@ class Storage(Protocol):
         summary: RunSummary,
     ) -> None: ...
 
-    def insert_findings(self, run_id: str, findings: List[Finding]) -> None: ...
+    def insert_findings(self, run_id: str, findings: List[Finding], repo: str = "") -> None: ...
 
     def insert_outcome(
         self,
@@ -44,20 +86,95 @@ class Storage(Protocol):
         accepted: Optional[bool] = None,
     ) -> None: ...
 
-    def history(self, limit: int = 20) -> List[HistoryItem]: ...
+    def history(
+        self,
+        limit: int = 20,
+        *,
+        before: Optional[Cursor] = None,
+        repo: Optional[str] = None,
+        pr_number: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[HistoryItem]: ...
 
     def get_status(self, run_id: str) -> Dict[str, Any]: ...
 
+    def stats(self, days: int = 7, repo: Optional[str] = None, top: int = 10) -> StatsResponse: ...
+
+    def export(
+        self,
+        kind: str = "runs",
+        *,
+        repo: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Iterator[Dict[str, Any]]: ...
+
+
+class DurationHistogram:
+    """
+    Run durations in log-spaced buckets (10% wide, so quantiles are within
+    ~5%): fixed size however many runs are added and mergeable across days
+    and repos.
+    """
+
+    GROWTH = 1.1
 
-class MemoryStorage:
     def __init__(self) -> None:
-        
-        self._runs: List[Dict[str, Any]] = []
+        self.count = 0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, ms: float) -> None:
+        b = 0 if ms < 1 else int(math.log(ms, self.GROWTH)) + 1
+        self.buckets[b] = self.buckets.get(b, 0) + 1
+        self.count += 1
+
+    def merge(self, other: "DurationHistogram") -> None:
+        for b, n in other.buckets.items():
+            self.buckets[b] = self.buckets.get(b, 0) + n
+        self.count += other.count
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = max(1, math.ceil(q * self.count))  # nearest-rank
+        seen = 0
+        for b in sorted(self.buckets):
+            seen += self.buckets[b]
+            if seen >= rank:
+                # geometric middle of [GROWTH^(b-1), GROWTH^b)
+                return 0.0 if b == 0 else round(self.GROWTH ** (b - 0.5), 1)
+        return 0.0
+
+
+class MemoryStorage:
+    """
+    In-process storage for single-node deployments. Runs are indexed by
+    run_id and kept in creation order, so history is read newest-first
+    without sorting; per-run counts are computed once when findings arrive.
+    Runs older than `retention_days` (the ClickHouse TTL) or beyond
+    `max_runs` are dropped along with everything attached to them.
+    """
+
+    def __init__(self, retention_days: float = 30, max_runs: int = 10000) -> None:
+        self.retention = timedelta(days=retention_days)
+        self.max_runs = int(max_runs)
+        self._lock = threading.RLock()
+        self._runs: Dict[str, Dict[str, Any]] = {}
+        # (created_at, run_id) ascending, newest at the end; overall, per repo and per PR
+        self._order: List[Cursor] = []
+        self._by_repo: Dict[str, List[Cursor]] = {}
+        self._by_pr: Dict[Tuple[str, int], List[Cursor]] = {}
         self._findings: Dict[str, List[Finding]] = {}
+        self._counts: Dict[str, Tuple[int, int]] = {}  # run_id -> (checkov issues, policy fails)
         self._outcomes: Dict[str, Dict[str, Any]] = {}
         self._patches: Dict[str, List[Dict[str, Any]]] = {}
         
         self._extras: Dict[str, Dict[str, Any]] = {}
+        # /stats rollups, same grain as the ClickHouse materialized views
+        self._rule_rollup: Dict[Tuple[date, str, str, str, str], List[int]] = {}  # (day, repo, rule, severity, tool) -> [findings, runs]
+        self._run_rollup: Dict[Tuple[date, str], DurationHistogram] = {}
+        self._rollup_floor: Optional[date] = None
 
     def insert_run(
         self,
@@ -78,10 +195,80 @@ class MemoryStorage:
             "cost_usd_month": float(summary.cost_usd_month),
             "created_at": datetime.utcnow(),
         }
-        self._runs.append(row)
+        key = (row["created_at"], run_id)
+        with self._lock:
+            old = self._runs.get(run_id)
+            if old is not None:
+                self._order.remove((old["created_at"], run_id))
+                self._by_repo[old["repo"]].remove((old["created_at"], run_id))
+                self._by_pr[(old["repo"], old["pr_number"])].remove((old["created_at"], run_id))
+            self._runs[run_id] = row
+            day = row["created_at"].date()
+            self._run_rollup.setdefault((day, repo), DurationHistogram()).add(row["duration_ms"])
+            for keys in (
+                self._order,
+                self._by_repo.setdefault(repo, []),
+                self._by_pr.setdefault((repo, row["pr_number"]), []),
+            ):
+                if not keys or keys[-1] <= key:
+                    keys.append(key)
+                else:
+                    bisect.insort(keys, key)
+            self._expire(row["created_at"])
+
+    def _expire(self, now: datetime) -> None:
+        cutoff = now - self.retention
+        if self._rollup_floor != cutoff.date():
+            # rollups are per day, so they only need trimming once a day
+            self._rollup_floor = cutoff.date()
+            for rollup in (self._rule_rollup, self._run_rollup):
+                for key in [k for k in rollup if k[0] < self._rollup_floor]:
+                    del rollup[key]
+        drop = 0
+        while drop < len(self._order) and (
+            self._order[drop][0] < cutoff or len(self._order) - drop > self.max_runs
+        ):
+            drop += 1
+        if not drop:
+            return
+        per_repo: Dict[str, int] = {}
+        per_pr: Dict[Tuple[str, int], int] = {}
+        for _, run_id in self._order[:drop]:
+            row = self._runs.pop(run_id)
+            repo, pr = row["repo"], (row["repo"], row["pr_number"])
+            per_repo[repo] = per_repo.get(repo, 0) + 1
+            per_pr[pr] = per_pr.get(pr, 0) + 1
+            self._findings.pop(run_id, None)
+            self._counts.pop(run_id, None)
+            self._outcomes.pop(run_id, None)
+            self._patches.pop(run_id, None)
+            self._extras.pop(run_id, None)
+        del self._order[:drop]
+        # the oldest runs overall are also the oldest of their repo and PR
+        for index, counts in ((self._by_repo, per_repo), (self._by_pr, per_pr)):
+            for k, n in counts.items():
+                del index[k][:n]
+                if not index[k]:
+                    del index[k]
 
-    def insert_findings(self, run_id: str, findings: List[Finding]) -> None:
-        self._findings[run_id] = list(findings)
+    def insert_findings(self, run_id: str, findings: List[Finding], repo: str = "") -> None:
+        findings = list(findings)
+        issues = sum(1 for f in findings if getattr(f, "tool", "") == "checkov")
+        fails = sum(1 for f in findings if getattr(f, "tool", "") == "policy")
+        per_rule: Dict[Tuple[str, str, str], int] = {}
+        for f in findings:
+            k = (f.rule_id, f.severity, f.tool)
+            per_rule[k] = per_rule.get(k, 0) + 1
+        with self._lock:
+            self._findings[run_id] = findings
+            self._counts[run_id] = (issues, fails)
+            row = self._runs.get(run_id)
+            repo = repo or (row["repo"] if row else "")
+            day = datetime.utcnow().date()
+            for (rule_id, severity, tool), n in per_rule.items():
+                agg = self._rule_rollup.setdefault((day, repo, rule_id, severity, tool), [0, 0])
+                agg[0] += n
+                agg[1] += 1
 
     def insert_outcome(
         self,
@@ -92,13 +279,15 @@ class MemoryStorage:
         policy_after: int,
         safe_to_merge: Optional[bool],
     ) -> None:
-        self._outcomes[run_id] = {
+        outcome = {
             "issues_before": int(issues_before),
             "issues_after": int(issues_after),
             "policy_before": int(policy_before),
             "policy_after": int(policy_after),
             "safe_to_merge": None if safe_to_merge is None else bool(safe_to_merge),
         }
+        with self._lock:
+            self._outcomes[run_id] = outcome
 
     def insert_patch(
         self,
@@ -106,44 +295,162 @@ class MemoryStorage:
         patch_markdown: str,
         accepted: Optional[bool] = None,
     ) -> None:
-        self._patches.setdefault(run_id, []).append(
-            {
-                "patch_markdown": patch_markdown,
-                "accepted": None if accepted is None else bool(accepted),
-                "created_at": datetime.utcnow(),
-            }
-        )
+        with self._lock:
+            self._patches.setdefault(run_id, []).append(
+                {
+                    "patch_markdown": patch_markdown,
+                    "accepted": None if accepted is None else bool(accepted),
+                    "created_at": datetime.utcnow(),
+                }
+            )
 
-    def history(self, limit: int = 20) -> List[HistoryItem]:
+    def history(
+        self,
+        limit: int = 20,
+        *,
+        before: Optional[Cursor] = None,
+        repo: Optional[str] = None,
+        pr_number: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[HistoryItem]:
+        """Newest first, strictly older than `before`; `since` is inclusive, `until` exclusive."""
         items: List[HistoryItem] = []
-        
-        for row in sorted(self._runs, key=lambda r: r["created_at"], reverse=True)[:limit]:
-            run_id = row["run_id"]
-            findings = self._findings.get(run_id, [])
-            issues = sum(1 for f in findings if getattr(f, "tool", "") == "checkov")
-            fails = sum(1 for f in findings if getattr(f, "tool", "") == "policy")
-            items.append(
-                HistoryItem(
-                    run_id=run_id,
-                    commit_sha=row["commit_sha"],
-                    issues=issues,
-                    fails=fails,
-                    cost=row["cost_usd_month"],
-                    duration_ms=row["duration_ms"],
-                    created_at=row["created_at"],
+        since = as_utc(since) if since is not None else None
+        until = as_utc(until) if until is not None else None
+        with self._lock:
+            if repo is not None and pr_number is not None:
+                keys = self._by_pr.get((repo, pr_number), [])
+            else:
+                keys = self._by_repo.get(repo, []) if repo is not None else self._order
+            # bisect straight to the page, however deep the cursor is
+            cutoff = datetime.utcnow() - self.retention
+            lo = bisect.bisect_left(keys, (max(cutoff, since or cutoff), ""))
+            hi = len(keys)
+            if until is not None:
+                hi = bisect.bisect_left(keys, (until, ""), lo, hi)
+            if before is not None:
+                hi = bisect.bisect_left(keys, before, lo, hi)
+            for i in range(hi - 1, lo - 1, -1):
+                if len(items) >= limit:
+                    break
+                created_at, run_id = keys[i]
+                row = self._runs[run_id]
+                # a PR number without its repo has no index; filter the scan
+                if pr_number is not None and row["pr_number"] != pr_number:
+                    continue
+                issues, fails = self._counts.get(run_id, (0, 0))
+                items.append(
+                    HistoryItem(
+                        run_id=run_id,
+                        commit_sha=row["commit_sha"],
+                        issues=issues,
+                        fails=fails,
+                        cost=row["cost_usd_month"],
+                        duration_ms=row["duration_ms"],
+                        created_at=created_at,
+                    )
                 )
-            )
         return items
 
-    def get_status(self, run_id: str) -> Dict[str, Any]:
-        
-        run_row = next((r for r in self._runs if r["run_id"] == run_id), None)
-        if not run_row:
-            raise KeyError("run_id not found")
+    def stats(self, days: int = 7, repo: Optional[str] = None, top: int = 10) -> StatsResponse:
+        """Served from the rollups: cost depends on rules x repos x days, not on stored runs."""
+        floor = datetime.utcnow().date() - timedelta(days=days - 1)
+        rules: Dict[Tuple[str, str, str], List[int]] = {}
+        findings_by: Dict[Tuple[str, str], int] = {}
+        durations: Dict[str, DurationHistogram] = {}
+        with self._lock:
+            for (day, r, rule_id, severity, tool), (n, runs) in self._rule_rollup.items():
+                if day < floor or (repo is not None and r != repo):
+                    continue
+                agg = rules.setdefault((rule_id, severity, tool), [0, 0])
+                agg[0] += n
+                agg[1] += runs
+                findings_by[(r, severity)] = findings_by.get((r, severity), 0) + n
+            for (day, r), hist in self._run_rollup.items():
+                if day < floor or (repo is not None and r != repo):
+                    continue
+                durations.setdefault(r, DurationHistogram()).merge(hist)
+
+        overall = DurationHistogram()
+        for hist in durations.values():
+            overall.merge(hist)
+        top_rules = sorted(rules.items(), key=lambda kv: (-kv[1][0], kv[0]))[:top]
+        return _stats_response(
+            days,
+            repo,
+            top,
+            rules=[(*k, n, runs) for k, (n, runs) in top_rules],
+            findings_by=findings_by,
+            latency={r: (h.count, h.quantile(0.5), h.quantile(0.95)) for r, h in durations.items()},
+            overall=(overall.count, overall.quantile(0.5), overall.quantile(0.95)),
+        )
+
+    # runs read per lock acquisition while exporting
+    EXPORT_CHUNK = 500
+
+    def export(
+        self,
+        kind: str = "runs",
+        *,
+        repo: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Oldest first. Walks the key list in chunks from a keyset position,
+        so memory stays bounded and writers are never blocked for long.
+        """
+        if kind not in EXPORT_FIELDS:
+            raise ValueError(f"unknown export kind {kind!r}")
+        since = as_utc(since) if since is not None else None
+        until = as_utc(until) if until is not None else None
+        pos: Optional[Cursor] = None
+        while True:
+            with self._lock:
+                keys = self._by_repo.get(repo, []) if repo is not None else self._order
+                if pos is not None:
+                    lo = bisect.bisect_right(keys, pos)
+                else:
+                    cutoff = datetime.utcnow() - self.retention
+                    lo = bisect.bisect_left(keys, (max(cutoff, since or cutoff), ""))
+                hi = bisect.bisect_left(keys, (until, ""), lo) if until is not None else len(keys)
+                chunk = keys[lo : min(hi, lo + self.EXPORT_CHUNK)]
+                records = [rec for key in chunk for rec in self._export_records(kind, key[1])]
+            if not chunk:
+                return
+            yield from records
+            pos = chunk[-1]
 
-        findings = self._findings.get(run_id, [])
-        checkov_issues = sum(1 for f in findings if getattr(f, "tool", "") == "checkov")
-        policy_fails = sum(1 for f in findings if getattr(f, "tool", "") == "policy")
+    def _export_records(self, kind: str, run_id: str) -> List[Dict[str, Any]]:
+        row = self._runs[run_id]
+        if kind == "runs":
+            issues, fails = self._counts.get(run_id, (0, 0))
+            return [{**row, "issues": issues, "fails": fails}]
+        return [
+            {
+                "run_id": run_id,
+                "repo": row["repo"],
+                "tool": f.tool,
+                "rule_id": f.rule_id,
+                "severity": f.severity,
+                "file": f.file,
+                "line": f.line,
+                "message": f.message,
+                "created_at": row["created_at"],
+            }
+            for f in self._findings.get(run_id, [])
+        ]
+
+    def get_status(self, run_id: str) -> Dict[str, Any]:
+        with self._lock:
+            run_row = self._runs.get(run_id)
+            if not run_row or run_row["created_at"] < datetime.utcnow() - self.retention:
+                raise KeyError("run_id not found")
+            findings = self._findings.get(run_id, [])
+            checkov_issues, policy_fails = self._counts.get(run_id, (0, 0))
+            extras = dict(self._extras.get(run_id, {}))
+            outcome = dict(self._outcomes.get(run_id, {}))
 
         summary = {
             "checkov_issues": checkov_issues,
@@ -152,9 +459,6 @@ class MemoryStorage:
             "duration_ms": int(run_row["duration_ms"]),
         }
 
-        extras = self._extras.get(run_id, {})
-        outcome = self._outcomes.get(run_id, {})
-
         return {
             "run_id": run_id,
             "status": run_row["status"],
@@ -175,11 +479,137 @@ class MemoryStorage:
 
     
     def set_extras(self, run_id: str, *, llm_comment_markdown: Optional[str] = None, self_check: Optional[Dict[str, Any]] = None) -> None:
-        d = self._extras.setdefault(run_id, {})
-        if llm_comment_markdown is not None:
-            d["llm_comment_markdown"] = llm_comment_markdown
-        if self_check is not None:
-            d["self_check"] = self_check
+        with self._lock:
+            d = self._extras.setdefault(run_id, {})
+            if llm_comment_markdown is not None:
+                d["llm_comment_markdown"] = llm_comment_markdown
+            if self_check is not None:
+                d["self_check"] = self_check
+
+
+def _stats_response(
+    days: int,
+    repo: Optional[str],
+    top: int,
+    rules: List[Tuple[str, str, str, int, int]],
+    findings_by: Dict[Tuple[str, str], int],
+    latency: Dict[str, Tuple[int, float, float]],
+    overall: Tuple[int, float, float],
+) -> StatsResponse:
+    """Shape either backend's rollup rows: rules are (rule, severity, tool, findings, runs), latency is (runs, p50, p95)."""
+    by_severity: Dict[str, int] = {}
+    repo_findings: Dict[str, int] = {}
+    for (r, severity), n in findings_by.items():
+        by_severity[severity] = by_severity.get(severity, 0) + n
+        repo_findings[r] = repo_findings.get(r, 0) + n
+    repos = sorted(set(latency) | set(repo_findings), key=lambda r: (-repo_findings.get(r, 0), r))[:top]
+    return StatsResponse(
+        days=days,
+        repo=repo,
+        runs=overall[0],
+        findings=sum(by_severity.values()),
+        p50_ms=overall[1],
+        p95_ms=overall[2],
+        by_severity=by_severity,
+        top_rules=[
+            RuleStat(rule_id=rule_id, severity=severity, tool=tool, findings=int(n), runs=int(runs))
+            for rule_id, severity, tool, n, runs in rules
+        ],
+        repos=[
+            RepoStat(
+                repo=r,
+                runs=latency.get(r, (0, 0.0, 0.0))[0],
+                findings=repo_findings.get(r, 0),
+                p50_ms=latency.get(r, (0, 0.0, 0.0))[1],
+                p95_ms=latency.get(r, (0, 0.0, 0.0))[2],
+            )
+            for r in repos
+        ],
+    )
+
+
+class BatchWriter:
+    """
+    Write-behind buffer of rows per table. A daemon thread hands each
+    table's rows to `send(table, rows)` as one batch every
+    `flush_interval` seconds, or sooner once a table holds `max_rows`.
+    Failed batches are retried on the next flush, keeping at most
+    `max_buffered` rows per table (oldest dropped first).
+    """
+
+    def __init__(
+        self,
+        send: Callable[[str, List[Dict[str, Any]]], None],
+        flush_interval: float = 1.0,
+        max_rows: int = 5000,
+        max_buffered: int = 100_000,
+    ) -> None:
+        self._send = send
+        self.flush_interval = float(flush_interval)
+        self.max_rows = int(max_rows)
+        self.max_buffered = int(max_buffered)
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {}
+        self._cond = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._closed = False
+        self.counters: Dict[str, int] = {"rows": 0, "batches": 0, "errors": 0, "dropped": 0}
+        self._thread = threading.Thread(target=self._loop, name="autoinfra-ch-writer", daemon=True)
+        self._thread.start()
+
+    def add(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        with self._cond:
+            buf = self._buffers.setdefault(table, [])
+            buf.extend(rows)
+            if len(buf) >= self.max_rows:
+                self._cond.notify()
+
+    def _loop(self) -> None:
+        while True:
+            with self._cond:
+                if not self._closed:
+                    self._cond.wait(self.flush_interval)
+                closed = self._closed
+            self.flush()
+            if closed:
+                return
+
+    def flush(self) -> None:
+        # one flusher at a time keeps batches for a table in order
+        with self._flush_lock:
+            with self._cond:
+                pending, self._buffers = self._buffers, {}
+            for table, rows in pending.items():
+                try:
+                    self._send(table, rows)
+                    self.counters["rows"] += len(rows)
+                    self.counters["batches"] += 1
+                except Exception:
+                    self.counters["errors"] += 1
+                    self._requeue(table, rows)
+
+    def _requeue(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        with self._cond:
+            buf = rows + self._buffers.get(table, [])
+            overflow = len(buf) - self.max_buffered
+            if overflow > 0:
+                buf = buf[overflow:]
+                self.counters["dropped"] += overflow
+            self._buffers[table] = buf
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(b) for b in self._buffers.values())
+
+    def close(self) -> None:
+        """Stop the thread after a final flush."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify()
+        self._thread.join(timeout=max(5.0, self.flush_interval * 2))
 
 
 class ClickHouseStorage:
@@ -188,12 +618,41 @@ class ClickHouseStorage:
     Expects tables created via ops/clickhouse/init.sql.
     """
 
-    def __init__(self, url: str, user: str = "default", password: str = "") -> None:
+    def __init__(
+        self,
+        url: str,
+        user: str = "default",
+        password: str = "",
+        flush_interval_ms: int = 0,
+        batch_rows: int = 5000,
+        async_insert: bool = False,
+        timeout_s: float = 10.0,
+        max_connections: int = 8,
+        max_execution_time_s: int = 10,
+        compress: bool = True,
+    ) -> None:
         # url examples: http://localhost:8123
         self.url = str(url).rstrip("/")  
         self.user = str(user or "")
         self.password = str(password or "")
-        self._client = httpx.Client(timeout=10.0)
+        self.async_insert = bool(async_insert)
+        self.max_execution_time_s = int(max_execution_time_s)
+        self.compress = bool(compress)
+        # bounded keep-alive pool shared by request threads and the batch writer
+        self._client = httpx.Client(
+            timeout=httpx.Timeout(timeout_s, connect=min(timeout_s, 3.0)),
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+                keepalive_expiry=30.0,
+            ),
+        )
+        # flush_interval_ms == 0 writes through on the caller's thread
+        self._writer: Optional[BatchWriter] = (
+            BatchWriter(self._insert_rows, flush_interval=flush_interval_ms / 1000.0, max_rows=batch_rows)
+            if flush_interval_ms > 0
+            else None
+        )
 
         
         try:
@@ -205,20 +664,55 @@ class ClickHouseStorage:
         
         return (self.user, self.password) if (self.user or self.password) else None
 
+    def _params(self, **extra: Any) -> Dict[str, Any]:
+        params: Dict[str, Any] = {"database": DB_NAME, "max_execution_time": self.max_execution_time_s}
+        if self.compress:
+            # gzip responses too; httpx decodes them transparently
+            params["enable_http_compression"] = 1
+        params.update(extra)
+        return params
+
     def _exec(self, sql: str) -> str:
-        
-        params = {"database": DB_NAME, "query": sql}
-        resp = self._client.post(f"{self.url}/", params=params, auth=self._auth())
+        # the statement goes in the body: no URL length limit, no query-string escaping
+        resp = self._client.post(f"{self.url}/", params=self._params(), content=sql.encode("utf-8"), auth=self._auth())
         resp.raise_for_status()
         return resp.text
 
-    def _exec_json(self, sql: str) -> Dict[str, Any]:
-        
-        sql_json = f"{sql} FORMAT JSON"
-        params = {"database": DB_NAME, "query": sql_json}
-        resp = self._client.post(f"{self.url}/", params=params, auth=self._auth())
-        resp.raise_for_status()
-        return resp.json()
+    def _insert_rows(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        """One JSONEachRow INSERT for all `rows`, sent (gzipped) in the request body."""
+        params = self._params(query=f"INSERT INTO {DB_NAME}.{table} FORMAT JSONEachRow")
+        if self.async_insert:
+            # let the server batch too; don't hold the writer until parts are flushed
+            params.update({"async_insert": 1, "wait_for_async_insert": 0})
+        payload = "\n".join(json.dumps(r, ensure_ascii=False) for r in rows).encode("utf-8")
+        headers = {}
+        if self.compress:
+            payload = gzip.compress(payload, compresslevel=3)
+            headers["Content-Encoding"] = "gzip"
+        start = time.perf_counter()
+        try:
+            resp = self._client.post(f"{self.url}/", params=params, content=payload, headers=headers, auth=self._auth())
+            resp.raise_for_status()
+        finally:
+            STORAGE_SECONDS.observe(time.perf_counter() - start, op="insert")
+
+    def _write(self, table: str, rows: List[Dict[str, Any]]) -> None:
+        if not rows:
+            return
+        if self._writer is not None:
+            self._writer.add(table, rows)
+        else:
+            self._insert_rows(table, rows)
+
+    def flush(self) -> None:
+        if self._writer is not None:
+            self._writer.flush()
+
+    def close(self) -> None:
+        """Flush buffered rows and release the connection."""
+        if self._writer is not None:
+            self._writer.close()
+        self._client.close()
 
     def insert_run(
         self,
@@ -229,34 +723,47 @@ class ClickHouseStorage:
         status: str,
         summary: RunSummary,
     ) -> None:
-        sql = (
-            "INSERT INTO autoinfra.runs "
-            "(run_id, repo, pr_number, commit_sha, status, duration_ms, cost_usd_month) "
-            f"VALUES ({_q(run_id)}, {_q(repo)}, {int(pr_number)}, {_q(commit_sha)}, {_q(status)}, "
-            f"{int(summary.duration_ms)}, {float(summary.cost_usd_month)})"
+        self._write(
+            "runs",
+            [
+                {
+                    "run_id": run_id,
+                    "repo": repo,
+                    "pr_number": int(pr_number),
+                    "commit_sha": commit_sha,
+                    "status": status,
+                    "duration_ms": int(summary.duration_ms),
+                    "cost_usd_month": float(summary.cost_usd_month),
+                    "issues": int(summary.checkov_issues),
+                    "fails": int(summary.policy_fails),
+                    # stamped now, not when the buffer is flushed
+                    "created_at": int(time.time()),
+                }
+            ],
         )
-        self._exec(sql)
 
-    def insert_findings(self, run_id: str, findings: List[Finding]) -> None:
+    def insert_findings(self, run_id: str, findings: List[Finding], repo: str = "") -> None:
         if not findings:
             return
+        now = int(time.time())
         rows = []
-        for f in findings:
+        for idx, f in enumerate(findings):
             d = f.model_dump() if hasattr(f, "model_dump") else dict(f)
             rows.append(
                 {
                     "run_id": run_id,
+                    "repo": repo,
+                    "idx": idx,
                     "tool": str(d.get("tool", "")),
                     "rule_id": str(d.get("rule_id", "")),
                     "severity": str(d.get("severity", "")),
                     "file": str(d.get("file", "")),
                     "line": int(d.get("line", 0) or 0),
                     "message": str(d.get("message", "")),
+                    "created_at": now,
                 }
             )
-        payload = "\n".join(json.dumps(r, ensure_ascii=False) for r in rows)
-        sql = "INSERT INTO autoinfra.findings FORMAT JSONEachRow\n" + payload
-        self._exec(sql)
+        self._write("findings", rows)
 
     def insert_outcome(
         self,
@@ -267,14 +774,20 @@ class ClickHouseStorage:
         policy_after: int,
         safe_to_merge: Optional[bool],
     ) -> None:
-        safe_val = "NULL" if safe_to_merge is None else ("1" if safe_to_merge else "0")
-        sql = (
-            "INSERT INTO autoinfra.outcomes "
-            "(run_id, issues_before, issues_after, policy_before, policy_after, safe_to_merge) "
-            f"VALUES ({_q(run_id)}, {int(issues_before)}, {int(issues_after)}, "
-            f"{int(policy_before)}, {int(policy_after)}, {safe_val})"
+        self._write(
+            "outcomes",
+            [
+                {
+                    "run_id": run_id,
+                    "issues_before": int(issues_before),
+                    "issues_after": int(issues_after),
+                    "policy_before": int(policy_before),
+                    "policy_after": int(policy_after),
+                    "safe_to_merge": None if safe_to_merge is None else int(bool(safe_to_merge)),
+                    "created_at": int(time.time()),
+                }
+            ],
         )
-        self._exec(sql)
 
     def insert_patch(
         self,
@@ -282,104 +795,207 @@ class ClickHouseStorage:
         patch_markdown: str,
         accepted: Optional[bool] = None,
     ) -> None:
-        acc_val = "NULL" if accepted is None else ("1" if accepted else "0")
-        sql = (
-            "INSERT INTO autoinfra.patch_library (run_id, patch_markdown, accepted) "
-            f"VALUES ({_q(run_id)}, {_q(patch_markdown)}, {acc_val})"
+        self._write(
+            "patch_library",
+            [
+                {
+                    "run_id": run_id,
+                    "patch_md": patch_markdown,
+                    "accepted": None if accepted is None else int(bool(accepted)),
+                    "created_at": int(time.time()),
+                }
+            ],
         )
-        self._exec(sql)
 
-    def history(self, limit: int = 20) -> List[HistoryItem]:
+    def history(
+        self,
+        limit: int = 20,
+        *,
+        before: Optional[Cursor] = None,
+        repo: Optional[str] = None,
+        pr_number: Optional[int] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[HistoryItem]:
+        # keyset on the table's sorting key: every page is a read-in-order
+        # range scan that stops after `limit` rows, however deep the cursor
+        conds: List[str] = []
+        if before is not None:
+            ts, rid = _ts(before[0]), _q(before[1])
+            conds.append(f"created_at <= {ts} AND (created_at < {ts} OR run_id < {rid})")
+        if since is not None:
+            conds.append(f"created_at >= {_ts(since)}")
+        if until is not None:
+            conds.append(f"created_at < {_ts(until)}")
+        if repo is not None:
+            conds.append(f"repo = {_q(repo)}")
+        if pr_number is not None:
+            conds.append(f"pr_number = {int(pr_number)}")
+        where = f"WHERE {' AND '.join(conds)} " if conds else ""
         sql = (
-            "SELECT run_id, commit_sha, issues, fails, cost, duration_ms, created_at "
-            f"FROM autoinfra.recent_runs ORDER BY created_at DESC LIMIT {int(limit)}"
+            "SELECT run_id, commit_sha, issues, fails, cost_usd_month, duration_ms, toUnixTimestamp(created_at) "
+            f"FROM {DB_NAME}.runs {where}"
+            f"ORDER BY created_at DESC, run_id DESC LIMIT {int(limit)}"
         )
-        obj = self._exec_json(sql)
-        rows = obj.get("data", [])
-        out: List[HistoryItem] = []
-        for r in rows:
-            created = str(r["created_at"])
-            
-            created_iso = created.replace(" ", "T")
-            out.append(
-                HistoryItem(
-                    run_id=r["run_id"],
-                    commit_sha=r["commit_sha"],
-                    issues=int(r["issues"]),
-                    fails=int(r["fails"]),
-                    cost=float(r["cost"]),
-                    duration_ms=int(r["duration_ms"]),
-                    created_at=datetime.fromisoformat(created_iso),
-                )
+        return [
+            HistoryItem(
+                run_id=run_id,
+                commit_sha=commit_sha,
+                issues=int(issues),
+                fails=int(fails),
+                cost=float(cost),
+                duration_ms=int(duration_ms),
+                created_at=datetime.utcfromtimestamp(int(created_ts)),
             )
-        return out
+            for run_id, commit_sha, issues, fails, cost, duration_ms, created_ts in self._exec_compact(sql)
+        ]
+
+    def _stream_compact(self, sql: str, **settings: Any) -> Iterator[List[Any]]:
+        """Rows of a query as lists, parsed one JSONCompactEachRow line at a time as they arrive."""
+        body = f"{sql} FORMAT JSONCompactEachRow".encode("utf-8")
+        params = self._params(**settings)
+        start = time.perf_counter()
+        try:
+            with self._client.stream("POST", f"{self.url}/", params=params, content=body, auth=self._auth()) as resp:
+                resp.raise_for_status()
+                for ln in resp.iter_lines():
+                    if ln.strip():
+                        yield json.loads(ln)
+        finally:
+            STORAGE_SECONDS.observe(time.perf_counter() - start, op="query")
+
+    def _exec_compact(self, sql: str) -> List[List[Any]]:
+        return list(self._stream_compact(sql))
 
     def get_status(self, run_id: str) -> Dict[str, Any]:
-        # runs row
-        runs_sql = (
-            "SELECT run_id, repo, pr_number, commit_sha, status, duration_ms, cost_usd_month, created_at "
-            f"FROM autoinfra.runs WHERE run_id = {_q(run_id)}"
+        # run row, its findings and its outcome in one round trip: the child
+        # tables are folded into arrays by scalar subqueries
+        rid = _q(run_id)
+        sql = (
+            "SELECT r.status, r.duration_ms, r.cost_usd_month, toUnixTimestamp(r.created_at), "
+            "(SELECT groupArray((tool, rule_id, severity, file, line, message)) FROM "
+            f"(SELECT tool, rule_id, severity, file, line, message FROM {DB_NAME}.findings "
+            f"WHERE run_id = {rid} ORDER BY idx)), "
+            "(SELECT groupArray((issues_before, issues_after, policy_before, policy_after, safe_to_merge)) FROM "
+            f"(SELECT issues_before, issues_after, policy_before, policy_after, safe_to_merge "
+            f"FROM {DB_NAME}.outcomes WHERE run_id = {rid} LIMIT 1)) "
+            f"FROM {DB_NAME}.runs AS r WHERE r.run_id = {rid} LIMIT 1"
         )
-        runs_obj = self._exec_json(runs_sql)
-        if not runs_obj.get("data"):
+        rows = self._exec_compact(sql)
+        if not rows:
             raise KeyError("run_id not found")
-        row = runs_obj["data"][0]
-        created = str(row["created_at"]).replace(" ", "T")
+        status, duration_ms, cost, created_ts, finding_rows, outcome_rows = rows[0]
 
-        
-        f_obj = self._exec_json(
-            f"SELECT tool, rule_id, severity, file, line, message "
-            f"FROM autoinfra.findings WHERE run_id = {_q(run_id)}"
-        )
-        findings = f_obj.get("data", []) if f_obj else []
+        keys = ("tool", "rule_id", "severity", "file", "line", "message")
+        findings = [dict(zip(keys, f)) for f in finding_rows]
         checkov_issues = sum(1 for f in findings if (f.get("tool") or "").lower() == "checkov")
         policy_fails = sum(1 for f in findings if (f.get("tool") or "").lower() == "policy")
 
-        
-        o_obj = self._exec_json(
-            f"SELECT issues_before, issues_after, policy_before, policy_after, safe_to_merge "
-            f"FROM autoinfra.outcomes WHERE run_id = {_q(run_id)} LIMIT 1"
-        )
-        outcome = (o_obj.get("data") or [None])[0]
-
         summary = {
             "checkov_issues": int(checkov_issues),
             "policy_fails": int(policy_fails),
-            "cost_usd_month": float(row["cost_usd_month"]),
-            "duration_ms": int(row["duration_ms"]),
+            "cost_usd_month": float(cost),
+            "duration_ms": int(duration_ms),
         }
 
         self_check = None
         safe_to_merge = None
-        if outcome:
+        if outcome_rows:
+            issues_before, issues_after, policy_before, policy_after, safe = outcome_rows[0]
             self_check = {
-                "issues_before": int(outcome["issues_before"]),
-                "issues_after": int(outcome["issues_after"]),
-                "policy_before": int(outcome["policy_before"]),
-                "policy_after": int(outcome["policy_after"]),
+                "issues_before": int(issues_before),
+                "issues_after": int(issues_after),
+                "policy_before": int(policy_before),
+                "policy_after": int(policy_after),
             }
-            v = outcome.get("safe_to_merge")
-            safe_to_merge = None if v is None else bool(v)
+            safe_to_merge = None if safe is None else bool(safe)
 
         return {
             "run_id": run_id,
-            "status": row["status"],
+            "status": status,
             "summary": summary,
             "findings": findings,
             
             "llm_comment_markdown": None,
             "safe_to_merge": safe_to_merge,
             "self_check": self_check,
-            "created_at": created,
+            "created_at": datetime.utcfromtimestamp(int(created_ts)).isoformat(),
         }
 
 
+    def export(
+        self,
+        kind: str = "runs",
+        *,
+        repo: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Iterator[Dict[str, Any]]:
+        """One streamed query; rows are yielded as they arrive, never collected."""
+        if kind not in EXPORT_FIELDS:
+            raise ValueError(f"unknown export kind {kind!r}")
+        conds: List[str] = []
+        if repo is not None:
+            conds.append(f"repo = {_q(repo)}")
+        if since is not None:
+            conds.append(f"created_at >= {_ts(since)}")
+        if until is not None:
+            conds.append(f"created_at < {_ts(until)}")
+        where = f"WHERE {' AND '.join(conds)} " if conds else ""
+        fields = EXPORT_FIELDS[kind]
+        cols = ", ".join("toUnixTimestamp(created_at)" if f == "created_at" else f for f in fields)
+        # read in each table's sorting-key order so the server never sorts the whole export
+        order = "created_at, run_id" if kind == "runs" else "run_id, idx"
+        sql = f"SELECT {cols} FROM {DB_NAME}.{kind} {where}ORDER BY {order}"
+        # exports may legitimately outlast the per-query limit
+        for values in self._stream_compact(sql, max_execution_time=0):
+            rec = dict(zip(fields, values))
+            rec["created_at"] = datetime.utcfromtimestamp(int(rec["created_at"]))
+            yield rec
+
+    def stats(self, days: int = 7, repo: Optional[str] = None, top: int = 10) -> StatsResponse:
+        # reads only the AggregatingMergeTree rollups fed by the *_rollup_mv views
+        where = f"WHERE day >= today() - {int(days) - 1}" + (f" AND repo = {_q(repo)}" if repo is not None else "")
+        rules = self._exec_compact(
+            "SELECT rule_id, severity, tool, countMerge(findings) AS n, uniqMerge(runs) "
+            f"FROM {DB_NAME}.finding_rollup {where} "
+            f"GROUP BY rule_id, severity, tool ORDER BY n DESC, rule_id LIMIT {int(top)}"
+        )
+        findings_by = self._exec_compact(
+            f"SELECT repo, severity, countMerge(findings) FROM {DB_NAME}.finding_rollup {where} GROUP BY repo, severity"
+        )
+        latency = self._exec_compact(
+            "SELECT repo, countMerge(runs), quantilesMerge(0.5, 0.95)(durations) "
+            f"FROM {DB_NAME}.run_rollup {where} GROUP BY repo"
+        )
+        overall = self._exec_compact(
+            f"SELECT countMerge(runs), quantilesMerge(0.5, 0.95)(durations) FROM {DB_NAME}.run_rollup {where}"
+        )
+        total, quantiles = overall[0] if overall else (0, None)
+        # quantiles of no rows come back as nan/null
+        p50, p95 = quantiles if total else (0.0, 0.0)
+        return _stats_response(
+            days,
+            repo,
+            top,
+            rules=[tuple(r) for r in rules],
+            findings_by={(r, sev): int(n) for r, sev, n in findings_by},
+            latency={r: (int(n), round(float(q[0]), 1), round(float(q[1]), 1)) for r, n, q in latency},
+            overall=(int(total), round(float(p50), 1), round(float(p95), 1)),
+        )
+
+
 def _q(s: str) -> str:
     """Quote a string for SQL VALUES."""
     esc = (s or "").replace("\\", "\\\\").replace("'", "''")
     return f"'{esc}'"
 
 
+def _ts(dt: datetime) -> str:
+    """A DateTime literal for a naive-UTC or aware datetime."""
+    return f"toDateTime({calendar.timegm(as_utc(dt).timetuple())})"
+
+
 _STORAGE_SINGLETON: Optional[Storage] = None
 
 
@@ -405,12 +1021,38 @@ def get_storage() -> Storage:
 
     if backend == "clickhouse" or (backend == "" and ch_url):
         try:
-            _STORAGE_SINGLETON = ClickHouseStorage(ch_url, ch_user, ch_pass)
+            _STORAGE_SINGLETON = ClickHouseStorage(
+                ch_url,
+                ch_user,
+                ch_pass,
+                flush_interval_ms=settings.clickhouse_flush_interval_ms,
+                batch_rows=settings.clickhouse_batch_rows,
+                async_insert=settings.clickhouse_async_insert,
+                timeout_s=settings.clickhouse_timeout_s,
+                max_connections=settings.clickhouse_max_connections,
+                max_execution_time_s=settings.clickhouse_max_execution_time_s,
+                compress=settings.clickhouse_compress,
+            )
             print(f"[storage] Using ClickHouseStorage {ch_url}")
             return _STORAGE_SINGLETON
         except Exception as e:
             print(f"[storage] ClickHouse unavailable ({e}); falling back to MemoryStorage")
 
-    _STORAGE_SINGLETON = MemoryStorage()
+    _STORAGE_SINGLETON = MemoryStorage(
+        retention_days=settings.memory_storage_retention_days,
+        max_runs=settings.memory_storage_max_runs,
+    )
     print("[storage] Using MemoryStorage")
     return _STORAGE_SINGLETON
+
+
+def shutdown_storage() -> None:
+    """Flush write-behind buffers; called on app shutdown."""
+    global _STORAGE_SINGLETON
+    st, _STORAGE_SINGLETON = _STORAGE_SINGLETON, None
+    close = getattr(st, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
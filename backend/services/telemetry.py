@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# seconds; runs span milliseconds (cache hits) to minutes (cold checkov)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+Labels = Tuple[str, ...]
+INF_LABEL = 'le="+Inf"'
+
+
+def _escape(v: str) -> str:
+    return v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(v: float) -> str:
+    if math.isinf(v):
+        return "+Inf" if v > 0 else "-Inf"
+    return repr(float(v)) if not float(v).is_integer() else str(int(v))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Labels:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> List[str]:
+        return [f"# TYPE {self.name} {self.kind}", f"# HELP {self.name} {self.help}"]
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, value: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels: str) -> float:
+        with self._lock:
+            return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}_total{_labels(self.label_names, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> (per-bucket counts, count, sum)
+        self._values: Dict[Labels, Tuple[List[int], int, float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            counts, n, total = self._values.get(key) or ([0] * len(self.buckets), 0, 0.0)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            self._values[key] = (counts, n + 1, total + value)
+
+    def count(self, **labels: str) -> int:
+        with self._lock:
+            hit = self._values.get(self._key(labels))
+        return hit[1] if hit else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), n, s)) for k, (c, n, s) in self._values.items())
+        out: List[str] = []
+        for key, (counts, n, total) in items:
+            cumulative = 0
+            for bound, c in zip(self.buckets, counts):
+                cumulative += c
+                le = 'le="%s"' % _num(bound)
+                out.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            out.append(f"{self.name}_bucket{_labels(self.label_names, key, INF_LABEL)} {n}")
+            out.append(f"{self.name}_count{_labels(self.label_names, key)} {n}")
+            out.append(f"{self.name}_sum{_labels(self.label_names, key)} {_num(total)}")
+        return out
+
+
+class Callback(_Metric):
+    """A gauge or counter whose values are read from elsewhere at scrape time."""
+
+    def __init__(
+        self, name: str, help: str, kind: str, fn: Callable[[], Dict[Labels, float]], labels: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.kind = kind
+        self.fn = fn
+
+    def samples(self) -> List[str]:
+        try:
+            values = self.fn()
+        except Exception:
+            return []
+        suffix = "_total" if self.kind == "counter" else ""
+        return [f"{self.name}{suffix}{_labels(self.label_names, k)} {_num(v)}" for k, v in sorted(values.items())]
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            # re-registering (e.g. a module reloaded in tests) replaces the old one
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))  # type: ignore[return-value]
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, help, labels, buckets))  # type: ignore[return-value]
+
+    def callback(
+        self, name: str, help: str, kind: str, fn: Callable[[], Dict[Labels, float]], labels: Sequence[str] = ()
+    ) -> None:
+        self._add(Callback(name, help, kind, fn, labels))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for m in metrics:
+            lines += m.header()
+            lines += m.samples()
+        lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram("autoinfra_stage_seconds", "Wall time of each run stage.", ("stage",))
+RUN_SECONDS = REGISTRY.histogram("autoinfra_run_seconds", "Wall time of whole runs.", ("result",))
+RUNS = REGISTRY.counter("autoinfra_runs", "Finished runs.", ("result",))
+STORAGE_SECONDS = REGISTRY.histogram("autoinfra_storage_seconds", "Storage round trips.", ("op",))
+SUBPROCESSES = REGISTRY.counter("autoinfra_subprocesses", "External processes spawned.", ("tool",))
+
+# the breakdown the current run is collecting into (StatusResponse.timings)
+_timings: ContextVar[Optional[Dict[str, int]]] = ContextVar("autoinfra_timings", default=None)
+
+
+@contextmanager
+def collect_timings(into: Dict[str, int]) -> Iterator[Dict[str, int]]:
+    """Spans opened on this thread until exit also add their ms to `into`."""
+    token = _timings.set(into)
+    try:
+        yield into
+    finally:
+        _timings.reset(token)
+
+
+def record_timing(stage: str, seconds: float) -> None:
+    """Account a duration measured elsewhere (e.g. by run_stages)."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    into = _timings.get()
+    if into is not None:
+        into[stage] = into.get(stage, 0) + int(seconds * 1000)
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_timing(stage, time.perf_counter() - start)
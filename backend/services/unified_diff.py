@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+HUNK_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+# context lines patch(1)-style fuzz may ignore at each end of a hunk
+MAX_FUZZ = 2
+_NOISE_PREFIXES = ("diff ", "index ", "new file mode", "deleted file mode", "similarity ", "rename ", "\\ ")
+
+
+@dataclass
+class Hunk:
+    old_start: int  # 1-based; 0 when the diff has no @@ header (position unknown)
+    lines: List[Tuple[str, str]] = field(default_factory=list)  # (" " | "-" | "+", text)
+
+    @property
+    def old_lines(self) -> List[str]:
+        return [t for tag, t in self.lines if tag != "+"]
+
+    @property
+    def changes(self) -> bool:
+        return any(tag != " " for tag, _ in self.lines)
+
+
+@dataclass
+class FilePatch:
+    path: Optional[str]  # target from the +++/--- headers; None when the diff names no file
+    hunks: List[Hunk] = field(default_factory=list)
+    new_file: bool = False
+    deleted: bool = False
+
+
+def _clean_path(raw: str) -> Optional[str]:
+    p = raw.split("\t", 1)[0].strip()
+    if not p or p == "/dev/null":
+        return None
+    if p[:2] in ("a/", "b/"):
+        p = p[2:]
+    return p[2:] if p.startswith("./") else p
+
+
+def parse_unified_diff(body: str) -> List[FilePatch]:
+    """
+    Split a unified diff into per-file hunks. Headerless snippets (bare
+    +/- lines, as LLMs tend to produce) become one positionless hunk
+    with no target file.
+    """
+    files: List[FilePatch] = []
+    old_path: Optional[str] = None
+    saw_old = False
+    current: Optional[FilePatch] = None
+    hunk: Optional[Hunk] = None
+    old_left = new_left = 0  # lines still owed to an @@ hunk
+
+    for line in body.splitlines():
+        if old_left > 0 or new_left > 0:
+            tag = line[:1] or " "
+            if tag in ("+", "-", " "):
+                assert hunk is not None
+                hunk.lines.append((tag, line[1:]))
+                old_left -= tag != "+"
+                new_left -= tag != "-"
+                continue
+            old_left = new_left = 0  # short hunk; fall through to headers
+
+        if line.startswith("--- "):
+            old_path, saw_old = _clean_path(line[4:]), True
+            continue
+        if line.startswith("+++ ") and saw_old:
+            new_path = _clean_path(line[4:])
+            current = FilePatch(path=new_path or old_path, new_file=old_path is None, deleted=new_path is None)
+            files.append(current)
+            hunk, saw_old = None, False
+            continue
+        m = HUNK_RE.match(line)
+        if m:
+            if current is None:
+                current = FilePatch(path=None)
+                files.append(current)
+            hunk = Hunk(old_start=int(m.group(1)))
+            current.hunks.append(hunk)
+            old_left = int(m.group(2) or 1)
+            new_left = int(m.group(4) or 1)
+            continue
+        if line.startswith(_NOISE_PREFIXES):
+            continue
+
+        # headerless snippet: bare +/- lines, prose and blank lines ignored
+        tag = line[:1]
+        if tag not in ("+", "-", " ") or not line.strip(" +-"):
+            continue
+        if hunk is None or hunk.old_start != 0:
+            if current is None:
+                current = FilePatch(path=None)
+                files.append(current)
+            hunk = Hunk(old_start=0)
+            current.hunks.append(hunk)
+        hunk.lines.append((tag, line[1:]))
+
+    for fp in files:
+        fp.hunks = [h for h in fp.hunks if h.changes]
+    return [fp for fp in files if fp.hunks or fp.deleted]
+
+
+def normalize(line: str) -> str:
+    """Whitespace-insensitive form used to match diff lines to file lines."""
+    return "".join(line.split())
+
+
+class LineIndex:
+    """Normalized line -> line numbers, built once per file so hunks are located without rescanning."""
+
+    def __init__(self, lines: Sequence[str]) -> None:
+        self.keys = [normalize(ln) for ln in lines]
+        self.positions: Dict[str, List[int]] = {}
+        for i, k in enumerate(self.keys):
+            self.positions.setdefault(k, []).append(i)
+
+    def find(self, block: List[str], expected: int, lowest: int) -> Optional[int]:
+        """Start of `block` (normalized) at or after `lowest`, closest to `expected`."""
+        if not block:
+            return None
+        # anchor on the rarest line so only a handful of candidates are verified
+        anchor = min(range(len(block)), key=lambda k: len(self.positions.get(block[k], ())))
+        best: Optional[int] = None
+        n = len(block)
+        for p in self.positions.get(block[anchor], ()):
+            start = p - anchor
+            if start < lowest or start + n > len(self.keys):
+                continue
+            if self.keys[start : start + n] != block:
+                continue
+            if best is None or abs(start - expected) < abs(best - expected):
+                best = start
+        return best
+
+    def find_partial(self, block: List[str], lowest: int) -> Optional[int]:
+        """First start at or after `lowest` where each line of `block` (normalized) occurs within its file line."""
+        if not block:
+            return None
+        n = len(block)
+        for start in range(lowest, len(self.keys) - n + 1):
+            if all(b in k for b, k in zip(block, self.keys[start : start + n])):
+                return start
+        return None
+
+
+def _indent(s: str) -> str:
+    return s[: len(s) - len(s.lstrip())]
+
+
+def _locate(index: LineIndex, hunk: Hunk, expected: int, lowest: int) -> Optional[Tuple[int, List[Tuple[str, str]]]]:
+    """
+    Where the hunk applies and the hunk lines to apply there. Like patch(1)
+    fuzz, up to MAX_FUZZ context lines may be dropped at each end when the
+    full hunk does not match. A headerless hunk whose lines match no whole
+    file lines may still match lines that contain them.
+    """
+    lines = hunk.lines
+    lead_ctx = next((i for i, (tag, _) in enumerate(lines) if tag != " "), len(lines))
+    trail_ctx = next((i for i, (tag, _) in enumerate(reversed(lines)) if tag != " "), len(lines))
+    for fuzz in range(MAX_FUZZ + 1):
+        lead, trail = min(fuzz, lead_ctx), min(fuzz, trail_ctx)
+        core = lines[lead : len(lines) - trail]
+        block = [normalize(t) for tag, t in core if tag != "+"]
+        start = index.find(block, expected + lead, lowest)
+        if start is not None:
+            return start, core
+        if lead == lead_ctx and trail == trail_ctx:
+            break
+    if hunk.old_start == 0:
+        # snippets often quote only part of a line ("acl = ..." without its
+        # trailing comment); with no position to go on, accept that too
+        start = index.find_partial([normalize(t) for tag, t in lines if tag != "+"], lowest)
+        if start is not None:
+            return start, lines
+    return None
+
+
+def apply_hunks(lines: Sequence[str], hunks: List[Hunk]) -> Optional[List[str]]:
+    """
+    New file content, or None if any hunk cannot be placed. Hunks are
+    matched whitespace-insensitively near their @@ position (or anywhere,
+    when headerless, falling back to partial lines), in order and without
+    overlapping.
+    """
+    index = LineIndex(lines)
+    edits: List[Tuple[int, int, List[str]]] = []
+    lowest = 0
+    for hunk in hunks:
+        # @@ positions and `lines` are both in old-file coordinates
+        expected = hunk.old_start - 1 if hunk.old_start else lowest
+        if not hunk.old_lines:
+            # pure insertion: `@@ -N,0` adds after old line N; headerless, at the end of the file
+            at = min(max(hunk.old_start, lowest), len(lines)) if hunk.old_start else len(lines)
+            edits.append((at, at, [t for _, t in hunk.lines]))
+            lowest = at
+            continue
+
+        found = _locate(index, hunk, expected, lowest)
+        if found is None:
+            return None
+        start, core = found
+
+        # LLM snippets often lose indentation; re-indent added lines to the file's
+        first_old = next(t for tag, t in core if tag != "+")
+        file_indent, diff_indent = _indent(lines[start]), _indent(first_old)
+
+        replacement: List[str] = []
+        pos = start
+        for tag, text in core:
+            if tag == "+":
+                if file_indent != diff_indent:
+                    text = file_indent + (text[len(diff_indent) :] if text.startswith(diff_indent) else text.lstrip())
+                replacement.append(text)
+                continue
+            if tag == " ":
+                replacement.append(lines[pos])  # keep the file's own formatting of context
+            pos += 1
+
+        edits.append((start, pos, replacement))
+        lowest = pos
+
+    out: List[str] = []
+    cursor = 0
+    for start, end, replacement in edits:
+        out.extend(lines[cursor:start])
+        out.extend(replacement)
+        cursor = end
+    out.extend(lines[cursor:])
+    return out
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Iterable, List, Optional, Set
+
+from .hcl_index import forget
+from .incremental import unit_of
+from .scan_cache import TF_SUFFIXES, iter_tf_files
+
+
+def _link(src: Path, dst: Path) -> None:
+    # hardlink, else symlink, else copy: the cheapest that works on this filesystem
+    try:
+        os.link(src, dst)
+        return
+    except OSError:
+        pass
+    try:
+        os.symlink(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+class OverlayWorkspace:
+    """
+    Scratch view of a Terraform tree for trying patches.
+    Reads fall through to the original tree and writes land in a temp dir,
+    so nothing is copied up front. Scanners are pointed at `root`, which
+    holds the written files plus links to whichever untouched siblings
+    `expose` was asked for; the original tree is never modified.
+    Workspaces given the same `parent` dir live side by side under it.
+    """
+
+    def __init__(self, src: str, parent: Optional[str] = None) -> None:
+        self.src = Path(src).resolve()
+        self.parent = parent
+        self.written: Set[str] = set()
+        self._tmp: Optional[tempfile.TemporaryDirectory] = None
+        self.root = Path()
+
+    def __enter__(self) -> "OverlayWorkspace":
+        self._tmp = tempfile.TemporaryDirectory(prefix="autoinfra-ws-", dir=self.parent)
+        self.root = Path(self._tmp.name)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        for rel in self.written:
+            forget(self.root / rel)
+        if self._tmp is not None:
+            self._tmp.cleanup()
+
+    def tf_files(self) -> List[str]:
+        """Root-relative .tf paths of the original tree."""
+        return [p.relative_to(self.src).as_posix() for p in iter_tf_files(str(self.src)) if p.suffix == ".tf"]
+
+    def path(self, rel: str) -> Path:
+        """Where the current content of `rel` lives: the overlay once written, else the original."""
+        return self.root / rel if rel in self.written else self.src / rel
+
+    def write_text(self, rel: str, text: str) -> None:
+        dst = self.root / rel
+        if dst.is_symlink() or dst.exists():
+            dst.unlink()  # never write through a link into the original tree
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        dst.write_text(text, encoding="utf-8")
+        forget(dst)
+        self.written.add(rel)
+
+    def expose(self, units: Iterable[str]) -> None:
+        """Link the untouched Terraform files of these module directories into `root`."""
+        for unit in set(units):
+            src_dir = self.src / unit
+            if not src_dir.is_dir():
+                continue
+            for p in src_dir.iterdir():
+                if not (p.is_file() and p.name.endswith(TF_SUFFIXES)):
+                    continue
+                rel = p.relative_to(self.src).as_posix()
+                dst = self.root / rel
+                if rel in self.written or dst.exists():
+                    continue
+                dst.parent.mkdir(parents=True, exist_ok=True)
+                _link(p, dst)
+
+    def expose_written_units(self) -> Set[str]:
+        units = {unit_of(rel) for rel in self.written}
+        self.expose(units)
+        return units
@@ -1,5 +1,24 @@
 
 import os, sys
+
+import pytest
+
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
 if ROOT not in sys.path:
     sys.path.insert(0, ROOT)
+
+
+
+@pytest.fixture(autouse=True, scope="session")
+def _isolated_scan_cache(tmp_path_factory):
+    """Keep the scan cache's disk tier out of the shared temp dir so runs don't leak into each other."""
+    from backend.config.settings import get_settings
+    from backend.services import scan_cache
+
+    os.environ["SCAN_CACHE_PATH"] = str(tmp_path_factory.mktemp("scan-cache") / "scan-cache.sqlite3")
+    get_settings.cache_clear()
+    scan_cache._CACHE_SINGLETON = None
+    yield
+    scan_cache._CACHE_SINGLETON = None
+    os.environ.pop("SCAN_CACHE_PATH", None)
+    get_settings.cache_clear()
@@ -1,10 +1,13 @@
+import json
 import shutil
 import tempfile
 from pathlib import Path
 
 import pytest
 
-from backend.services.checkov_runner import run_checkov
+from backend.services import checkov_runner
+from backend.services.checkov_runner import iter_failed_checks, run_checkov
+from backend.services.checkov_workers import WorkerTimeout
 
 
 @pytest.mark.skipif(shutil.which("checkov") is None, reason="checkov CLI not installed")
@@ -36,3 +39,54 @@ def test_run_checkov_detects_issue():
             assert hasattr(f, "file")
             assert hasattr(f, "line")
             assert hasattr(f, "message")
+
+
+def _report(failed, passed=()):
+    return {
+        "check_type": "terraform",
+        "results": {"passed_checks": list(passed), "failed_checks": list(failed), "skipped_checks": []},
+        "summary": {"failed": len(failed)},
+    }
+
+
+def _chunks(text, size):
+    return (text[i : i + size] for i in range(0, len(text), size))
+
+
+@pytest.mark.parametrize("size", [1, 7, 64 * 1024])
+def test_failed_checks_stream_from_dict_and_list_reports(size):
+    tf = [{"check_id": f"CKV_AWS_{i}", "check_name": 'quote " and \\ brace }', "file_line_range": [i, i]} for i in range(3)]
+    # a passed check carrying a nested "results.failed_checks" must not be picked up
+    decoy = {"check_id": "CKV_OK", "results": {"failed_checks": [{"check_id": "NOPE"}]}}
+    dict_report = json.dumps(_report(tf, [decoy]), indent=4)
+    assert [c["check_id"] for c in iter_failed_checks(_chunks(dict_report, size))] == [f"CKV_AWS_{i}" for i in range(3)]
+
+    # several frameworks: checkov prints a list of reports
+    list_report = json.dumps([_report(tf[:1]), {**_report(tf[1:]), "check_type": "terraform_plan"}])
+    assert list(iter_failed_checks(_chunks(list_report, size))) == tf
+
+
+def test_failed_checks_stream_bounded():
+    def report(n):
+        yield '{"results": {"failed_checks": ['
+        for i in range(n):
+            big = "x" * (4096 if i == 1 else 10)
+            yield ("," if i else "") + json.dumps({"check_id": f"CKV_{i}", "code_block": big})
+        yield "]}}"
+
+    checks = list(iter_failed_checks(report(20000), max_item_bytes=1024))
+    # the one oversized check is skipped; the rest stream through
+    assert len(checks) == 19999 and checks[0]["check_id"] == "CKV_0" and checks[1]["check_id"] == "CKV_2"
+
+
+def test_worker_timeout_fails_the_scan_without_the_cli(tmp_path, monkeypatch):
+    class StuckPool:
+        def run(self, argv, cwd, out_path):
+            raise WorkerTimeout("checkov scan timed out after 600s")
+
+    def no_cli(*_a, **_k):
+        pytest.fail("timed-out scan retried on the CLI")
+
+    monkeypatch.setattr(checkov_runner, "get_checkov_pool", lambda: StuckPool())
+    monkeypatch.setattr(checkov_runner, "_scan_cli", no_cli)
+    assert checkov_runner.scan_checkov_files(str(tmp_path), ["main.tf"]) is None
@@ -0,0 +1,75 @@
+import importlib.util
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from backend.services.checkov_workers import CheckovWorkerPool, WorkerTimeout
+
+SAMPLE_TF = str(Path(__file__).resolve().parents[1] / "sample" / "tf")
+
+needs_checkov = pytest.mark.skipif(importlib.util.find_spec("checkov") is None, reason="checkov not installed")
+
+
+@needs_checkov
+def test_workers_are_reused_then_recycled(tmp_path):
+    pool = CheckovWorkerPool(size=1, max_scans=2)
+    out = str(tmp_path / "report.json")
+    try:
+        idle = []
+        for _ in range(3):
+            # `-f` makes checkov fork its own helpers, which a daemonic worker could not
+            code = pool.run(["-f", "main.tf", "-o", "json", "--framework", "terraform"], SAMPLE_TF, out)
+            with open(out, encoding="utf-8") as f:
+                assert code == 1 and json.load(f)["results"]["failed_checks"]
+            idle.append([w.process.pid for w in pool._idle.queue])
+        # two scans on one warm process, which is then replaced
+        assert len(idle[0]) == 1 and idle[1] == [] and len(idle[2]) == 1 and idle[0] != idle[2]
+        assert pool.stats()["recycled"] == 1 and pool.stats()["started"] == 2
+
+        # a worker that died while idle costs one scan, which goes to the CLI
+        pool._idle.queue[-1].process.kill()
+        pool._idle.queue[-1].process.join()
+        assert pool.run(["-d", ".", "-o", "json"], SAMPLE_TF, out) is None
+        assert pool.stats()["failed"] == 1 and pool.stats()["idle"] == 0
+    finally:
+        pool.close()
+
+
+def test_unimportable_checkov_falls_back_to_cli(tmp_path, monkeypatch):
+    fake = tmp_path / "checkov"
+    fake.mkdir()
+    (fake / "__init__.py").write_text("raise ImportError('no checkov here')\n")
+    # spawned workers start from the parent's sys.path
+    monkeypatch.setattr(sys, "path", [str(tmp_path), *sys.path])
+
+    pool = CheckovWorkerPool(size=1)
+    try:
+        out = str(tmp_path / "report.json")
+        assert pool.run(["-d", "."], str(tmp_path), out) is None
+        assert not pool.available
+        assert pool.run(["-d", "."], str(tmp_path), out) is None
+        assert pool.stats()["started"] == 1
+    finally:
+        pool.close()
+
+
+def test_timed_out_scan_raises_instead_of_falling_back(tmp_path, monkeypatch):
+    fake = tmp_path / "checkov"
+    fake.mkdir()
+    (fake / "__init__.py").write_text("")
+    (fake / "main.py").write_text(
+        "import time\n\nclass Checkov:\n    def __init__(self, argv):\n        pass\n\n"
+        "    def run(self):\n        time.sleep(60)\n"
+    )
+    monkeypatch.setattr(sys, "path", [str(tmp_path), *sys.path])
+
+    pool = CheckovWorkerPool(size=1, timeout_s=0.5)
+    try:
+        with pytest.raises(WorkerTimeout):
+            pool.run(["-d", "."], str(tmp_path), str(tmp_path / "report.json"))
+        # the stuck worker is gone, but the pool still serves the next scan
+        assert pool.available and pool.stats()["failed"] == 1 and pool.stats()["idle"] == 0
+    finally:
+        pool.close()
@@ -28,3 +28,22 @@ def test_compose_comment_with_golden_findings():
     assert isinstance(md, str)
     
     assert "AutoInfra" in md or "Policy" in md or "S3" in md
+
+
+@pytest.mark.skipif(not HAS_COMPOSER, reason="composer not implemented yet")
+def test_drop_patches_removes_unhelpful_suggestions():
+    from backend.services.composer import drop_patches
+    from backend.services.patch_apply import extract_all_diffs
+
+    findings = json.loads(Path("backend/sample/findings_golden.json").read_text(encoding="utf-8"))
+    md = compose_comment(findings=findings, cost_estimate=0.0, repo="r", pr_number=1, commit_sha="c")
+    diffs = extract_all_diffs(md)
+    assert len(diffs) == 3
+
+    kept = drop_patches(md, [1])
+    assert extract_all_diffs(kept) == [diffs[0], diffs[2]]
+    assert "S3: harden bucket" not in kept
+
+    none_left = drop_patches(md, range(3))
+    assert "```diff" not in none_left and "Suggested patches" not in none_left
+    assert none_left.startswith(md.split("### Suggested patches")[0].rstrip())
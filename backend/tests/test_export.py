@@ -0,0 +1,50 @@
+import csv
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from backend.services import export
+from backend.services.export import ExportUnavailable, iter_csv, iter_ndjson, iter_parquet
+
+FIELDS = ("run_id", "line", "created_at")
+
+
+def _records(n):
+    for i in range(n):
+        yield {"run_id": f"r{i}", "line": i, "created_at": datetime(2024, 1, 1, 0, 0, i % 60), "extra": "dropped"}
+
+
+def test_ndjson_one_line_per_record():
+    lines = b"".join(iter_ndjson(_records(3), FIELDS)).decode().splitlines()
+    assert [json.loads(ln) for ln in lines][2] == {"run_id": "r2", "line": 2, "created_at": "2024-01-01T00:00:02"}
+
+
+def test_csv_streams_in_batches(monkeypatch):
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 10)
+    chunks = list(iter_csv(_records(25), FIELDS))
+    assert len(chunks) == 3
+    rows = list(csv.reader(io.StringIO(b"".join(chunks).decode())))
+    assert rows[0] == list(FIELDS) and len(rows) == 26
+    assert rows[-1] == ["r24", "24", "2024-01-01T00:00:24"]
+
+
+def test_parquet_round_trip_or_unavailable():
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        with pytest.raises(ExportUnavailable):
+            iter_parquet(_records(3), FIELDS)
+        return
+    table = pq.read_table(io.BytesIO(b"".join(iter_parquet(_records(2500), FIELDS))))
+    assert table.num_rows == 2500 and table.column_names == list(FIELDS)
+
+
+def test_parquet_schema_survives_a_leading_all_null_batch(monkeypatch):
+    pq = pytest.importorskip("pyarrow.parquet")
+    monkeypatch.setattr(export, "EXPORT_BATCH_ROWS", 10)
+    recs = [{**rec, "line": None if i < 10 else rec["line"]} for i, rec in enumerate(_records(25))]
+    table = pq.read_table(io.BytesIO(b"".join(iter_parquet(recs, FIELDS))))
+    assert str(table.schema.field("line").type) == "int64"
+    assert table.column("line").to_pylist() == [None] * 10 + list(range(10, 25))
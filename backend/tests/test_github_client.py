@@ -0,0 +1,141 @@
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from backend.services.github_client import COMMENT_MARKER, GitHubClient
+
+
+class FakeGitHub:
+    """Just enough of the issues-comments API, with ETags and injectable rate limiting."""
+
+    def __init__(self):
+        self.comments = {}  # id -> body
+        self.next_id = 100
+        self.log = []
+        self.throttle = []  # queued (status, headers) answers served before the real ones
+        self.lock = threading.Lock()
+
+    def etag(self):
+        return '"%d"' % hash(tuple(sorted(self.comments.items())))
+
+
+def _handler(gh: FakeGitHub):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=None, headers=None):
+            data = b"" if body is None else json.dumps(body).encode()
+            self.send_response(status)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _handle(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length)) if length else None
+            with gh.lock:
+                gh.log.append((self.command, self.path, self.client_address[1]))
+                if gh.throttle:
+                    status, headers = gh.throttle.pop(0)
+                    return self._send(status, {"message": "rate limited"}, headers)
+                if self.command == "GET" and re.match(r"/repos/o/r/issues/1/comments", self.path):
+                    if self.headers.get("If-None-Match") == gh.etag():
+                        return self._send(304, headers={"ETag": gh.etag()})
+                    body = [{"id": i, "body": b} for i, b in sorted(gh.comments.items())]
+                    return self._send(200, body, {"ETag": gh.etag()})
+                if self.command == "POST" and self.path == "/repos/o/r/issues/1/comments":
+                    gh.next_id += 1
+                    gh.comments[gh.next_id] = payload["body"]
+                    return self._send(201, {"id": gh.next_id})
+                m = re.match(r"/repos/o/r/issues/comments/(\d+)$", self.path)
+                if self.command == "PATCH" and m:
+                    cid = int(m.group(1))
+                    if cid not in gh.comments:
+                        return self._send(404, {"message": "Not Found"})
+                    gh.comments[cid] = payload["body"]
+                    return self._send(200, {"id": cid})
+            self._send(404, {"message": "Not Found"})
+
+        do_GET = do_POST = do_PATCH = _handle
+
+    return Handler
+
+
+@pytest.fixture()
+def github():
+    gh = FakeGitHub()
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _handler(gh))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    client = GitHubClient(token="t", base_url=f"http://127.0.0.1:{server.server_port}", rate_per_s=100, burst=10)
+    yield gh, client
+    client.close()
+    server.shutdown()
+    server.server_close()
+
+
+def test_upsert_keeps_one_comment_per_pr(github):
+    gh, client = github
+    gh.comments[7] = "someone else's comment"
+
+    for n in range(3):
+        assert client.run_sync(client.upsert_pr_comment("o/r", 1, f"report {n}"))
+
+    ours = [b for b in gh.comments.values() if b.startswith(COMMENT_MARKER)]
+    assert ours == [f"{COMMENT_MARKER}\nreport 2"]
+    # one lookup, one create, then edits of the cached id
+    assert [m for m, _, _ in gh.log] == ["GET", "POST", "PATCH", "PATCH"]
+    # every call went over the same keep-alive connection
+    assert len({port for _, _, port in gh.log}) == 1
+
+
+def test_existing_comment_found_with_conditional_get(github):
+    gh, client = github
+    gh.comments[5] = f"{COMMENT_MARKER}\nold"
+
+    other = GitHubClient(token="t", base_url=client.base, rate_per_s=100, burst=10)
+    try:
+        # a cold client looks the comment up; a repeat lookup is a free 304
+        assert other.run_sync(other._find_comment("o/r", 1)) == 5
+        assert other.run_sync(other._find_comment("o/r", 1)) == 5
+        assert other.counters["not_modified"] == 1
+    finally:
+        other.close()
+
+    del gh.comments[5]  # deleted by a user: PATCH 404s and a new comment is posted
+    client._comment_ids[("o/r", 1)] = 5
+    assert client.run_sync(client.upsert_pr_comment("o/r", 1, "new"))
+    assert list(gh.comments.values()) == [f"{COMMENT_MARKER}\nnew"]
+
+
+def test_rate_limit_headers_pause_and_retry(github):
+    gh, client = github
+    gh.throttle.append((429, {"Retry-After": "0"}))
+    assert client.run_sync(client.post_pr_comment("o/r", 1, "hi"))
+    assert client.counters["rate_limited"] == 1 and len(gh.comments) == 1
+
+    reset = str(int(time.time()) + 3600)
+    gh.throttle.append((403, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": reset}))
+    assert not client.run_sync(client.post_pr_comment("o/r", 1, "again"))
+    sent = len(gh.log)
+    # quota exhausted for an hour: fail fast without touching the API
+    assert not client.run_sync(client.upsert_pr_comment("o/r", 1, "later"))
+    assert len(gh.log) == sent
+
+
+def test_token_bucket_spaces_out_bursts(github):
+    gh, client = github
+    client.bucket = type(client.bucket)(rate=20, capacity=2)
+    start = time.monotonic()
+    for _ in range(6):
+        client.run_sync(client.post_pr_comment("o/r", 1, "x"))
+    # 2 from the burst, 4 more at 20/s
+    assert time.monotonic() - start >= 0.18
@@ -0,0 +1,99 @@
+import tempfile
+from pathlib import Path
+
+from backend.services.hcl_index import parse_file, parse_text
+from backend.services.policy_engine import run_policy_checks
+
+SAMPLE = '''# top comment with resource "aws_instance" "fake" {
+resource "aws_security_group" "web" {
+  name = "web" # trailing
+  ingress {
+    from_port   = 22
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+  /* block comment { */
+  tags = {
+    Name = "x}"
+  }
+}
+
+resource "aws_iam_policy" "p" {
+  policy = <<EOT
+{ "Statement": [ }
+EOT
+}
+
+module "net" { source = "./modules/net" }
+'''
+
+
+def test_parse_text_blocks_attributes_and_lines():
+    pf = parse_text(SAMPLE)
+    assert [b.address for b in pf.resources()] == ["aws_security_group.web", "aws_iam_policy.p"]
+
+    sg = pf.resources("aws_security_group")[0]
+    assert (sg.line, sg.end_line) == (2, 12)
+    assert sg.attributes["name"].literal == "web"
+    ingress = sg.child("ingress")
+    assert ingress is not None and ingress.attributes["cidr_blocks"].line == 6
+    assert set(sg.attributes) == {"name", "tags"}
+
+    pol = pf.resources("aws_iam_policy")[0]
+    assert pol.attributes["policy"].value.startswith("<<EOT")
+    assert pol.end_line == 18
+
+    mod = pf.blocks[-1]
+    assert mod.type == "module" and mod.attributes["source"].literal == "./modules/net"
+    assert pf.line_of(pf.text.index("module")) == 20
+
+
+def test_parse_file_is_memoized_by_content():
+    with tempfile.TemporaryDirectory() as tmp:
+        a, b = Path(tmp, "a.tf"), Path(tmp, "b.tf")
+        a.write_text(SAMPLE, encoding="utf-8")
+        b.write_text(SAMPLE, encoding="utf-8")
+        pa, pb = parse_file(a), parse_file(b)
+        assert pa.blocks is pb.blocks
+        assert pb.path == str(b)
+        assert parse_file(Path(tmp, "missing.tf")) is None
+
+
+def test_policy_checks_run_per_resource():
+    with tempfile.TemporaryDirectory() as tmp:
+        Path(tmp, "main.tf").write_text(
+            '''
+# acl = "public-read" in a comment is not a finding
+resource "aws_s3_bucket" "logs" {
+  bucket = "logs"
+}
+
+resource "aws_s3_bucket_public_access_block" "logs" {
+  bucket            = aws_s3_bucket.logs.id
+  block_public_acls = true
+}
+
+resource "aws_s3_bucket_versioning" "logs" {
+  bucket = aws_s3_bucket.logs.id
+  versioning_configuration {
+    status = "Enabled"
+  }
+}
+
+resource "aws_security_group" "ok" {
+  ingress {
+    from_port   = 8080
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+}
+
+resource "aws_security_group" "bad" {
+  ingress {
+    from_port   = 22
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+}
+''',
+            encoding="utf-8",
+        )
+        findings = run_policy_checks(tmp)
+        assert [(f.rule_id, f.line) for f in findings] == [("POLICY_001", 29)]
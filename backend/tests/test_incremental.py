@@ -0,0 +1,88 @@
+import os
+from pathlib import Path
+
+import pytest
+
+from backend.models import Finding
+from backend.services import incremental
+from backend.services.incremental import incremental_scan, module_units, unit_keys
+from backend.services.scan_cache import ScanCache
+
+
+def _tree(root: Path) -> None:
+    (root / "modules" / "net").mkdir(parents=True)
+    (root / "app").mkdir()
+    (root / "modules" / "net" / "main.tf").write_text('resource "aws_vpc" "v" {}\n', encoding="utf-8")
+    (root / "app" / "main.tf").write_text('module "net" {\n  source = "../modules/net"\n}\n', encoding="utf-8")
+    (root / "main.tf").write_text('resource "aws_s3_bucket" "b" {}\n', encoding="utf-8")
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    c = ScanCache(path=str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(incremental, "get_scan_cache", lambda: c)
+    return c
+
+
+def test_module_edit_invalidates_callers_only(tmp_path):
+    _tree(tmp_path)
+    before = unit_keys(str(tmp_path), module_units(str(tmp_path)))
+
+    (tmp_path / "modules" / "net" / "main.tf").write_text('resource "aws_vpc" "w" {}\n', encoding="utf-8")
+    after = unit_keys(str(tmp_path), module_units(str(tmp_path)))
+
+    assert before["."] == after["."]
+    assert before["modules/net"] != after["modules/net"]
+    assert before["app"] != after["app"]
+
+
+def test_only_changed_units_are_rescanned(tmp_path, cache):
+    _tree(tmp_path)
+    scanned = []
+
+    def scan_units(units, complete):
+        scanned.append(sorted(units))
+        return {
+            u: [Finding(tool="policy", rule_id="R", severity="LOW", file=f"{u}/x.tf", line=1, message=u)]
+            for u in units
+        }
+
+    base = incremental_scan("policy", "v1", str(tmp_path), scan_units)
+    (tmp_path / "main.tf").write_text('resource "aws_s3_bucket" "c" {}\n', encoding="utf-8")
+    head = incremental_scan("policy", "v1", str(tmp_path), scan_units)
+
+    assert scanned == [[".", "app", "modules/net"], ["."]]
+    assert [f.message for f in head] == [f.message for f in base] == [".", "app", "modules/net"]
+
+
+def test_failed_scan_is_not_cached(tmp_path, cache):
+    _tree(tmp_path)
+    calls = []
+
+    def flaky(units, complete):
+        calls.append(sorted(units))
+        # the first call crashes for one unit; the scanner reports it as None
+        return {u: (None if u == "app" and len(calls) == 1 else []) for u in units}
+
+    incremental_scan("checkov", "v1", str(tmp_path), flaky)
+    incremental_scan("checkov", "v1", str(tmp_path), flaky)
+    assert calls == [[".", "app", "modules/net"], ["app"]]
+
+
+def test_same_size_edit_is_rescanned(tmp_path, cache):
+    _tree(tmp_path)
+    scanned = []
+
+    def scan_units(units, complete):
+        scanned.append(sorted(units))
+        return {u: [] for u in units}
+
+    incremental_scan("policy", "v1", str(tmp_path), scan_units)
+    net = tmp_path / "modules" / "net" / "main.tf"
+    net.write_text('resource "aws_vpc" "w" {}\n', encoding="utf-8")
+    # same size; a coarse filesystem clock could also leave mtime unchanged
+    st = net.stat()
+    os.utime(net, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    incremental_scan("policy", "v1", str(tmp_path), scan_units)
+
+    assert scanned == [[".", "app", "modules/net"], ["app", "modules/net"]]
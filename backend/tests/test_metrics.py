@@ -0,0 +1,106 @@
+import socket
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.models import RunSummary
+from backend.services.metrics import DogStatsdSink, Metrics
+
+
+class SlowSink:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batches = []
+        self.sent = threading.Event()
+
+    def send(self, points):
+        time.sleep(self.delay)
+        self.batches.append(points)
+        self.sent.set()
+
+    def close(self):
+        pass
+
+
+def test_runs_are_aggregated_and_flushed_in_one_batch():
+    sink = SlowSink()
+    m = Metrics(sink, flush_interval=60)
+    for ms in (100, 300):
+        m.send_run_metrics(RunSummary(duration_ms=ms, policy_fails=1), repo="demo/tf", result="safe")
+    m.send_run_metrics(RunSummary(), repo="demo/tf", result="failed")
+    m.flush()
+
+    assert len(sink.batches) == 1
+    points = {(name, tags): value for name, kind, value, tags in sink.batches[0] if kind == "count"}
+    safe = ("repo:demo/tf", "result:safe")
+    assert points[("autoinfra.runs", safe)] == 2
+    assert points[("autoinfra.runs", ("repo:demo/tf", "result:failed"))] == 1
+    # per-run series keep their names, as distributions Datadog can take avg/p95 of
+    durations = [(kind, value, tags) for name, kind, value, tags in sink.batches[0] if name == "autoinfra.run.duration_ms"]
+    assert durations == [("distribution", 100, safe), ("distribution", 300, safe)]
+    assert not any(name.startswith("autoinfra.run.duration_ms.") for name, *_ in sink.batches[0])
+
+    m.flush()  # nothing new: no empty batch
+    assert len(sink.batches) == 1
+
+
+def test_recording_never_waits_for_the_sink():
+    sink = SlowSink(delay=0.5)
+    m = Metrics(sink, flush_interval=0.01)
+    m.count("autoinfra.test")
+    assert sink.sent.wait(2)  # the background thread flushed on its own
+
+    start = time.perf_counter()
+    for _ in range(1000):
+        m.distribution("autoinfra.test.latency", 1.0)
+    assert time.perf_counter() - start < 0.25
+    m.close()
+    assert sum(1 for b in sink.batches for p in b if p[0] == "autoinfra.test.latency") == 1000
+
+
+def test_dogstatsd_sink_packs_lines_into_datagrams():
+    server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server.bind(("127.0.0.1", 0))
+    server.settimeout(2)
+    sink = DogStatsdSink("127.0.0.1", server.getsockname()[1])
+    points = [(f"autoinfra.m{i}", "count" if i % 2 else "gauge", i, ("repo:x",)) for i in range(200)]
+    sink.send(points)
+
+    lines = []
+    while len(lines) < 200:
+        datagram = server.recv(65535)
+        assert len(datagram) <= DogStatsdSink.MAX_DATAGRAM
+        lines += datagram.decode().split("\n")
+    assert lines[0] == "autoinfra.m0:0|g|#repo:x" and lines[1] == "autoinfra.m1:1|c|#repo:x"
+
+    sink.send([("autoinfra.run.duration_ms", "distribution", 1243, ("repo:x",))])
+    assert server.recv(65535) == b"autoinfra.run.duration_ms:1243|d|#repo:x"
+    sink.close()
+    server.close()
+
+
+def test_each_run_reported_once(monkeypatch):
+    from backend.main import app
+    from backend.routes import runs as runs_routes
+    from backend.services import metrics
+
+    sink = SlowSink()
+    m = Metrics(sink, flush_interval=60)
+    monkeypatch.setattr(runs_routes, "get_metrics", lambda: m)
+    monkeypatch.setattr(metrics, "get_metrics", lambda: m)
+    monkeypatch.setenv("RUN_SYNC", "true")
+    from backend.config.settings import get_settings
+
+    get_settings.cache_clear()
+    try:
+        resp = TestClient(app).post(
+            "/run",
+            json={"repo": "demo/once", "pr_number": 1, "commit_sha": "deadbeef", "tf_path": "backend/sample/tf"},
+        )
+    finally:
+        get_settings.cache_clear()
+    assert resp.status_code == 200
+    m.flush()
+    runs = [p for p in sink.batches[0] if p[0] == "autoinfra.runs"]
+    assert len(runs) == 1 and runs[0][2] == 1
@@ -1,5 +1,5 @@
 from backend.models import RunRequest
-from backend.orchestrator import execute_run
+from backend.orchestrator import execute_run, new_run_id
 
 
 def test_execute_run_returns_completed_status():
@@ -14,3 +14,7 @@ def test_execute_run_returns_completed_status():
     assert status.summary.duration_ms >= 0
     
     assert isinstance(status.findings, list)
+
+
+def test_run_ids_are_unique_within_a_burst():
+    assert len({new_run_id() for _ in range(10000)}) == 10000
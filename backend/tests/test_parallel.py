@@ -0,0 +1,69 @@
+from pathlib import Path
+
+import pytest
+
+from backend.config.settings import get_settings
+from backend.services import parallel, policy_engine
+from backend.services.cost_estimator import estimate_monthly_cost
+from backend.services.parallel import split_balanced
+
+MODULE_TF = '''
+resource "aws_instance" "app" { }
+
+resource "aws_security_group" "sg" {
+  ingress {
+    from_port   = 22
+    to_port     = 22
+    cidr_blocks = ["0.0.0.0/0"]
+  }
+}
+'''
+
+
+@pytest.fixture
+def scan_settings(monkeypatch):
+    def use(workers: int, min_files: int):
+        s = get_settings().model_copy(update={"scan_workers": workers, "scan_parallel_min_files": min_files})
+        monkeypatch.setattr(parallel, "get_settings", lambda: s)
+
+    yield use
+    parallel.shutdown_scan_pool()
+
+
+def _monorepo(root: Path, n: int) -> None:
+    for i in range(n):
+        d = root / f"svc{i:02d}"
+        d.mkdir()
+        (d / "main.tf").write_text(MODULE_TF, encoding="utf-8")
+
+
+def test_split_balanced_keeps_order_and_weight():
+    chunks = split_balanced(list("abcdef"), [1, 1, 4, 1, 1, 1], 3)
+    assert [x for c in chunks for x in c] == list("abcdef")
+    assert all(chunks)
+    assert len(chunks) <= 4
+
+
+def test_parallel_scan_matches_serial(tmp_path, scan_settings):
+    _monorepo(tmp_path, 12)
+    units = {f"svc{i:02d}": [tmp_path / f"svc{i:02d}" / "main.tf"] for i in range(12)}
+
+    scan_settings(workers=0, min_files=1)
+    serial = policy_engine._scan_units(units, True)
+    serial_cost = estimate_monthly_cost(str(tmp_path))
+
+    scan_settings(workers=2, min_files=1)
+    assert parallel.get_scan_pool() is not None
+    par = policy_engine._scan_units(units, True)
+    par_cost = estimate_monthly_cost(str(tmp_path))
+
+    assert list(par) == list(serial) == sorted(units)
+    assert par == serial
+    assert par_cost == serial_cost == 12 * 35.0
+
+
+def test_small_trees_stay_serial(tmp_path, scan_settings, monkeypatch):
+    _monorepo(tmp_path, 3)
+    scan_settings(workers=2, min_files=100)
+    monkeypatch.setattr(parallel, "get_scan_pool", lambda: pytest.fail("pool used below threshold"))
+    assert estimate_monthly_cost(str(tmp_path)) == 3 * 35.0
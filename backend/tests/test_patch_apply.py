@@ -0,0 +1,140 @@
+from pathlib import Path
+
+import pytest
+
+from backend.models import Finding
+from backend.services import patch_apply
+from backend.services.patch_apply import self_check_with_patches
+
+BUCKET_TF = '''resource "aws_s3_bucket" "logs" {
+  bucket = "logs"
+  acl    = "public-read"
+}
+'''
+
+PATCH = '''```diff
+--- a/app/main.tf
++++ b/app/main.tf
+-  acl    = "public-read"
++  acl    = "private"
+```'''
+
+
+def _finding(tool: str, file: str, rule_id: str = "X") -> Finding:
+    return Finding(tool=tool, rule_id=rule_id, severity="HIGH", file=file, line=1, message="m")
+
+
+def test_self_check_rescans_only_patched_modules(tmp_path, monkeypatch):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "main.tf").write_text(BUCKET_TF, encoding="utf-8")
+    (tmp_path / "app" / "vars.tf").write_text('variable "v" {}\n', encoding="utf-8")
+    (tmp_path / "other.tf").write_text('resource "aws_instance" "x" { }\n', encoding="utf-8")
+
+    def no_full_scan(*_a, **_k):
+        pytest.fail("full tree scanned despite baseline")
+
+    rescanned = []
+    monkeypatch.setattr(patch_apply, "run_checkov", no_full_scan)
+    monkeypatch.setattr(patch_apply, "run_policy_checks", no_full_scan)
+    monkeypatch.setattr(patch_apply, "scan_checkov_files", lambda root, files: rescanned.extend(files) or [])
+
+    baseline = [
+        _finding("checkov", "/app/main.tf"),
+        _finding("checkov", "/app/vars.tf"),
+        _finding("checkov", "/other.tf"),
+        _finding("policy", "app/main.tf", "POLICY_002"),
+    ]
+    sc = self_check_with_patches(str(tmp_path), [PATCH], baseline=baseline)
+
+    # the whole touched module is rescanned, untouched files in it included
+    assert rescanned == ["app/main.tf", "app/vars.tf"]
+    assert (sc.issues_before, sc.policy_before) == (3, 1)
+    # other.tf finding is carried over, app/'s are redone; the bucket still lacks hardening
+    assert (sc.patches[0].issues_after, sc.patches[0].policy_after) == (1, 2)
+    # which makes the patch unhelpful: it is not suggested and the tree keeps its findings
+    assert not sc.patches[0].helps
+    assert (sc.issues_after, sc.policy_after) == (3, 1)
+    assert not sc.safe_to_merge
+
+
+def test_self_check_without_applicable_patch_is_unsafe(tmp_path):
+    (tmp_path / "main.tf").write_text(BUCKET_TF, encoding="utf-8")
+    sc = self_check_with_patches(str(tmp_path), ["no diff here"], baseline=[])
+    assert (sc.issues_after, sc.policy_after, sc.safe_to_merge) == (0, 0, False)
+
+
+def test_each_patch_is_attributed(tmp_path, monkeypatch):
+    (tmp_path / "main.tf").write_text(BUCKET_TF, encoding="utf-8")
+    calls = []
+    monkeypatch.setattr(patch_apply, "scan_checkov_files", lambda root, files: calls.append(files) or [])
+    monkeypatch.setattr(patch_apply, "run_checkov", lambda root: [])
+
+    helpful = PATCH.replace("app/main.tf", "main.tf")
+    useless = "```diff\n- nothing_like_this = 1\n+ x = 2\n```"
+    harmful = '```diff\n- bucket = "logs"\n+ bucket = "logs"\n+ publicly_accessible = true\n```'
+    sc = self_check_with_patches(str(tmp_path), [helpful, useless, harmful], baseline=None)
+
+    assert [(p.index, p.applied, p.helps) for p in sc.patches] == [(0, True, True), (1, False, False), (2, True, False)]
+    assert sc.patches[0].policy_after == sc.policy_before - 1
+    assert sc.patches[2].policy_after == sc.policy_before + 1
+    # combined set plus the two applied patches, one checkov scan each
+    assert calls == [["main.tf"]] * 3
+
+
+def test_each_workspace_is_scanned_on_its_own(tmp_path, monkeypatch):
+    (tmp_path / "main.tf").write_text(BUCKET_TF, encoding="utf-8")
+    seen = []
+
+    def scan(root, files):
+        # a scan sees only its own workspace's tree and reports paths under it
+        seen.append(sorted(p.relative_to(root).as_posix() for p in Path(root).rglob("*.tf")))
+        text = (Path(root) / files[0]).read_text(encoding="utf-8")
+        return [_finding("checkov", "/main.tf")] if "publicly_accessible" in text else []
+
+    monkeypatch.setattr(patch_apply, "scan_checkov_files", scan)
+    helpful = PATCH.replace("app/main.tf", "main.tf")
+    harmful = '```diff\n- bucket = "logs"\n+ bucket = "logs"\n+ publicly_accessible = true\n```'
+    sc = self_check_with_patches(str(tmp_path), [helpful, harmful], baseline=[])
+
+    assert seen == [["main.tf"]] * 3
+    # the finding from the harmful patch's workspace is not charged to the helpful one
+    assert [p.issues_after for p in sc.patches] == [0, 1]
+    # only the helpful patch is suggested, so the totals are its own
+    assert sc.issues_after == 0
+
+
+def test_verdict_covers_only_the_patches_that_help(tmp_path, monkeypatch):
+    (tmp_path / "main.tf").write_text(
+        'resource "aws_db_instance" "a" {\n  publicly_accessible = true\n}\n'
+        'resource "aws_db_instance" "b" {\n  publicly_accessible = true\n}\n',
+        encoding="utf-8",
+    )
+    scanned = []
+    monkeypatch.setattr(patch_apply, "scan_checkov_files", lambda root, files: scanned.append(root) or [])
+    monkeypatch.setattr(patch_apply, "run_checkov", lambda root: [])
+    fix_a = "```diff\n-  publicly_accessible = true\n+  publicly_accessible = false\n```"
+    fix_b = (
+        '```diff\n resource "aws_db_instance" "b" {\n'
+        "-  publicly_accessible = true\n+  publicly_accessible = false\n```"
+    )
+    stale = "```diff\n- nothing_like_this = 1\n+ x = 2\n```"
+
+    sc = self_check_with_patches(str(tmp_path), [fix_a, stale, fix_b], baseline=None)
+    assert [(p.applied, p.helps) for p in sc.patches] == [(True, True), (False, False), (True, True)]
+    # the stale patch is dropped from the comment, so it does not cost the badge;
+    # the two fixes are checked together on their own, after the speculative full set
+    assert (sc.policy_before, sc.policy_after) == (2, 0)
+    assert sc.safe_to_merge
+    assert len(scanned) == 4
+
+
+def test_unchanged_totals_neither_help_nor_are_safe(tmp_path, monkeypatch):
+    (tmp_path / "main.tf").write_text('resource "aws_instance" "x" {\n  ami = "a"\n}\n', encoding="utf-8")
+    monkeypatch.setattr(patch_apply, "scan_checkov_files", lambda root, files: [_finding("checkov", "/main.tf")])
+    cosmetic = '```diff\n-  ami = "a"\n+  ami = "b"\n```'
+    sc = self_check_with_patches(str(tmp_path), [cosmetic], baseline=[_finding("checkov", "/main.tf")])
+
+    # applies cleanly and leaves no policy failures, but fixes nothing
+    assert (sc.issues_before, sc.issues_after, sc.policy_after) == (1, 1, 0)
+    assert sc.patches[0].applied and not sc.patches[0].helps
+    assert not sc.safe_to_merge
@@ -1,4 +1,6 @@
+import gc
 import tempfile
+import time
 from pathlib import Path
 
 from backend.services.policy_engine import run_policy_checks
@@ -37,3 +39,47 @@ def test_policy_engine_flags_expected_rules():
         
         assert all(f.tool == "policy" for f in findings)
         assert all(f.file.endswith(".tf") for f in findings)
+
+
+def _generated_tf(n_resources: int) -> str:
+    # 10 lines per resource, each with one finding
+    block = (
+        'resource "aws_security_group" "sg_{i}" {{\n'
+        "  ingress {{\n"
+        "    from_port   = 22\n"
+        "    to_port     = 22\n"
+        '    protocol    = "tcp"\n'
+        '    cidr_blocks = ["0.0.0.0/0"]\n'
+        "  }}\n"
+        "  # 0.0.0.0/0 in a comment\n"
+        "}}\n"
+        "\n"
+    )
+    return "".join(block.format(i=i) for i in range(n_resources))
+
+
+def test_policy_engine_reports_every_match_and_scales_linearly():
+    from backend.services.policy_engine import _scan_file
+
+    timings = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in (1_000, 10_000):  # 10k and 100k lines
+            tf = Path(tmp) / f"gen_{n}.tf"
+            tf.write_text(_generated_tf(n), encoding="utf-8")
+            # collector pauses grow with the live heap, not with the scan
+            gc.collect()
+            gc.disable()
+            try:
+                started = time.perf_counter()
+                findings = _scan_file(tf)
+                timings[n] = time.perf_counter() - started
+            finally:
+                gc.enable()
+
+            assert len(findings) == n
+            assert [f.line for f in findings[:2]] == [6, 16]
+            assert findings[-1].line == (n - 1) * 10 + 6
+
+    # tokenizing, line lookups and rule dispatch together: 10x the input stays
+    # well under 20x the time, where anything quadratic would take ~100x
+    assert timings[10_000] < timings[1_000] * 20
@@ -0,0 +1,171 @@
+import threading
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.main import app
+from backend.services.jobs import JobRunner
+
+
+RUN_PAYLOAD = {
+    "repo": "demo/terraform",
+    "pr_number": 1,
+    "commit_sha": "deadbeef",
+    "tf_path": "backend/sample/tf",
+}
+
+
+def _wait_for_terminal(client: TestClient, run_id: str, timeout: float = 30.0) -> dict:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        data = client.get("/status", params={"run_id": run_id}).json()
+        if data["status"] != "running":
+            return data
+        time.sleep(0.05)
+    raise AssertionError("run did not finish in time")
+
+
+def test_run_returns_202_and_completes_in_background():
+    client = TestClient(app)
+    resp = client.post("/run", json=RUN_PAYLOAD)
+    assert resp.status_code == 202
+    data = resp.json()
+    assert data["status"] == "running"
+
+    final = _wait_for_terminal(client, data["run_id"])
+    assert final["status"] == "completed"
+    assert final["summary"]["policy_fails"] >= 1
+
+
+def test_cancel_unknown_run_is_404():
+    client = TestClient(app)
+    resp = client.post("/cancel", params={"run_id": "nope"})
+    assert resp.status_code == 404
+
+
+def test_job_runner_cancels_queued_and_in_flight_jobs():
+    runner = JobRunner(max_workers=1, max_pending=4)
+    started = threading.Event()
+    seen = []
+
+    def blocking(job):
+        started.set()
+        job.cancel_event.wait(5)
+        seen.append(("first", job.cancelled))
+
+    def never(job):
+        seen.append(("second", job.cancelled))
+
+    runner.submit("a", blocking)
+    runner.submit("b", never)
+    assert started.wait(5)
+
+    assert runner.cancel("b") is True
+    assert runner.cancel("a") is True
+    runner.shutdown(wait=True)
+
+    assert seen == [("first", True)]
+    assert runner.pending() == 0
+    assert runner.cancel("a") is False
+
+
+def test_status_falls_back_to_storage(monkeypatch):
+    from backend.models import Finding, RunSummary
+    from backend.routes import runs as runs_routes
+    from backend.services.storage import MemoryStorage
+
+    st = MemoryStorage()
+    st.insert_run("other-worker-run", "demo/terraform", 1, "deadbeef", "completed", RunSummary(duration_ms=7))
+    st.insert_findings(
+        "other-worker-run",
+        [Finding(tool="policy", rule_id="POLICY_003", severity="HIGH", file="main.tf", line=3, message="m")],
+    )
+    monkeypatch.setattr(runs_routes, "get_storage", lambda: st)
+
+    client = TestClient(app)
+    data = client.get("/status", params={"run_id": "other-worker-run"}).json()
+    assert data["status"] == "completed"
+    assert data["summary"]["policy_fails"] == 1
+    assert client.get("/status", params={"run_id": "nope"}).status_code == 404
+
+
+def test_history_pages_with_cursor(monkeypatch):
+    from backend.models import RunSummary
+    from backend.routes import runs as runs_routes
+    from backend.services.storage import MemoryStorage
+
+    st = MemoryStorage()
+    for i in range(5):
+        st.insert_run(f"run-{i}", "demo/terraform", 1, "deadbeef", "completed", RunSummary(duration_ms=7))
+    monkeypatch.setattr(runs_routes, "get_storage", lambda: st)
+
+    client = TestClient(app)
+    first = client.get("/history", params={"limit": 3})
+    assert [h["run_id"] for h in first.json()] == ["run-4", "run-3", "run-2"]
+    second = client.get("/history", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+    assert [h["run_id"] for h in second.json()] == ["run-1", "run-0"]
+    assert "X-Next-Cursor" not in second.headers
+    assert client.get("/history", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_stats_endpoint(monkeypatch):
+    from backend.models import Finding, RunSummary
+    from backend.routes import runs as runs_routes
+    from backend.services.storage import MemoryStorage
+
+    st = MemoryStorage()
+    st.insert_run("r1", "demo/terraform", 1, "deadbeef", "completed", RunSummary(duration_ms=40))
+    st.insert_findings("r1", [Finding(tool="policy", rule_id="POLICY_003", severity="HIGH", file="main.tf", line=3, message="m")])
+    monkeypatch.setattr(runs_routes, "get_storage", lambda: st)
+
+    data = TestClient(app).get("/stats", params={"days": 1}).json()
+    assert data["runs"] == 1
+    assert data["top_rules"][0]["rule_id"] == "POLICY_003"
+    assert data["repos"][0]["repo"] == "demo/terraform"
+
+
+def test_export_streams_csv(monkeypatch):
+    from backend.models import RunSummary
+    from backend.routes import runs as runs_routes
+    from backend.services.storage import MemoryStorage
+
+    st = MemoryStorage()
+    for i in range(3):
+        st.insert_run(f"run-{i}", "demo/terraform", 1, "deadbeef", "completed", RunSummary(duration_ms=7))
+    monkeypatch.setattr(runs_routes, "get_storage", lambda: st)
+
+    resp = TestClient(app).get("/export", params={"format": "csv"})
+    assert resp.headers["content-type"].startswith("text/csv")
+    lines = resp.text.splitlines()
+    assert lines[0].startswith("run_id,repo,pr_number") and len(lines) == 4
+    assert lines[1].startswith("run-0,demo/terraform")
+
+
+def test_cancel_from_another_worker_is_kept(tmp_path, monkeypatch):
+    from backend.models import RunRequest, RunSummary, StatusResponse
+    from backend.routes import runs as runs_routes
+    from backend.services.jobs import Job, RunCancelled
+    from backend.services.status_cache import StatusCache
+
+    db = str(tmp_path / "status.sqlite3")
+    here, elsewhere = StatusCache(path=db), StatusCache(path=db)
+    monkeypatch.setattr(runs_routes, "get_status_cache", lambda: here)
+    here.put(StatusResponse(run_id="r1", status="running", summary=RunSummary()))
+
+    def execute_run(req, run_id, job):
+        # another worker handles /cancel while this one is between stages
+        elsewhere.settle(StatusResponse(run_id=run_id, status="failed", summary=RunSummary(), error="superseded"))
+        try:
+            job.raise_if_cancelled()
+        except RunCancelled:
+            stopped.append(job.cancel_reason)
+            raise
+        return StatusResponse(run_id=run_id, status="completed", summary=RunSummary())
+
+    stopped = []
+    monkeypatch.setattr(runs_routes, "execute_run", execute_run)
+    doc = runs_routes.run_job(RunRequest(**RUN_PAYLOAD), Job(run_id="r1"))
+
+    assert stopped == ["superseded"]
+    assert (doc.status, doc.error) == ("failed", "superseded")
+    assert elsewhere.get("r1").status == "failed"
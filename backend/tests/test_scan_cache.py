@@ -0,0 +1,50 @@
+from backend.models import Finding
+from backend.services.scan_cache import ScanCache
+
+
+def _finding(rule_id: str) -> Finding:
+    return Finding(tool="policy", rule_id=rule_id, severity="HIGH", file="main.tf", line=1, message="m")
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    db = str(tmp_path / "cache.sqlite3")
+    key = ScanCache.make_key("policy", "v1", "digest")
+
+    first = ScanCache(path=db)
+    assert first.get(key) is None
+    first.put(key, [_finding("POLICY_001")])
+    assert first.get(key)[0].rule_id == "POLICY_001"
+
+    other_worker = ScanCache(path=db)
+    assert other_worker.get(key)[0].rule_id == "POLICY_001"
+    assert other_worker.get(ScanCache.make_key("policy", "v2", "digest")) is None
+
+    assert first.stats()["memory_hits"] == 1
+    assert first.stats()["misses"] == 1
+    assert other_worker.stats()["disk_hits"] == 1
+    assert other_worker.stats()["misses"] == 1
+
+
+def test_size_bounded_eviction(tmp_path):
+    cache = ScanCache(path=str(tmp_path / "c.sqlite3"), memory_max_bytes=300, disk_max_bytes=300)
+    for i in range(5):
+        cache.put(f"k{i}", [_finding(f"R{i}")])
+
+    assert cache.stats()["memory_bytes"] <= 300
+    assert cache.stats()["evictions"] > 0
+    assert cache.get("k4") is not None
+    assert cache.get("k0") is None
+
+
+def test_disk_total_tracks_puts_overwrites_and_evictions(tmp_path):
+    db = str(tmp_path / "c.sqlite3")
+    cache = ScanCache(path=db, disk_max_bytes=1000)
+    for i in range(20):
+        cache.put(f"k{i % 7}", [_finding(f"R{i}" * (i % 3 + 1))])
+
+    conn = cache._conn
+    total = conn.execute("SELECT total FROM scan_cache_size").fetchone()[0]
+    assert total == conn.execute("SELECT SUM(size) FROM scan_cache").fetchone()[0]
+    assert total <= 1000
+    # a second worker sees the same total without recounting
+    assert ScanCache(path=db)._conn.execute("SELECT total FROM scan_cache_size").fetchone()[0] == total
@@ -0,0 +1,39 @@
+import threading
+import time
+
+import pytest
+
+from backend.services.stages import Stage, run_stages
+
+
+def test_independent_stages_run_concurrently_and_keep_order():
+    # each stage waits for the other two to start, so this only returns if all three overlap
+    started = threading.Barrier(3, timeout=5)
+
+    def stage(value):
+        started.wait()
+        time.sleep(0.05)
+        return value
+
+    stages = [
+        Stage("a", lambda: stage(["a"])),
+        Stage("b", lambda: stage(["b"])),
+        Stage("c", lambda: stage(["c"])),
+        Stage("merge", lambda a, b, c: a + b + c, deps=("a", "b", "c"), kind="inline"),
+    ]
+    results, timings = run_stages(stages)
+
+    assert results["merge"] == ["a", "b", "c"]
+    assert list(timings) == ["a", "b", "c", "merge"]
+    assert timings["a"] >= 40
+
+
+def test_stage_error_propagates_and_bad_graph_is_rejected():
+    def boom():
+        raise RuntimeError("scanner crashed")
+
+    with pytest.raises(RuntimeError, match="scanner crashed"):
+        run_stages([Stage("a", boom), Stage("b", lambda a: a, deps=("a",))])
+
+    with pytest.raises(ValueError):
+        run_stages([Stage("b", lambda a: a, deps=("a",)), Stage("a", lambda: 1)])
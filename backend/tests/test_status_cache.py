@@ -0,0 +1,126 @@
+import time
+
+from backend.models import RunSummary, StatusResponse
+from backend.services.status_cache import StatusCache
+
+
+def _doc(run_id: str, status: str = "completed", error: str = "") -> StatusResponse:
+    return StatusResponse(
+        run_id=run_id,
+        status=status,
+        summary=RunSummary(checkov_issues=0, policy_fails=0, cost_usd_month=0.0, duration_ms=0),
+        error=error or None,
+    )
+
+
+def test_lru_bounded_by_entries_and_bytes():
+    cache = StatusCache(max_entries=3)
+    for i in range(5):
+        cache.put(_doc(f"r{i}"))
+    assert cache.get("r0") is None and cache.get("r1") is None
+    assert cache.get("r4").run_id == "r4"
+    assert cache.stats()["entries"] == 3
+    assert cache.stats()["evictions"] == 2
+
+    size = len(_doc("r0").model_dump_json())
+    cache = StatusCache(max_bytes=size * 2)
+    for i in range(3):
+        cache.put(_doc(f"r{i}"))
+    assert cache.get("r0") is None
+    assert cache.stats()["resident_bytes"] <= size * 2
+
+
+def test_running_runs_are_pinned_and_ttl_expires():
+    cache = StatusCache(max_entries=1, ttl_seconds=0.05)
+    cache.put(_doc("active", status="running"))
+    for i in range(3):
+        cache.put(_doc(f"done{i}"))
+    assert cache.get("active").status == "running"
+    assert cache.stats()["active"] == 1
+
+    time.sleep(0.1)
+    assert cache.get("done2") is None
+    assert cache.stats()["expired"] == 1
+    assert cache.get("active") is not None
+
+
+def test_shared_path_serves_other_workers(tmp_path):
+    db = str(tmp_path / "status.sqlite3")
+    submitting = StatusCache(path=db)
+    running = StatusCache(path=db)
+
+    submitting.put(_doc("r1", status="running"))
+    assert running.get("r1").status == "running"
+
+    # the worker that ran the job finishes it; the submitting worker must not keep serving "running"
+    running.put(_doc("r1", status="failed", error="boom"))
+    assert submitting.get("r1").status == "failed"
+    assert submitting.stats()["active"] == 0
+
+    assert submitting.get("r1").error == "boom"
+    stats = submitting.stats()
+    assert stats["shared"] is True
+    assert stats["hits"] == 1 and stats["disk_hits"] == 1
+    assert stats["hit_rate"] == 1.0
+
+    submitting.pop("r1")
+    assert StatusCache(path=db).get("r1") is None
+
+
+def test_pr_heads_coalesce_across_workers(tmp_path):
+    db = str(tmp_path / "status.sqlite3")
+    a, b = StatusCache(path=db), StatusCache(path=db)
+
+    assert a.claim_pr_head("o/r", 1, "sha1", "run1") is None
+    # the same head delivered to another worker is reported, not replaced
+    assert b.claim_pr_head("o/r", 1, "sha1", "run2") == ("sha1", "run1")
+    assert b.claim_pr_head("o/r", 1, "sha2", "run3") == ("sha1", "run1")
+    assert a.pr_head("o/r", 1) == ("sha2", "run3")
+
+    # a superseded run finishing late does not clear the newer head
+    a.release_pr_head("o/r", 1, "run1")
+    assert b.pr_head("o/r", 1) == ("sha2", "run3")
+    b.release_pr_head("o/r", 1, "run3", previous=("sha1", "run1"))
+    assert a.pr_head("o/r", 1) == ("sha1", "run1")
+    a.release_pr_head("o/r", 1, "run1")
+    assert b.pr_head("o/r", 1) is None
+
+
+def test_disk_total_tracks_puts_and_trims(tmp_path):
+    size = len(_doc("r00").model_dump_json())
+    cache = StatusCache(path=str(tmp_path / "status.sqlite3"), disk_max_bytes=size * 4)
+    for i in range(10):
+        cache.put(_doc(f"r{i % 6:02d}", status="running" if i % 2 else "completed"))
+
+    conn = cache._conn
+    total = conn.execute("SELECT total FROM run_status_size").fetchone()[0]
+    assert total == conn.execute("SELECT SUM(size) FROM run_status").fetchone()[0]
+    assert total <= size * 4
+
+
+def test_first_final_status_wins_across_workers(tmp_path):
+    db = str(tmp_path / "status.sqlite3")
+    runner, other = StatusCache(path=db), StatusCache(path=db)
+    runner.put(_doc("r1", status="running"))
+
+    # cancelled on another worker; the runner's late "completed" must not replace it
+    assert other.settle(_doc("r1", status="failed", error="superseded")).status == "failed"
+    kept = runner.settle(_doc("r1"))
+    assert (kept.status, kept.error) == ("failed", "superseded")
+    assert other.get("r1").status == "failed"
+
+    # and a cancel arriving after completion changes nothing
+    runner.put(_doc("r2", status="running"))
+    runner.settle(_doc("r2"))
+    assert other.settle(_doc("r2", status="failed", error="cancelled")).status == "completed"
+
+
+def test_running_pins_expire_after_max_run_seconds():
+    cache = StatusCache(max_run_seconds=0.05)
+    cache.put(_doc("abandoned", status="running"))
+    time.sleep(0.1)
+    cache.put(_doc("fresh", status="running"))
+    # the worker running "abandoned" never published; its pin is dropped
+    assert cache.stats()["active"] == 1
+    assert cache.get("abandoned") is None
+    assert cache.get("fresh").status == "running"
@@ -0,0 +1,342 @@
+import gzip
+import json
+import threading
+from datetime import datetime
+
+import httpx
+import pytest
+
+from backend.models import Finding, RunSummary
+from backend.services.storage import (
+    EXPORT_FIELDS,
+    BatchWriter,
+    ClickHouseStorage,
+    MemoryStorage,
+    decode_cursor,
+    encode_cursor,
+)
+
+
+def _finding(i: int) -> Finding:
+    return Finding(tool="policy", rule_id=f"P{i}", severity="HIGH", file="main.tf", line=i, message="m")
+
+
+def _clickhouse(handler, **kw) -> ClickHouseStorage:
+    st = ClickHouseStorage("http://127.0.0.1:9", **kw)
+    st._client = httpx.Client(transport=httpx.MockTransport(handler))
+    return st
+
+
+def _sql(request: httpx.Request) -> str:
+    return request.content.decode()
+
+
+def test_write_behind_sends_one_insert_per_table():
+    requests = []
+    lock = threading.Lock()
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        with lock:
+            requests.append(request)
+        return httpx.Response(200, text="")
+
+    st = _clickhouse(handler, flush_interval_ms=60_000, async_insert=True)
+    for i in range(50):
+        st.insert_run(f"r{i}", "org/repo", 1, "sha", "completed", RunSummary(duration_ms=5))
+        st.insert_findings(f"r{i}", [_finding(0), _finding(1)])
+        st.insert_outcome(f"r{i}", 2, 0, 2, 0, True)
+    assert requests == []  # nothing on the caller's thread
+
+    st.close()
+    queries = sorted(r.url.params["query"] for r in requests)
+    assert queries == [
+        "INSERT INTO autoinfra.findings FORMAT JSONEachRow",
+        "INSERT INTO autoinfra.outcomes FORMAT JSONEachRow",
+        "INSERT INTO autoinfra.runs FORMAT JSONEachRow",
+    ]
+    by_table = {r.url.params["query"].split()[2]: r for r in requests}
+    findings_req = by_table["autoinfra.findings"]
+    assert findings_req.headers["Content-Encoding"] == "gzip"
+    rows = [json.loads(ln) for ln in gzip.decompress(findings_req.content).decode().splitlines()]
+    assert len(rows) == 100 and rows[1]["idx"] == 1
+    assert all(r.url.params["async_insert"] == "1" for r in requests)
+
+
+def test_batch_writer_flushes_on_size_and_retries_failures():
+    sent = []
+    fail = {"left": 1}
+    flushed = threading.Event()
+
+    def send(table, rows):
+        if fail["left"]:
+            fail["left"] -= 1
+            raise RuntimeError("clickhouse down")
+        sent.append((table, len(rows)))
+        flushed.set()
+
+    w = BatchWriter(send, flush_interval=60.0, max_rows=10)
+    w.add("runs", [{"i": i} for i in range(10)])  # reaching max_rows wakes the writer
+    w.add("runs", [{"i": 10}])
+    for _ in range(2):  # the first attempt (here or on the writer thread) fails
+        w.flush()
+    assert flushed.is_set()
+    w.close()
+
+    assert sum(n for _, n in sent) == 11
+    assert w.counters["errors"] == 1 and w.pending() == 0
+
+
+def test_get_status_is_one_round_trip():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(_sql(request))
+        row = [
+            "completed", 12, 35.5, 1700000000,
+            [["policy", "POLICY_003", "HIGH", "main.tf", 4, "public"]],
+            [[1, 0, 1, 0, 1]],
+        ]
+        return httpx.Response(200, text=json.dumps(row) + "\n")
+
+    st = _clickhouse(handler)
+    doc = st.get_status("r1")
+
+    assert len(seen) == 1 and seen[0].endswith("FORMAT JSONCompactEachRow")
+    assert doc["summary"] == {"checkov_issues": 0, "policy_fails": 1, "cost_usd_month": 35.5, "duration_ms": 12}
+    assert doc["findings"][0]["rule_id"] == "POLICY_003"
+    assert doc["self_check"]["issues_before"] == 1 and doc["safe_to_merge"] is True
+    assert doc["created_at"] == "2023-11-14T22:13:20"
+
+
+def _summary() -> RunSummary:
+    return RunSummary(checkov_issues=0, policy_fails=0, cost_usd_month=1.0, duration_ms=5)
+
+
+def test_memory_storage_history_is_newest_first_with_counts():
+    st = MemoryStorage()
+    for i in range(5):
+        st.insert_run(f"r{i}", "demo/tf", 1, "sha", "completed", _summary())
+        st.insert_findings(f"r{i}", [_finding(j) for j in range(i)])
+
+    items = st.history(limit=3)
+    assert [h.run_id for h in items] == ["r4", "r3", "r2"]
+    assert [h.fails for h in items] == [4, 3, 2]
+    assert st.get_status("r1")["summary"]["policy_fails"] == 1
+
+
+def test_memory_storage_retention_by_count_and_age():
+    st = MemoryStorage(max_runs=3)
+    for i in range(5):
+        st.insert_run(f"r{i}", "demo/tf", 1, "sha", "completed", _summary())
+        st.insert_findings(f"r{i}", [_finding(i)])
+    assert [h.run_id for h in st.history(limit=10)] == ["r4", "r3", "r2"]
+    assert "r0" not in st._findings
+    with pytest.raises(KeyError):
+        st.get_status("r0")
+
+    st = MemoryStorage(retention_days=0)
+    st.insert_run("old", "demo/tf", 1, "sha", "completed", _summary())
+    assert st.history() == []
+    with pytest.raises(KeyError):
+        st.get_status("old")
+
+
+def test_memory_storage_concurrent_inserts():
+    st = MemoryStorage(max_runs=500)
+
+    def worker(n: int) -> None:
+        for i in range(200):
+            run_id = f"w{n}-{i}"
+            st.insert_run(run_id, "demo/tf", 1, "sha", "completed", _summary())
+            st.insert_findings(run_id, [_finding(i)])
+            st.history(limit=5)
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    items = st.history(limit=1000)
+    assert len(items) == 500
+    assert [h.created_at for h in items] == sorted((h.created_at for h in items), reverse=True)
+    assert len(st._runs) == len(st._order) == 500
+
+
+def test_memory_storage_keyset_pages_and_filters():
+    st = MemoryStorage()
+    for i in range(25):
+        st.insert_run(f"r{i:02d}", "demo/a" if i % 2 else "demo/b", i % 3, "sha", "completed", _summary())
+
+    seen, before = [], None
+    while True:
+        page = st.history(limit=10, before=before)
+        seen += [h.run_id for h in page]
+        if len(page) < 10:
+            break
+        before = decode_cursor(encode_cursor(page[-1]))
+    assert seen == [f"r{i:02d}" for i in reversed(range(25))]
+
+    odd = st.history(limit=100, repo="demo/a", pr_number=0)
+    assert [h.run_id for h in odd] == ["r21", "r15", "r09", "r03"]
+
+    mid = st._runs["r10"]["created_at"]
+    assert [h.run_id for h in st.history(limit=100, until=mid)][0] == "r09"
+    assert [h.run_id for h in st.history(limit=100, since=mid)][-1] == "r10"
+
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
+
+
+def test_memory_storage_pr_history_reads_only_that_pr():
+    st = MemoryStorage(max_runs=200)
+    for i in range(300):
+        st.insert_run(f"r{i:03d}", "demo/a", 7 if i % 50 == 0 else i % 5, "sha", "completed", _summary())
+    # the 100 oldest were trimmed from every index, r000 and r050 among them
+    assert st._by_pr[("demo/a", 7)] == [(st._runs[r]["created_at"], r) for r in ("r100", "r150", "r200", "r250")]
+
+    class CountingRuns(dict):
+        reads = 0
+
+        def __getitem__(self, key):
+            CountingRuns.reads += 1
+            return super().__getitem__(key)
+
+    st._runs = CountingRuns(st._runs)
+    first = st.history(limit=3, repo="demo/a", pr_number=7)
+    rest = st.history(limit=3, repo="demo/a", pr_number=7, before=decode_cursor(encode_cursor(first[-1])))
+    assert [h.run_id for h in first + rest] == ["r250", "r200", "r150", "r100"]
+    assert CountingRuns.reads == 4
+
+
+def test_clickhouse_history_is_a_keyset_range_scan():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(_sql(request))
+        return httpx.Response(200, text=json.dumps(["r1", "sha", 2, 1, 3.5, 40, 1700000000]) + "\n")
+
+    st = _clickhouse(handler)
+    cursor = (datetime(2023, 11, 14, 22, 13, 20), "r2")
+    items = st.history(limit=5, before=cursor, repo="demo/tf", pr_number=7)
+
+    sql = seen[0]
+    assert "FROM autoinfra.runs" in sql and "recent_runs" not in sql
+    assert "created_at <= toDateTime(1700000000) AND (created_at < toDateTime(1700000000) OR run_id < 'r2')" in sql
+    assert "repo = 'demo/tf'" in sql and "pr_number = 7" in sql
+    assert "ORDER BY created_at DESC, run_id DESC LIMIT 5" in sql
+    assert items[0].issues == 2 and items[0].fails == 1
+    assert items[0].created_at == cursor[0]
+
+
+def test_memory_stats_from_rollups():
+    st = MemoryStorage()
+    for i, (repo, ms) in enumerate([("demo/a", 100), ("demo/a", 200), ("demo/b", 1000)]):
+        st.insert_run(f"r{i}", repo, 1, "sha", "completed", RunSummary(duration_ms=ms))
+        st.insert_findings(f"r{i}", [_finding(1), _finding(1), _finding(2)] if repo == "demo/a" else [_finding(2)])
+
+    stats = st.stats(days=1)
+    assert stats.runs == 3 and stats.findings == 7
+    assert stats.by_severity == {"HIGH": 7}
+    assert (stats.top_rules[0].rule_id, stats.top_rules[0].findings, stats.top_rules[0].runs) == ("P1", 4, 2)
+    assert [(r.repo, r.runs, r.findings) for r in stats.repos] == [("demo/a", 2, 6), ("demo/b", 1, 1)]
+    # log buckets are ~10% wide
+    assert 90 <= stats.repos[0].p50_ms <= 220
+    assert 900 <= stats.p95_ms <= 1100
+
+    only_b = st.stats(days=1, repo="demo/b")
+    assert only_b.runs == 1 and [r.rule_id for r in only_b.top_rules] == ["P2"]
+
+
+def test_clickhouse_stats_reads_only_rollups():
+    seen = []
+    replies = iter(
+        [
+            [["P1", "HIGH", "policy", 4, 2]],
+            [["demo/a", "HIGH", 6], ["demo/b", "HIGH", 1]],
+            [["demo/a", 2, [150.0, 195.0]], ["demo/b", 1, [1000.0, 1000.0]]],
+            [[3, [200.0, 955.0]]],
+        ]
+    )
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(_sql(request))
+        return httpx.Response(200, text="".join(json.dumps(r) + "\n" for r in next(replies)))
+
+    stats = _clickhouse(handler).stats(days=7, top=5)
+
+    assert all("_rollup " in q and "autoinfra.runs" not in q and "autoinfra.findings" not in q for q in seen)
+    assert "WHERE day >= today() - 6" in seen[0]
+    assert stats.runs == 3 and stats.findings == 7 and stats.p95_ms == 955.0
+    assert stats.top_rules[0].runs == 2
+    assert [(r.repo, r.p50_ms) for r in stats.repos] == [("demo/a", 150.0), ("demo/b", 1000.0)]
+
+
+def test_reads_put_sql_in_body_with_limits_and_stream_rows():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        rows = [["r%d" % i, "sha", 0, 0, 1.0, 5, 1700000000] for i in range(3)]
+        return httpx.Response(200, text="".join(json.dumps(r) + "\n" for r in rows))
+
+    st = _clickhouse(handler, max_execution_time_s=3)
+    items = st.history(limit=3, repo="x" * 20000)
+
+    req = seen[0]
+    assert "query" not in req.url.params and len(str(req.url)) < 200
+    assert "x" * 20000 in _sql(req)
+    assert req.url.params["max_execution_time"] == "3"
+    assert [h.run_id for h in items] == ["r0", "r1", "r2"]
+
+
+def test_uncompressed_inserts_when_disabled():
+    bodies = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        bodies.append(request)
+        return httpx.Response(200, text="")
+
+    st = _clickhouse(handler, compress=False)
+    st.insert_findings("r1", [_finding(0)])
+    assert "Content-Encoding" not in bodies[-1].headers
+    assert json.loads(bodies[-1].content)["rule_id"] == "P0"
+
+
+def test_memory_export_walks_in_chunks(monkeypatch):
+    monkeypatch.setattr(MemoryStorage, "EXPORT_CHUNK", 4)
+    st = MemoryStorage()
+    for i in range(10):
+        st.insert_run(f"r{i}", "demo/a" if i % 2 else "demo/b", 1, "sha", "completed", _summary())
+        st.insert_findings(f"r{i}", [_finding(i)])
+
+    export = st.export("runs")
+    first = next(export)
+    st.insert_run("late", "demo/a", 1, "sha", "completed", _summary())  # writers are not blocked mid-export
+    runs = [first] + list(export)
+    assert [r["run_id"] for r in runs] == [f"r{i}" for i in range(10)] + ["late"]
+
+    findings = list(st.export("findings", repo="demo/a"))
+    assert [f["rule_id"] for f in findings] == ["P1", "P3", "P5", "P7", "P9"]
+    assert set(findings[0]) == set(EXPORT_FIELDS["findings"])
+
+
+def test_clickhouse_export_streams_one_query():
+    seen = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request)
+        row = ["r1", "demo/tf", "policy", "P1", "HIGH", "main.tf", 3, "m", 1700000000]
+        return httpx.Response(200, text=json.dumps(row) + "\n")
+
+    rows = list(_clickhouse(handler).export("findings", repo="demo/tf"))
+
+    sql = _sql(seen[0])
+    assert "FROM autoinfra.findings WHERE repo = 'demo/tf' ORDER BY run_id, idx" in sql
+    assert seen[0].url.params["max_execution_time"] == "0"
+    assert rows == [
+        {
+            "run_id": "r1", "repo": "demo/tf", "tool": "policy", "rule_id": "P1", "severity": "HIGH",
+            "file": "main.tf", "line": 3, "message": "m", "created_at": datetime(2023, 11, 14, 22, 13, 20),
+        }
+    ]
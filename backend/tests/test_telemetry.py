@@ -0,0 +1,65 @@
+import time
+
+from fastapi.testclient import TestClient
+
+from backend.services.telemetry import Registry, collect_timings, span
+
+
+def test_histogram_and_counter_render_as_openmetrics():
+    reg = Registry()
+    h = reg.histogram("t_seconds", "Test latency.", ("stage",), buckets=(0.1, 1.0))
+    c = reg.counter("t_spawned", "Test spawns.", ("tool",))
+    for v in (0.05, 0.5, 5.0):
+        h.observe(v, stage="scan")
+    c.inc(tool="checkov")
+    c.inc(2, tool="checkov")
+    reg.callback("t_depth", "Queue.", "gauge", lambda: {(): 3})
+
+    text = reg.render()
+    assert '# TYPE t_seconds histogram' in text
+    assert 't_seconds_bucket{stage="scan",le="0.1"} 1' in text
+    assert 't_seconds_bucket{stage="scan",le="1"} 2' in text
+    assert 't_seconds_bucket{stage="scan",le="+Inf"} 3' in text
+    assert 't_seconds_count{stage="scan"} 3' in text
+    assert 't_spawned_total{tool="checkov"} 3' in text
+    assert "t_depth 3" in text
+    assert text.endswith("# EOF\n")
+
+
+def test_spans_add_to_the_collecting_run_only():
+    timings = {}
+    with collect_timings(timings):
+        with span("stage_a"):
+            time.sleep(0.02)
+        with span("stage_a"):
+            pass
+    with span("outside"):
+        pass
+    assert set(timings) == {"stage_a"} and timings["stage_a"] >= 20
+
+
+def test_metrics_endpoint_and_run_timings():
+    from backend.main import app
+
+    client = TestClient(app)
+    resp = client.post(
+        "/run",
+        json={"repo": "demo/metrics", "pr_number": 1, "commit_sha": "deadbeef", "tf_path": "backend/sample/tf"},
+    )
+    run_id = resp.json()["run_id"]
+    deadline = time.monotonic() + 30
+    # storage time is added right after the completed status is first published
+    while "storage" not in (doc := client.get("/status", params={"run_id": run_id}).json())["timings"]:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+    assert doc["status"] == "completed"
+    assert {"checkov", "policy", "cost", "context", "compose", "storage"} <= set(doc["timings"])
+
+    scrape = client.get("/metrics")
+    assert scrape.headers["content-type"].startswith("application/openmetrics-text")
+    body = scrape.text
+    assert 'autoinfra_stage_seconds_count{stage="checkov"}' in body
+    assert 'autoinfra_runs_total{result="' in body
+    assert "autoinfra_job_queue_depth " in body
+    assert 'autoinfra_scan_cache_lookups_total{result="miss"}' in body
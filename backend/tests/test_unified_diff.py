@@ -0,0 +1,95 @@
+import time
+
+from backend.services.unified_diff import apply_hunks, parse_unified_diff
+
+MULTI = """diff --git a/infra/a.tf b/infra/a.tf
+--- a/infra/a.tf
++++ b/infra/a.tf
+@@ -2,3 +2,3 @@ resource "aws_s3_bucket" "b" {
+   bucket = "b"
+-  acl    = "public-read"
++  acl    = "private"
+ }
+--- a/infra/b.tf
++++ b/infra/b.tf
+@@ -1,2 +1,3 @@
+ resource "aws_db_instance" "db" {
++  storage_encrypted = true
+   publicly_accessible = false
+"""
+
+
+def test_parse_multi_file_diff():
+    fps = parse_unified_diff(MULTI)
+    assert [fp.path for fp in fps] == ["infra/a.tf", "infra/b.tf"]
+    assert [h.old_start for fp in fps for h in fp.hunks] == [2, 1]
+    assert fps[0].hunks[0].lines[1] == ("-", '  acl    = "public-read"')
+
+
+def test_hunk_applies_at_drifted_offset_with_fuzz():
+    lines = ["# header"] * 10 + ['resource "aws_s3_bucket" "b" {', '  bucket  =  "b"', '  acl = "public-read"', "}"]
+    hunk = parse_unified_diff(MULTI)[0].hunks
+    out = apply_hunks(lines, hunk)
+    assert out[:11] == lines[:11]
+    # whitespace-insensitive match; context keeps the file's own formatting
+    assert out[11:] == ['  bucket  =  "b"', '  acl    = "private"', "}"]
+
+    # context that no longer matches at the edges is fuzzed away
+    drifted = lines[:11] + ['  bucket = "renamed"', '  acl = "public-read"', "  # note"]
+    assert apply_hunks(drifted, hunk)[12] == '  acl    = "private"'
+    assert apply_hunks(["nothing here"], hunk) is None
+
+
+def test_headerless_snippet_is_reindented_in_place():
+    fps = parse_unified_diff('- acl = "public-read"\n+ acl = "private"\n+ block_public_acls = true\n')
+    assert fps[0].path is None and fps[0].hunks[0].old_start == 0
+    lines = ['resource "aws_s3_bucket" "b" {', '    acl = "public-read"', "}"]
+    assert apply_hunks(lines, fps[0].hunks) == [
+        lines[0],
+        '    acl = "private"',
+        "    block_public_acls = true",
+        "}",
+    ]
+
+
+def test_headerless_snippet_falls_back_to_partial_lines():
+    fps = parse_unified_diff('- acl = "public-read"\n+ acl = "private"\n')
+    lines = ['resource "aws_s3_bucket" "b" {', '  acl = "public-read" # legacy', "}"]
+    # no whole line matches; the snippet quotes part of line 2
+    assert apply_hunks(lines, fps[0].hunks) == [lines[0], '  acl = "private"', "}"]
+
+    # a hunk with an @@ position still needs whole lines
+    positioned = parse_unified_diff('@@ -2,1 +2,1 @@\n- acl = "public-read"\n+ acl = "private"\n')
+    assert apply_hunks(lines, positioned[0].hunks) is None
+
+
+def test_insertions_land_after_their_old_line():
+    lines = [f"l{i}" for i in range(1, 16)]
+    lone = parse_unified_diff("--- a/x.tf\n+++ b/x.tf\n@@ -10,0 +11 @@\n+INS\n")[0].hunks
+    assert apply_hunks(lines, lone)[9:12] == ["l10", "INS", "l11"]
+
+    # an earlier hunk that grows the file does not shift where later hunks are placed
+    body = "--- a/x.tf\n+++ b/x.tf\n@@ -2 +2,3 @@\n-l2\n+l2a\n+l2b\n+l2c\n@@ -10,0 +13 @@\n+INS\n"
+    out = apply_hunks(lines, parse_unified_diff(body)[0].hunks)
+    assert out[1:4] == ["l2a", "l2b", "l2c"]
+    assert out[11:14] == ["l10", "INS", "l11"]
+    assert len(out) == len(lines) + 3
+
+
+def test_many_hunks_on_large_file_are_fast():
+    n = 20_000
+    lines = [f"  attr_{i} = {i}" for i in range(n)]
+    body = ["--- a/big.tf", "+++ b/big.tf"]
+    for k in range(50):
+        i = k * 400 + 7
+        # @@ positions are off by 3 lines to force the offset search
+        body += [f"@@ -{i + 4},3 +{i + 4},3 @@", " " + lines[i - 1], "-" + lines[i], "+" + lines[i] + " # fixed", " " + lines[i + 1]]
+    hunks = parse_unified_diff("\n".join(body))[0].hunks
+    assert len(hunks) == 50
+
+    start = time.perf_counter()
+    out = apply_hunks(lines, hunks)
+    assert time.perf_counter() - start < 1.0
+    assert len(out) == n
+    assert sum(1 for ln in out if ln.endswith("# fixed")) == 50
+    assert out[407] == "  attr_407 = 407 # fixed"
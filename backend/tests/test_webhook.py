@@ -33,3 +33,71 @@ def test_webhook_accepts_pr_event_but_may_ignore_action():
     data = resp.json()
     assert data.get("ok") is True
     assert "pr_number" in data
+
+
+def _sync_event(sha: str) -> bytes:
+    payload = {
+        "action": "synchronize",
+        "pull_request": {"number": 9, "head": {"sha": sha}},
+        "repository": {"full_name": "owner/coalesce"},
+    }
+    return json.dumps(payload).encode("utf-8")
+
+
+def test_webhook_supersedes_older_head_for_same_pr(monkeypatch):
+    from backend.routes import webhook as webhook_routes
+
+    real_run_job = webhook_routes.run_job
+
+    def slow_first_head(req, job):
+        if req.commit_sha == "aaaaaaaaaaaa":
+            job.cancel_event.wait(5)
+        return real_run_job(req, job)
+
+    monkeypatch.setattr(webhook_routes, "run_job", slow_first_head)
+
+    client = TestClient(app)
+    headers = {"X-GitHub-Event": "pull_request"}
+    first = client.post("/webhook", content=_sync_event("a" * 40), headers=headers).json()
+    again = client.post("/webhook", content=_sync_event("a" * 40), headers=headers).json()
+    second = client.post("/webhook", content=_sync_event("b" * 40), headers=headers).json()
+
+    assert again.get("deduplicated") is True and again["run_id"] == first["run_id"]
+    assert second["superseded"] == first["run_id"]
+
+    status = client.get("/status", params={"run_id": first["run_id"]}).json()
+    assert status["status"] == "failed"
+    assert status["error"] == "superseded"
+
+
+def test_webhook_keeps_status_cache_calls_off_the_event_loop(monkeypatch):
+    import asyncio
+
+    from backend.routes import webhook as webhook_routes
+
+    cache = webhook_routes.get_status_cache()
+    real_claim = cache.claim_pr_head
+    on_loop = []
+
+    def claim(*args, **kwargs):
+        try:
+            asyncio.get_running_loop()
+            on_loop.append(True)
+        except RuntimeError:
+            on_loop.append(False)
+        return real_claim(*args, **kwargs)
+
+    monkeypatch.setattr(cache, "claim_pr_head", claim)
+
+    payload = {
+        "action": "opened",
+        "pull_request": {"number": 11, "head": {"sha": "c" * 40}},
+        "repository": {"full_name": "owner/offloop"},
+    }
+    resp = TestClient(app).post(
+        "/webhook",
+        content=json.dumps(payload).encode("utf-8"),
+        headers={"X-GitHub-Event": "pull_request"},
+    )
+    assert resp.status_code == 200
+    assert on_loop and not any(on_loop)
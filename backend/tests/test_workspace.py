@@ -0,0 +1,32 @@
+from backend.services.workspace import OverlayWorkspace
+
+
+def test_overlay_writes_only_patched_files_and_never_touches_source(tmp_path):
+    src = tmp_path / "src"
+    (src / "app").mkdir(parents=True)
+    (src / ".terraform" / "providers").mkdir(parents=True)
+    (src / ".terraform" / "providers" / "huge.bin").write_bytes(b"\0" * 4096)
+    (src / "app" / "main.tf").write_text("a = 1\n", encoding="utf-8")
+    (src / "app" / "vars.tf").write_text("b = 2\n", encoding="utf-8")
+    (src / "root.tf").write_text("c = 3\n", encoding="utf-8")
+
+    with OverlayWorkspace(str(src)) as ws:
+        assert list(ws.root.iterdir()) == []
+        assert sorted(ws.tf_files()) == ["app/main.tf", "app/vars.tf", "root.tf"]
+
+        ws.expose(["app"])
+        ws.write_text("app/main.tf", "a = 2\n")
+        assert ws.path("app/main.tf") == ws.root / "app" / "main.tf"
+        assert ws.path("root.tf") == src / "root.tf"
+
+        # write after expose replaces the link instead of writing through it
+        ws.write_text("app/vars.tf", "b = 3\n")
+        assert sorted(p.relative_to(ws.root).as_posix() for p in ws.root.rglob("*") if p.is_file()) == [
+            "app/main.tf",
+            "app/vars.tf",
+        ]
+        root = ws.root
+
+    assert (src / "app" / "main.tf").read_text() == "a = 1\n"
+    assert (src / "app" / "vars.tf").read_text() == "b = 2\n"
+    assert not root.exists()
@@ -12,16 +12,33 @@ CREATE TABLE IF NOT EXISTS runs
     status           LowCardinality(String),    
     duration_ms      UInt32,
     cost_usd_month   Float64,
-    created_at       DateTime DEFAULT now()
+    issues           UInt32 DEFAULT 0,
+    fails            UInt32 DEFAULT 0,
+    created_at       DateTime DEFAULT now(),
+    INDEX run_id_bf run_id TYPE bloom_filter GRANULARITY 4,
+    INDEX repo_bf repo TYPE bloom_filter GRANULARITY 4,
+    INDEX pr_number_mm pr_number TYPE minmax GRANULARITY 4
 )
 ENGINE = MergeTree
 ORDER BY (created_at, run_id)
 TTL created_at + INTERVAL 30 DAY
 SETTINGS index_granularity = 8192;
 
+-- tables created before /history was keyset-paginated
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS issues UInt32 DEFAULT 0 AFTER cost_usd_month;
+ALTER TABLE runs ADD COLUMN IF NOT EXISTS fails UInt32 DEFAULT 0 AFTER issues;
+ALTER TABLE runs ADD INDEX IF NOT EXISTS repo_bf repo TYPE bloom_filter GRANULARITY 4;
+ALTER TABLE runs ADD INDEX IF NOT EXISTS pr_number_mm pr_number TYPE minmax GRANULARITY 4;
+
+-- tables created before /status looked runs up by run_id; an added index only
+-- covers new parts until it is materialized over the existing ones
+ALTER TABLE runs ADD INDEX IF NOT EXISTS run_id_bf run_id TYPE bloom_filter GRANULARITY 4;
+ALTER TABLE runs MATERIALIZE INDEX run_id_bf;
+
 CREATE TABLE IF NOT EXISTS findings
 (
     run_id     String,
+    repo       LowCardinality(String) DEFAULT '',
     idx        UInt32,                          
     tool       LowCardinality(String),          
     rule_id    String,
@@ -35,6 +52,8 @@ ENGINE = MergeTree
 ORDER BY (run_id, idx)
 TTL created_at + INTERVAL 30 DAY;
 
+ALTER TABLE findings ADD COLUMN IF NOT EXISTS repo LowCardinality(String) DEFAULT '' AFTER run_id;
+
 CREATE TABLE IF NOT EXISTS outcomes
 (
     run_id         String,
@@ -43,12 +62,16 @@ CREATE TABLE IF NOT EXISTS outcomes
     policy_before  UInt32,
     policy_after   UInt32,
     safe_to_merge  UInt8,                      
-    created_at     DateTime DEFAULT now()
+    created_at     DateTime DEFAULT now(),
+    INDEX run_id_bf run_id TYPE bloom_filter GRANULARITY 4
 )
 ENGINE = MergeTree
 ORDER BY (created_at, run_id)
 TTL created_at + INTERVAL 30 DAY;
 
+ALTER TABLE outcomes ADD INDEX IF NOT EXISTS run_id_bf run_id TYPE bloom_filter GRANULARITY 4;
+ALTER TABLE outcomes MATERIALIZE INDEX run_id_bf;
+
 CREATE TABLE IF NOT EXISTS patch_library
 (
     run_id        String,
@@ -60,7 +83,7 @@ ENGINE = MergeTree
 ORDER BY (created_at, run_id)
 TTL created_at + INTERVAL 30 DAY;
 
-CREATE VIEW IF NOT EXISTS recent_runs AS
+CREATE OR REPLACE VIEW recent_runs AS
 SELECT
     run_id,
     repo,
@@ -69,6 +92,55 @@ SELECT
     status,
     duration_ms,
     cost_usd_month,
+    issues,
+    fails,
     created_at
+FROM runs;
+
+-- /stats rollups: partial aggregates per day, merged at query time, so
+-- reads cost rules x repos x days however many runs are stored
+CREATE TABLE IF NOT EXISTS finding_rollup
+(
+    day        Date,
+    repo       LowCardinality(String),
+    rule_id    String,
+    severity   LowCardinality(String),
+    tool       LowCardinality(String),
+    findings   AggregateFunction(count),
+    runs       AggregateFunction(uniq, String)
+)
+ENGINE = AggregatingMergeTree
+ORDER BY (day, repo, rule_id, severity, tool)
+TTL day + INTERVAL 30 DAY;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS finding_rollup_mv TO finding_rollup AS
+SELECT
+    toDate(created_at) AS day,
+    repo,
+    rule_id,
+    severity,
+    tool,
+    countState() AS findings,
+    uniqState(run_id) AS runs
+FROM findings
+GROUP BY day, repo, rule_id, severity, tool;
+
+CREATE TABLE IF NOT EXISTS run_rollup
+(
+    day        Date,
+    repo       LowCardinality(String),
+    runs       AggregateFunction(count),
+    durations  AggregateFunction(quantiles(0.5, 0.95), UInt32)
+)
+ENGINE = AggregatingMergeTree
+ORDER BY (day, repo)
+TTL day + INTERVAL 30 DAY;
+
+CREATE MATERIALIZED VIEW IF NOT EXISTS run_rollup_mv TO run_rollup AS
+SELECT
+    toDate(created_at) AS day,
+    repo,
+    countState() AS runs,
+    quantilesState(0.5, 0.95)(duration_ms) AS durations
 FROM runs
-ORDER BY created_at DESC;
+GROUP BY day, repo;